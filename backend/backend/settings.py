@@ -107,6 +107,10 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'emotion_tracking.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
 }
 
 from datetime import timedelta
@@ -117,6 +121,69 @@ SIMPLE_JWT = {
     'ROTATE_REFRESH_TOKENS': True,
 }
 
+# ML model serving: artifacts are loaded once per process and reloaded when
+# they change on disk (checked at most every ML_MODEL_RELOAD_INTERVAL seconds)
+ML_MODEL_DIR = config('ML_MODEL_DIR', default=str(BASE_DIR / 'emotion_tracking' / 'saved_models'))
+ML_MODEL_RELOAD_INTERVAL = config('ML_MODEL_RELOAD_INTERVAL', default=5.0, cast=float)
+
+# Labels train_incremental learns from: 'confirmed' (clinician-confirmed risk
+# categories) or 'predicted' (the serving model's own output, i.e. self-training)
+ML_INCREMENTAL_LABELS = config('ML_INCREMENTAL_LABELS', default='confirmed')
+# Load and warm up the model when the WSGI application is created, before a
+# pre-forking server starts its workers (see emotion_tracking.model_registry.preload_models)
+ML_PRELOAD_MODELS = config('ML_PRELOAD_MODELS', default=True, cast=bool)
+
+# Prediction cache: 'local' (per-process LRU), 'django' (the cache named by
+# CACHE_ALIAS, shared between workers) or '' to disable
+ML_PREDICTION_CACHE = {
+    'BACKEND': config('ML_PREDICTION_CACHE', default='local'),
+    'MAX_SIZE': 4096,
+    'TTL': 3600,
+    'CACHE_ALIAS': 'default',
+}
+
+# Keyset pagination of entries and risk assessments (emotion_tracking/pagination.py)
+EMOTION_PAGINATION = {
+    'PAGE_SIZE': 100,
+    'MAX_PAGE_SIZE': 500,
+    'MAX_DAYS': 3660,   # largest accepted ?days= window
+}
+
+# Batched entry upload, POST /api/emotions/entries/sync/ (emotion_tracking/entry_writes.py)
+EMOTION_SYNC = {
+    'MAX_BATCH_SIZE': 100,
+}
+
+# Per-user cache for the read endpoints, keyed by the user's data version
+# (emotion_tracking/response_cache.py); an empty CACHE_ALIAS keeps only ETags
+EMOTION_RESPONSE_CACHE = {
+    'CACHE_ALIAS': config('EMOTION_RESPONSE_CACHE_ALIAS', default='default'),
+    'TTL': 300,
+}
+
+# Risk scoring: 'sync' scores inside the request; 'async' queues a ScoringJob
+# and returns a pending risk state (run workers with manage.py run_scoring_workers)
+ML_SCORING_MODE = config('ML_SCORING_MODE', default='sync')
+ML_SCORING_QUEUE = {
+    'BATCH_SIZE': 64,
+    'MAX_ATTEMPTS': 5,
+    'RETRY_DELAY': 10,      # seconds, doubled after each failed attempt
+    'LOCK_TIMEOUT': 300,    # running jobs older than this are picked up again
+    'POLL_INTERVAL': 1.0,
+}
+
+# Scoring daemon: with SOCKET set, web workers send entries to the process
+# started by manage.py run_scoring_server instead of loading the model
+# themselves, and score in process whenever the daemon cannot answer
+ML_SCORING_SERVER = {
+    'SOCKET': config('ML_SCORING_SOCKET', default=''),
+    'POOL_SIZE': 8,          # pooled connections per worker process
+    'TIMEOUT': 1.0,          # seconds per socket operation
+    'RETRY_INTERVAL': 5.0,   # seconds before retrying the daemon after a failure
+    'MAX_WAIT_MS': 2.0,      # daemon: how long a batch waits for more requests
+    'MAX_BATCH_ROWS': 256,   # daemon: rows that close a batch early
+}
+
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
     "exp://localhost:19000",
@@ -124,3 +191,6 @@ CORS_ALLOWED_ORIGINS = [
 ]
 
 CORS_ALLOW_CREDENTIALS = True
+
+# Pagination and conditional GET headers read by the web client
+CORS_EXPOSE_HEADERS = ['ETag', 'Last-Modified', 'Link', 'X-Next-Cursor']
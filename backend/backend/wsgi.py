@@ -9,8 +9,16 @@ https://docs.djangoproject.com/en/4.2/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
 application = get_wsgi_application()
+
+# Load the risk model now instead of on each worker's first request. With
+# `gunicorn --preload` this runs once in the master and the forked workers
+# share the model's memory.
+if settings.ML_PRELOAD_MODELS:
+    from emotion_tracking.model_registry import preload_models
+    preload_models()
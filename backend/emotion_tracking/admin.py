@@ -1,13 +1,17 @@
 from django.contrib import admin
-from .models import EmotionEntry, RiskAssessment
+from django.db import transaction
+from django.utils import timezone
+from .models import EmotionEntry, EmotionSummary, RiskAssessment, ScoringJob
+from .rollups import rebuild_rollups
 
 
 @admin.register(EmotionEntry)
 class EmotionEntryAdmin(admin.ModelAdmin):
-    list_display = ('user', 'date', 'mood', 'anxiety_level', 'sleep_hours', 'risk_category')
-    list_filter = ('mood', 'risk_category', 'date')
+    list_display = ('user', 'date', 'mood', 'anxiety_level', 'sleep_hours', 'risk_category',
+                    'confirmed_risk_category')
+    list_filter = ('mood', 'risk_category', 'confirmed_risk_category', 'date')
     search_fields = ('user__username', 'journal_text')
-    readonly_fields = ('risk_score', 'risk_category', 'created_at', 'updated_at')
+    readonly_fields = ('risk_score', 'risk_category', 'risk_confirmed_at', 'created_at', 'updated_at')
     
     fieldsets = (
         ('Basic Information', {
@@ -23,29 +27,71 @@ class EmotionEntryAdmin(admin.ModelAdmin):
             'fields': ('risk_score', 'risk_category'),
             'classes': ('collapse',)
         }),
+        ('Clinical Review', {
+            'fields': ('confirmed_risk_category', 'risk_confirmed_at'),
+        }),
         ('Timestamps', {
             'fields': ('created_at', 'updated_at'),
             'classes': ('collapse',)
         })
     )
 
+    def save_model(self, request, obj, form, change):
+        # Confirmed labels are picked up by train_incremental in this order
+        if 'confirmed_risk_category' in form.changed_data:
+            obj.risk_confirmed_at = timezone.now() if obj.confirmed_risk_category else None
+        super().save_model(request, obj, form, change)
+
+    def delete_queryset(self, request, queryset):
+        # "Delete selected" is a queryset delete, which skips
+        # EmotionEntry.delete(): rebuild each affected user's summary and
+        # rollups once instead
+        with transaction.atomic():
+            user_ids = set(queryset.values_list('user_id', flat=True))
+            super().delete_queryset(request, queryset)
+            for user_id in user_ids:
+                EmotionSummary.data_changed(user_id, recompute=True)
+                rebuild_rollups(user_id)
+
 
 @admin.register(RiskAssessment)
 class RiskAssessmentAdmin(admin.ModelAdmin):
     list_display = ('user', 'date', 'risk_category', 'risk_score')
     list_filter = ('risk_category', 'date')
     search_fields = ('user__username',)
-    readonly_fields = ('created_at',)
+    readonly_fields = ('contributing_factors', 'recommendations', 'feature_contributions', 'model_version', 'created_at')
     
     fieldsets = (
         ('Basic Information', {
             'fields': ('user', 'date', 'risk_category', 'risk_score')
         }),
         ('Analysis', {
-            'fields': ('contributing_factors', 'recommendations'),
+            'fields': ('contributing_factors', 'recommendations', 'feature_contributions', 'model_version'),
             'classes': ('collapse',)
         }),
         ('Timestamps', {
             'fields': ('created_at',)
         })
     )
+
+    def delete_queryset(self, request, queryset):
+        # Bumps the users' data versions, as RiskAssessment.delete() would
+        with transaction.atomic():
+            user_ids = set(queryset.values_list('user_id', flat=True))
+            super().delete_queryset(request, queryset)
+            for user_id in user_ids:
+                EmotionSummary.data_changed(user_id)
+
+
+@admin.register(ScoringJob)
+class ScoringJobAdmin(admin.ModelAdmin):
+    list_display = ('entry', 'status', 'attempts', 'run_after', 'locked_by')
+    list_filter = ('status',)
+    readonly_fields = ('created_at', 'updated_at')
+
+
+@admin.register(EmotionSummary)
+class EmotionSummaryAdmin(admin.ModelAdmin):
+    list_display = ('user', 'current_streak', 'longest_streak', 'last_entry_date')
+    search_fields = ('user__username',)
+    readonly_fields = ('current_streak', 'longest_streak', 'streak_start', 'last_entry_date', 'updated_at')
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+"""
+Import-time benchmark for process startup
+Runs each startup path in a fresh interpreter with `python -X importtime`,
+reports the total import time and whether the heavy ML libraries were loaded.
+They should only be imported once scoring happens, so management commands and
+a non-preloading WSGI app must not load them. Run from the backend directory:
+
+    python -m emotion_tracking.benchmark_imports
+    python -m emotion_tracking.benchmark_imports --repeats 5
+
+Exits non-zero when a path that should stay light imports an ML library.
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+
+HEAVY_MODULES = ('sklearn', 'pandas', 'joblib')
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The URLconf (and with it the views) is loaded by the first request
+WSGI_APP = 'import backend.wsgi; from django.urls import get_resolver; get_resolver().url_patterns'
+
+# name: (command after `python -X importtime`, extra environment, must stay light)
+TARGETS = {
+    'manage.py check': (['manage.py', 'check'], {}, True),
+    'wsgi app': (['-c', WSGI_APP], {'ML_PRELOAD_MODELS': 'False'}, True),
+    'wsgi app + preload': (['-c', WSGI_APP], {'ML_PRELOAD_MODELS': 'True'}, False),
+    'scoring (ml_models)': (['-c', 'import emotion_tracking.ml_models'], {}, False),
+}
+
+_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+def parse_importtime(stderr):
+    """(total microseconds, set of imported top-level packages)"""
+    total = 0
+    packages = set()
+    for line in stderr.splitlines():
+        match = _LINE.match(line)
+        if not match:
+            continue
+        _, cumulative, indent, module = match.groups()
+        # Top-level entries (one space of indent) include their children
+        if len(indent) == 1:
+            total += int(cumulative)
+        packages.add(module.split('.')[0])
+    return total, packages
+
+
+def measure(args, env):
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-W', 'ignore', *args],
+        cwd=BACKEND_DIR,
+        env={**os.environ, 'DJANGO_SETTINGS_MODULE': 'backend.settings', **env},
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"{' '.join(args)} failed:\n{result.stderr[-2000:]}")
+    return parse_importtime(result.stderr)
+
+
+def run(repeats=3):
+    results = {}
+    for name, (args, env, must_stay_light) in TARGETS.items():
+        timings = []
+        for _ in range(repeats):
+            total, packages = measure(args, env)
+            timings.append(total)
+        results[name] = {
+            'import_ms': statistics.median(timings) / 1000,
+            'heavy_modules': sorted(packages.intersection(HEAVY_MODULES)),
+            'must_stay_light': must_stay_light,
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeats', type=int, default=3, help='runs per target (median reported)')
+    args = parser.parse_args()
+
+    results = run(args.repeats)
+    failures = []
+    print(f"{'startup path':24s}{'imports':>10s}  ML libraries loaded")
+    for name, result in results.items():
+        heavy = ', '.join(result['heavy_modules']) or '-'
+        print(f"{name:24s}{result['import_ms']:8.0f}ms  {heavy}")
+        if result['must_stay_light'] and result['heavy_modules']:
+            failures.append(name)
+    if failures:
+        print(f"ML libraries imported at startup by: {', '.join(failures)}")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,368 @@
+#!/usr/bin/env python
+"""
+Benchmark suite for emotion risk prediction
+Measures model load time, single-row predict_risk latency percentiles, batch
+throughput, peak RSS and where single-row time goes (numeric preprocessing,
+text features, forest), and compares predict_risk against predict_risk_batch.
+Run from the backend directory after training:
+
+    python -m emotion_tracking.benchmark_models --rows 5000
+    python -m emotion_tracking.benchmark_models --output bench.json
+    python -m emotion_tracking.benchmark_models --baseline bench.json --tolerance 0.2
+    python -m emotion_tracking.benchmark_models --fork-workers 4   # per-worker USS, Linux
+
+With --baseline the run exits non-zero when a gated metric is more than
+tolerance worse than the baseline (or predictions stop matching), so it can
+gate a deploy. The numbers are wall-clock and memory measurements, so a
+baseline only gates runs of the same fixture size and model: a run whose
+--rows or model version differs from the baseline's is refused (unless
+--allow-mismatch), and a different machine or library version is warned
+about. emotion_tracking/benchmarks/baseline.json is a reference run of the
+default model for comparison by hand, not a gate for other machines.
+"""
+
+import argparse
+import gc
+import json
+import multiprocessing
+import platform
+import resource
+import sys
+import time
+
+import numpy as np
+import sklearn
+
+from emotion_tracking.ml_models import EmotionRiskPredictor
+from emotion_tracking.synthetic_data import generate_synthetic_data
+
+
+NUMERIC_COLUMNS = ['mood', 'anxiety_level', 'sleep_hours', 'energy_level', 'appetite']
+
+
+def load_fixture(n_rows):
+    """Synthetic entries in the shape the views pass to the predictor"""
+    df = generate_synthetic_data(n_rows)
+    entries = df[NUMERIC_COLUMNS].to_dict('records')
+    texts = df['journal_text'].tolist()
+    return entries, texts
+
+
+def benchmark_single_vs_batch(predictor, entries, texts):
+    """Time the per-row path against one batched call and check parity"""
+    start = time.perf_counter()
+    single = [predictor.predict_risk(entry, text) for entry, text in zip(entries, texts)]
+    single_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = predictor.predict_risk_batch(entries, texts)
+    batch_seconds = time.perf_counter() - start
+
+    mismatches = sum(1 for a, b in zip(single, batch) if a != b)
+    return {
+        'rows': len(entries),
+        'single_rows_per_sec': len(entries) / single_seconds,
+        'batch_rows_per_sec': len(entries) / batch_seconds,
+        'speedup': single_seconds / batch_seconds,
+        'mismatches': mismatches,
+    }
+
+
+def _percentiles_ms(seconds):
+    p50, p95, p99 = np.percentile(np.asarray(seconds) * 1000, [50, 95, 99])
+    return {'p50_ms': float(p50), 'p95_ms': float(p95), 'p99_ms': float(p99)}
+
+
+def benchmark_load(model_dir=None, repeats=5):
+    """Seconds to construct a predictor; the first load is the cold one"""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        EmotionRiskPredictor(model_dir=model_dir)
+        timings.append(time.perf_counter() - start)
+    return {'cold_seconds': timings[0], 'warm_seconds': float(np.median(timings[1:] or timings))}
+
+
+def benchmark_latency(predictor, entries, texts, warmup=50):
+    """Per-call predict_risk latency percentiles"""
+    for entry, text in zip(entries[:warmup], texts[:warmup]):
+        predictor.predict_risk(entry, text)
+    timings = []
+    for entry, text in zip(entries, texts):
+        start = time.perf_counter()
+        predictor.predict_risk(entry, text)
+        timings.append(time.perf_counter() - start)
+    return {'calls': len(timings), **_percentiles_ms(timings)}
+
+
+def benchmark_throughput(predictor, entries, texts, batch_sizes=(64, 256, 1024)):
+    """predict_risk_batch rows/sec for each batch size and for all rows at once"""
+    results = {}
+    for batch_size in tuple(size for size in batch_sizes if size < len(entries)) + (len(entries),):
+        start = time.perf_counter()
+        for offset in range(0, len(entries), batch_size):
+            predictor.predict_risk_batch(entries[offset:offset + batch_size], texts[offset:offset + batch_size])
+        results[f'batch_{batch_size}_rows_per_sec'] = len(entries) / (time.perf_counter() - start)
+    results['batch_rows_per_sec'] = results[f'batch_{len(entries)}_rows_per_sec']
+    return results
+
+
+def benchmark_cost_split(predictor, entries, texts):
+    """Mean microseconds per row spent in each stage of the single-row path"""
+    stages = {'preprocess_features': 0.0, 'extract_text_features': 0.0, 'combine_features': 0.0, 'forest': 0.0}
+    for entry, text in zip(entries, texts):
+        t0 = time.perf_counter()
+        numeric = predictor.preprocess_features([entry])
+        t1 = time.perf_counter()
+        text_features = predictor.extract_text_features(text)
+        t2 = time.perf_counter()
+        combined = predictor.combine_features(numeric, text_features)
+        t3 = time.perf_counter()
+        predictor._predict(combined)
+        t4 = time.perf_counter()
+        stages['preprocess_features'] += t1 - t0
+        stages['extract_text_features'] += t2 - t1
+        stages['combine_features'] += t3 - t2
+        stages['forest'] += t4 - t3
+
+    total = sum(stages.values())
+    results = {f'{stage}_us': seconds / len(entries) * 1e6 for stage, seconds in stages.items()}
+    results.update({f'{stage}_share': seconds / total for stage, seconds in stages.items()})
+    return results
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def unique_memory_mb(pid='self'):
+    """Unique set size (pages no other process maps) of a process; None off Linux"""
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            private_kb = sum(int(line.split()[1]) for line in f if line.startswith(('Private_Clean:', 'Private_Dirty:')))
+    except OSError:
+        return None
+    return private_kb / 1024
+
+
+PRELOAD_MODES = ('lazy', 'preload', 'preload+freeze')
+
+
+def _fork_worker(predictor, model_dir, entries, texts, conn):
+    start = time.perf_counter()
+    if predictor is None:
+        predictor = EmotionRiskPredictor(model_dir=model_dir)
+    predictor.predict_risk(entries[0], texts[0])
+    first_request = time.perf_counter() - start
+    for entry, text in zip(entries, texts):
+        predictor.predict_risk(entry, text)
+    predictor.predict_risk_batch(entries, texts)
+    # A long-running worker's collector eventually visits every tracked
+    # object; do it now so the pages it writes to are counted
+    gc.collect()
+    conn.send({'uss_mb': unique_memory_mb(), 'first_request_ms': first_request * 1000})
+    conn.close()
+
+
+def _fork_master(mode, model_dir, n_workers, n_requests, conn):
+    """Stand-in for a pre-forking server's master process"""
+    entries, texts = load_fixture(n_requests)
+    predictor = None
+    if mode != 'lazy':
+        predictor = EmotionRiskPredictor(model_dir=model_dir)
+        predictor.warm_up()
+    if mode == 'preload+freeze':
+        gc.collect()
+        gc.freeze()
+
+    context = multiprocessing.get_context('fork')
+    workers = []
+    for _ in range(n_workers):
+        receiver, sender = context.Pipe(duplex=False)
+        process = context.Process(target=_fork_worker, args=(predictor, model_dir, entries, texts, sender))
+        process.start()
+        workers.append((process, receiver))
+    reports = []
+    for process, receiver in workers:
+        reports.append(receiver.recv())
+        process.join()
+    conn.send({
+        'worker_uss_mb': float(np.mean([report['uss_mb'] for report in reports])),
+        'first_request_ms': float(np.mean([report['first_request_ms'] for report in reports])),
+    })
+
+
+def benchmark_fork_memory(model_dir=None, n_workers=4, n_requests=500):
+    """Per-worker unique memory (USS) and first-request latency after fork.
+
+    Each mode runs in a fresh master process that forks n_workers workers:
+    'lazy' workers load the model on their first request, 'preload' workers
+    inherit a model loaded and warmed up in the master, and 'preload+freeze'
+    also gc.freeze()s the master's heap before forking. Linux only (reads
+    /proc/<pid>/smaps_rollup); returns None elsewhere.
+    """
+    if unique_memory_mb() is None:
+        return None
+    # A spawned master starts clean, like a server master that has only
+    # imported the application
+    context = multiprocessing.get_context('spawn')
+    results = {}
+    for mode in PRELOAD_MODES:
+        receiver, sender = context.Pipe(duplex=False)
+        master = context.Process(target=_fork_master, args=(mode, model_dir, n_workers, n_requests, sender))
+        master.start()
+        results[mode] = receiver.recv()
+        master.join()
+    return results
+
+
+def run_suite(n_rows=2000, model_dir=None):
+    """Run every benchmark and return the results as a JSON-serializable dict"""
+    load = benchmark_load(model_dir)
+    predictor = EmotionRiskPredictor(model_dir=model_dir)
+    if not predictor.is_loaded:
+        raise SystemExit("Models not found. Please train the models first using train_models.py")
+
+    entries, texts = load_fixture(n_rows)
+    return {
+        'meta': {
+            'rows': n_rows,
+            'model_version': predictor.model_version,
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'sklearn': sklearn.__version__,
+            'machine': platform.machine(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        },
+        'load': load,
+        'latency': benchmark_latency(predictor, entries, texts),
+        'throughput': benchmark_throughput(predictor, entries, texts),
+        'cost_split': benchmark_cost_split(predictor, entries, texts),
+        'parity': benchmark_single_vs_batch(predictor, entries, texts),
+        'memory': {'peak_rss_mb': peak_rss_mb()},
+    }
+
+
+# Metrics checked against the baseline: dotted path -> which direction is better
+GATED_METRICS = {
+    'load.warm_seconds': 'lower',
+    'latency.p50_ms': 'lower',
+    'latency.p95_ms': 'lower',
+    'latency.p99_ms': 'lower',
+    'throughput.batch_rows_per_sec': 'higher',
+    'memory.peak_rss_mb': 'lower',
+}
+
+
+def _lookup(results, path):
+    value = results
+    for key in path.split('.'):
+        value = value[key]
+    return value
+
+
+# Baseline metadata that must match for the numbers to be comparable
+COMPARABLE_META = ('rows', 'model_version')
+# Where the numbers were measured; a difference is reported but not fatal
+ENVIRONMENT_META = ('machine', 'python', 'numpy', 'sklearn')
+
+
+def baseline_mismatches(results, baseline):
+    """(incomparable, environment): messages for differing baseline metadata"""
+    meta, expected = results['meta'], baseline.get('meta', {})
+
+    def differing(keys):
+        return [f"{key}: {meta.get(key)} here, {expected.get(key)} in the baseline"
+                for key in keys if meta.get(key) != expected.get(key)]
+    return differing(COMPARABLE_META), differing(ENVIRONMENT_META)
+
+
+def compare_to_baseline(results, baseline, tolerance=0.2):
+    """Return a list of regression messages (empty if within tolerance)"""
+    regressions = []
+    for path, better in GATED_METRICS.items():
+        try:
+            expected = _lookup(baseline, path)
+        except KeyError:
+            continue
+        actual = _lookup(results, path)
+        change = (actual - expected) / expected if expected else 0.0
+        if (better == 'lower' and change > tolerance) or (better == 'higher' and change < -tolerance):
+            regressions.append(f"{path}: {actual:.4g} vs baseline {expected:.4g} ({change:+.0%})")
+    if results['parity']['mismatches']:
+        regressions.append(f"parity.mismatches: {results['parity']['mismatches']} rows differ between single and batch")
+    return regressions
+
+
+def print_results(results):
+    load, latency, throughput = results['load'], results['latency'], results['throughput']
+    print(f"Model version:      {results['meta']['model_version']}")
+    print(f"Load time:          {load['cold_seconds'] * 1000:.1f} ms cold, {load['warm_seconds'] * 1000:.1f} ms warm")
+    print(f"predict_risk:       p50 {latency['p50_ms']:.3f} ms, p95 {latency['p95_ms']:.3f} ms, "
+          f"p99 {latency['p99_ms']:.3f} ms")
+    for key, value in throughput.items():
+        if key != 'batch_rows_per_sec':
+            print(f"{key.replace('_rows_per_sec', ''):20s}{value:,.0f} rows/sec")
+    print("Single-row cost split:")
+    for stage in ('preprocess_features', 'extract_text_features', 'combine_features', 'forest'):
+        split = results['cost_split']
+        print(f"  {stage:22s}{split[stage + '_us']:8.1f} us  {split[stage + '_share']:6.1%}")
+    parity = results['parity']
+    print(f"Batch speedup:      {parity['speedup']:.1f}x over predict_risk, {parity['mismatches']} mismatched rows")
+    print(f"Peak RSS:           {results['memory']['peak_rss_mb']:.1f} MB")
+    fork_memory = results.get('fork_memory')
+    if fork_memory:
+        print("Per-worker memory after fork:")
+        for mode, report in fork_memory.items():
+            print(f"  {mode:16s}USS {report['worker_uss_mb']:6.1f} MB, first request {report['first_request_ms']:7.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=2000, help='number of synthetic entries to score')
+    parser.add_argument('--model-dir', help='model directory (default: the saved_models directory)')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--baseline', help='JSON results of an earlier run to compare against')
+    parser.add_argument('--allow-mismatch', action='store_true',
+                        help='compare even if the baseline used other --rows or another model')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='allowed relative regression per gated metric (default 0.2 = 20%%)')
+    parser.add_argument('--fork-workers', type=int, metavar='N',
+                        help='also compare per-worker USS of N forked workers with and without preloading')
+    args = parser.parse_args()
+
+    results = run_suite(args.rows, args.model_dir)
+    if args.fork_workers:
+        results['fork_memory'] = benchmark_fork_memory(args.model_dir, args.fork_workers)
+    print_results(results)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        incomparable, environment = baseline_mismatches(results, baseline)
+        for message in environment:
+            print(f"WARNING: baseline from a different environment ({message})", file=sys.stderr)
+        if incomparable and not args.allow_mismatch:
+            raise SystemExit("Baseline is not comparable with this run:\n  " + "\n  ".join(incomparable)
+                             + "\nUse a baseline recorded with the same --rows and model, or --allow-mismatch")
+        for message in incomparable:
+            print(f"WARNING: comparing anyway ({message})", file=sys.stderr)
+        regressions = compare_to_baseline(results, baseline, args.tolerance)
+        if regressions:
+            print("Performance regressions:")
+            for message in regressions:
+                print(f"  {message}")
+            raise SystemExit(1)
+        print(f"No regressions beyond {args.tolerance:.0%} of the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Catalogue of contributing factors and recommendations.
+
+Risk assessments store small integer codes instead of the English sentences;
+the text is looked up here when an assessment is serialized. Codes are
+persisted, so existing ones must never be renumbered or reused: add new
+entries with new codes.
+"""
+
+from functools import lru_cache
+
+
+# code: (factor key, text)
+FACTORS = {
+    1: ('sleep', 'Poor sleep may be affecting your wellbeing'),
+    2: ('sleep', 'Excessive sleep might indicate low energy'),
+    3: ('anxiety', 'High anxiety levels detected'),
+    4: ('mood', 'Current mood (sad) may need attention'),
+    5: ('mood', 'Current mood (angry) may need attention'),
+    6: ('mood', 'Current mood (anxious) may need attention'),
+    7: ('energy', 'Low energy levels detected'),
+    8: ('appetite', 'Poor appetite may indicate stress'),
+}
+
+RECOMMENDATIONS = {
+    1: "Continue maintaining your current routine",
+    2: "Practice daily gratitude exercises",
+    3: "Stay connected with your support system",
+    4: "Get regular gentle exercise like walking",
+    5: "Try deep breathing exercises for 5 minutes daily",
+    6: "Consider talking to a friend or family member",
+    7: "Maintain a consistent sleep schedule",
+    8: "Practice self-care activities you enjoy",
+    9: "Limit caffeine and screen time before bed",
+    10: "Consider reaching out to a healthcare professional",
+    11: "Contact postpartum support helpline: 1-800-PPD-MOMS",
+    12: "Ask your partner or family for additional support",
+    13: "Prioritize rest and recovery",
+    14: "Don't hesitate to seek professional help",
+    15: "Try to get at least 7-8 hours of sleep",
+    16: "Practice mindfulness or meditation",
+}
+
+CATEGORY_RECOMMENDATIONS = {
+    'low': (1, 2, 3, 4),
+    'moderate': (5, 6, 7, 8, 9),
+    'high': (10, 11, 12, 13, 14),
+}
+MOOD_FACTORS = {'sad': 4, 'angry': 5, 'anxious': 6}
+
+
+def factor_codes(emotion_data):
+    """Codes of the factors that apply to an entry, in display order"""
+    codes = []
+    if emotion_data['sleep_hours'] < 6:
+        codes.append(1)
+    elif emotion_data['sleep_hours'] > 9:
+        codes.append(2)
+    if emotion_data['anxiety_level'] >= 4:
+        codes.append(3)
+    if emotion_data['mood'] in MOOD_FACTORS:
+        codes.append(MOOD_FACTORS[emotion_data['mood']])
+    if emotion_data['energy_level'] <= 2:
+        codes.append(7)
+    if emotion_data['appetite'] <= 2:
+        codes.append(8)
+    return codes
+
+
+def recommendation_codes(risk_category, emotion_data):
+    """Codes of the recommendations for a risk category and entry"""
+    # Anything that is not low or moderate gets the high-risk advice
+    codes = list(CATEGORY_RECOMMENDATIONS.get(risk_category, CATEGORY_RECOMMENDATIONS['high']))
+    if emotion_data['sleep_hours'] < 6:
+        codes.append(15)
+    if emotion_data['anxiety_level'] >= 4:
+        codes.append(16)
+    return codes
+
+
+@lru_cache(maxsize=1024)
+def _factors(codes):
+    return tuple(FACTORS[code] for code in codes if code in FACTORS)
+
+
+@lru_cache(maxsize=1024)
+def _recommendations(codes):
+    return tuple(RECOMMENDATIONS[code] for code in codes if code in RECOMMENDATIONS)
+
+
+def expand_factors(codes):
+    """{factor: text} for a list of factor codes"""
+    return dict(_factors(tuple(codes or ())))
+
+
+def expand_recommendations(codes):
+    """Recommendation texts for a list of recommendation codes"""
+    return list(_recommendations(tuple(codes or ())))
@@ -0,0 +1,259 @@
+"""
+Entry writes: one entry from the entries endpoints, or a batch uploaded by a
+client that was offline.
+
+Entries are scored before anything is written, so the entry, its risk fields
+and its RiskAssessment go to the database together in one transaction, each
+with a single statement:
+
+* write_entry (POST /entries/, PUT /entries/{id}/) updates a fetched entry by
+  primary key. A POST first looks up the user's entry for the date (its
+  status code and the streak upkeep depend on whether it replaces one, which
+  a portable upsert cannot report), then updates that row by primary key or
+  inserts a new one, whose id comes back from the INSERT where the backend
+  supports RETURNING. The RiskAssessment is upserted with INSERT ... ON
+  CONFLICT (user, date) DO UPDATE.
+* sync_entries validates every item on its own, scores the valid ones with one
+  predict_risk_batch call (one vectorized model pass for the cache misses)
+  and upserts all entries, then all RiskAssessments, with one statement each.
+
+An upserted entry replaces the fields of an existing entry for that date.
+These writes skip EmotionEntry.save(), so they run the upkeep save() does
+(EmotionEntry.written: streak summary and data version in one UPDATE, then the
+rollups) themselves, once per write or batch. In async scoring mode entries are written unscored
+and their ScoringJobs upserted instead of a RiskAssessment.
+"""
+
+from django.conf import settings
+from django.db import IntegrityError, router, transaction
+from django.utils import timezone
+
+from .model_registry import predict_risk_batch
+from .models import DailyEmotionRollup, EmotionEntry, EmotionSummary, RiskAssessment, ScoringJob
+from .scoring_queue import async_scoring_enabled, entry_emotion_data
+from .serializers import EmotionEntryListSerializer, EmotionEntrySerializer
+
+
+DEFAULT_SYNC_OPTIONS = {
+    'MAX_BATCH_SIZE': 100,
+}
+
+# Columns a replacing write overwrites; created_at keeps the first write's time
+ENTRY_UPDATE_FIELDS = [
+    'mood', 'anxiety_level', 'sleep_hours', 'energy_level', 'appetite', 'journal_text',
+    'risk_score', 'risk_category', 'updated_at',
+]
+ASSESSMENT_UPDATE_FIELDS = [
+    'risk_category', 'risk_score', 'factor_codes', 'recommendation_codes',
+    'feature_contributions', 'model_version',
+]
+JOB_UPDATE_FIELDS = ['status', 'attempts', 'run_after', 'locked_by', 'locked_at', 'last_error', 'updated_at']
+
+
+def sync_options():
+    return {**DEFAULT_SYNC_OPTIONS, **getattr(settings, 'EMOTION_SYNC', {})}
+
+
+class InvalidBatch(ValueError):
+    """The upload as a whole is malformed or too large"""
+
+
+class DuplicateDate(ValueError):
+    """Another of the user's entries already has the date"""
+
+
+def _validate(items):
+    """(entries by date, per-item results) for the uploaded items.
+
+    Invalid items get their serializer errors. When several items share a
+    date the last one wins, as if they had been posted one by one.
+    """
+    if not isinstance(items, list) or not items:
+        raise InvalidBatch("entries must be a non-empty list")
+    max_batch_size = sync_options()['MAX_BATCH_SIZE']
+    if len(items) > max_batch_size:
+        raise InvalidBatch(f"At most {max_batch_size} entries can be uploaded at once")
+
+    results = [None] * len(items)
+    latest = {}
+    for index, item in enumerate(items):
+        serializer = EmotionEntrySerializer(data=item)
+        if not serializer.is_valid():
+            results[index] = {'index': index, 'status': 'invalid', 'errors': serializer.errors}
+            continue
+        day = serializer.validated_data['date']
+        if day in latest:
+            earlier = latest[day][0]
+            results[earlier] = {'index': earlier, 'status': 'superseded', 'superseded_by': index}
+        latest[day] = index, serializer.validated_data
+    return latest, results
+
+
+def _score(entries):
+    """Set each entry's risk fields; the predictions, or None when scoring is asynchronous"""
+    if async_scoring_enabled():
+        for entry in entries:
+            entry.risk_score = None
+            entry.risk_category = None
+        return None
+    predictions = predict_risk_batch(
+        [entry_emotion_data(entry) for entry in entries],
+        [entry.journal_text or "" for entry in entries],
+    )
+    for entry, prediction in zip(entries, predictions):
+        entry.risk_score = prediction['risk_score']
+        entry.risk_category = prediction['risk_category']
+    return predictions
+
+
+def _save_assessments(entries, predictions, using):
+    """Upsert the entries' RiskAssessments, or queue the entries when they are unscored"""
+    if predictions is None:
+        now = timezone.now()
+        ScoringJob.objects.using(using).bulk_create(
+            [ScoringJob(entry_id=entry.pk, run_after=now) for entry in entries],
+            update_conflicts=True,
+            unique_fields=['entry'],
+            update_fields=JOB_UPDATE_FIELDS,
+        )
+        return
+    RiskAssessment.objects.using(using).bulk_create(
+        [
+            RiskAssessment(
+                user_id=entry.user_id,
+                date=entry.date,
+                risk_category=prediction['risk_category'],
+                risk_score=prediction['risk_score'],
+                factor_codes=prediction['factor_codes'],
+                recommendation_codes=prediction['recommendation_codes'],
+                feature_contributions=prediction['feature_contributions'],
+                model_version=prediction['model_version'] or '',
+            )
+            for entry, prediction in zip(entries, predictions)
+        ],
+        update_conflicts=True,
+        unique_fields=['user', 'date'],
+        update_fields=ASSESSMENT_UPDATE_FIELDS,
+    )
+
+
+def _update_entry(entry, using, **fields):
+    entry.updated_at = timezone.now()
+    EmotionEntry.objects.using(using).filter(pk=entry.pk).update(
+        **fields, **{name: getattr(entry, name) for name in ENTRY_UPDATE_FIELDS},
+    )
+
+
+def _insert_or_replace(entry, using):
+    """Insert the entry or replace the user's entry for its date; True if inserted.
+
+    Sets the entry's id and created_at: a replaced entry keeps the existing
+    row's, a new row's id is returned by the INSERT where the backend supports
+    RETURNING and read back otherwise.
+    """
+    manager = EmotionEntry._base_manager.using(using)
+    existing = manager.filter(user_id=entry.user_id, date=entry.date).values_list('pk', 'created_at').first()
+    if existing is not None:
+        entry.pk, entry.created_at = existing
+        _update_entry(entry, using)
+    else:
+        manager.bulk_create([entry])
+        if entry.pk is None:
+            entry.pk = manager.filter(user_id=entry.user_id, date=entry.date).values_list('pk', flat=True).get()
+    entry._state.adding, entry._state.db = False, using
+    return existing is None
+
+
+def write_entry(user, data, entry=None):
+    """Score and write one entry and its RiskAssessment in one transaction.
+
+    `data` is validated serializer data. Without `entry` it is a whole entry,
+    inserted or replacing the user's entry for its date; with one (fetched for an update) the changed
+    fields are applied to it and its row updated. Returns (entry, created,
+    prediction), the prediction being None when scoring is asynchronous.
+
+    Raises DuplicateDate when an update moves the entry onto a date that
+    already has one of the user's entries.
+    """
+    updating = entry is not None
+    if updating:
+        previous_date = entry._loaded_date
+        for name, value in data.items():
+            setattr(entry, name, value)
+    else:
+        entry = EmotionEntry(user=user, **data)
+        previous_date = None
+    predictions = _score([entry])
+
+    using = router.db_for_write(EmotionEntry)
+    # A POST racing another one for the same new date finds its row on retry
+    for attempt in range(2):
+        try:
+            with transaction.atomic(using=using):
+                if updating:
+                    created = False
+                    _update_entry(entry, using, date=entry.date)
+                else:
+                    created = _insert_or_replace(entry, using)
+                    # A replaced entry keeps its date
+                    previous_date = None if created else entry.date
+                _save_assessments([entry], predictions, using)
+                entry.written(created, previous_date, using=using)
+            return entry, created, predictions and predictions[0]
+        except IntegrityError:
+            # (user, date) is the only constraint these writes can violate
+            if updating:
+                raise DuplicateDate(f"You already have an entry for {entry.date}")
+            if attempt:
+                raise
+            entry.pk = None
+            entry._state.adding = True
+
+
+def sync_entries(user, items):
+    """Upsert a batch of the user's entries; one result per item, in order"""
+    latest, results = _validate(items)
+    if not latest:
+        return results
+
+    entries = [EmotionEntry(user=user, **data) for _, data in latest.values()]
+    predictions = _score(entries)
+
+    dates = list(latest)
+    using = router.db_for_write(EmotionEntry)
+    with transaction.atomic(using=using):
+        existing = set(
+            EmotionEntry.objects.using(using).filter(user=user, date__in=dates).values_list('date', flat=True)
+        )
+        EmotionEntry.objects.using(using).bulk_create(
+            entries,
+            update_conflicts=True,
+            unique_fields=['user', 'date'],
+            update_fields=ENTRY_UPDATE_FIELDS,
+        )
+
+        # Upserted rows do not get their ids back on every backend
+        serializer = EmotionEntryListSerializer()
+        rows = list(serializer.values(
+            EmotionEntry.objects.using(using).filter(user=user, date__in=dates), 'date', 'id'
+        ))
+        ids = {row['date']: row['id'] for row in rows}
+        for entry in entries:
+            entry.pk = ids[entry.date]
+        _save_assessments(entries, predictions, using)
+
+        EmotionSummary.data_changed(user.pk, using=using, recompute=True)
+        DailyEmotionRollup.entries_saved(entries, using=using)
+
+    saved = {row['date']: data for row, data in zip(rows, serializer.to_representation(rows))}
+    for (index, _), entry, prediction in zip(latest.values(), entries, predictions or [None] * len(entries)):
+        data = saved[entry.date]
+        if prediction is not None:
+            data['recommendations'] = prediction['recommendations']
+            data['model_version'] = prediction['model_version']
+        results[index] = {
+            'index': index,
+            'status': 'updated' if entry.date in existing else 'created',
+            'entry': data,
+        }
+    return results
@@ -0,0 +1,262 @@
+#!/usr/bin/env python
+"""
+Feature pipeline shared by training and serving
+
+FeaturePipeline turns entries into the model's input matrix: mood mapped to a
+number, the numeric columns standardized, the journal text vectorized, joined
+into one CSR matrix in a fixed column order. train_models.py fits it, the
+bundle stores the fitted pipeline, and EmotionRiskPredictor loads it back, so
+both sides run exactly the same code on the same fitted state.
+
+Inputs are columns (a dict of equal-length arrays), not lists of dicts;
+columns_from_records() and columns_from_frame() adapt the two shapes callers
+have. Running the module checks throughput and train/serve parity:
+
+    python -m emotion_tracking.features --rows 1000000 --check-rows 5000
+"""
+
+import argparse
+import copy
+import time
+
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfVectorizer
+from sklearn.preprocessing import StandardScaler, normalize
+
+
+# Numeric model inputs, in column order; the text columns follow them
+NUMERIC_FEATURES = ['mood_numeric', 'anxiety_level', 'sleep_hours', 'energy_level', 'appetite']
+MOOD_MAPPING = {'happy': 5, 'neutral': 3, 'sad': 2, 'anxious': 1, 'angry': 1}
+# Number given to a mood missing from the mapping
+DEFAULT_MOOD_VALUE = 3
+INPUT_COLUMNS = ['mood', 'anxiety_level', 'sleep_hours', 'energy_level', 'appetite', 'journal_text']
+
+
+class HashingTfidfVectorizer:
+    """TF-IDF vectorizer that can be fitted incrementally.
+
+    Terms are hashed into a fixed number of columns, so the feature width
+    never changes as new text arrives, and document frequencies are plain
+    counts that partial_fit() adds to. The weighting matches TfidfVectorizer's
+    defaults (smoothed idf, l2-normalized rows).
+    """
+
+    def __init__(self, n_features=1024, stop_words='english'):
+        self.n_features = n_features
+        self.stop_words = stop_words
+        self.n_documents = 0
+        self.document_frequency = np.zeros(n_features, dtype=np.int64)
+        self._hasher = HashingVectorizer(
+            n_features=n_features, stop_words=stop_words, alternate_sign=False, norm=None
+        )
+
+    @property
+    def idf_(self):
+        return np.log((1 + self.n_documents) / (1 + self.document_frequency)) + 1
+
+    def partial_fit(self, texts):
+        counts = self._hasher.transform(texts)
+        # Hashed rows have no duplicate columns, so this counts documents per term
+        self.document_frequency += np.bincount(counts.indices, minlength=self.n_features)
+        self.n_documents += counts.shape[0]
+        return self
+
+    def transform(self, texts):
+        counts = self._hasher.transform(texts)
+        return normalize(counts @ sparse.diags(self.idf_), norm='l2', copy=False).tocsr()
+
+    def get_feature_names_out(self):
+        return np.array([f'hash{i}' for i in range(self.n_features)], dtype=object)
+
+
+class TermSubsetVectorizer:
+    """A fitted vectorizer that only outputs some of its columns.
+
+    Rows are weighted and l2-normalized over the full vocabulary first, as at
+    training time, and only then are the other columns dropped, so the kept
+    columns hold exactly the values the model was trained (and compacted) on.
+    """
+
+    def __init__(self, vectorizer, columns):
+        self.vectorizer = vectorizer
+        self.columns = np.asarray(columns, dtype=np.intp)
+
+    def transform(self, texts):
+        return self.vectorizer.transform(texts).tocsc()[:, self.columns].tocsr()
+
+    def get_feature_names_out(self):
+        return self.vectorizer.get_feature_names_out()[self.columns]
+
+
+def columns_from_records(records, journal_texts=None):
+    """Columns from a list of emotion_data dicts (and their journal texts)"""
+    if journal_texts is None:
+        journal_texts = [record.get('journal_text') for record in records]
+    columns = {'mood': [record['mood'] for record in records]}
+    for name in INPUT_COLUMNS[1:-1]:
+        columns[name] = np.fromiter((record[name] for record in records), dtype=np.float64, count=len(records))
+    columns['journal_text'] = [text or "" for text in journal_texts]
+    return columns
+
+
+def columns_from_frame(df):
+    """Columns from a DataFrame with the INPUT_COLUMNS"""
+    columns = {'mood': df['mood'].tolist()}
+    for name in INPUT_COLUMNS[1:-1]:
+        columns[name] = df[name].to_numpy(dtype=np.float64)
+    columns['journal_text'] = df['journal_text'].fillna('').astype(str).tolist()
+    return columns
+
+
+class FeaturePipeline:
+    """Fitted transformation from input columns to the model's CSR matrix"""
+
+    def __init__(self, vectorizer=None, scaler=None, mood_mapping=None):
+        self.vectorizer = vectorizer if vectorizer is not None else TfidfVectorizer(max_features=100, stop_words='english')
+        self.scaler = scaler if scaler is not None else StandardScaler()
+        self.mood_mapping = dict(mood_mapping or MOOD_MAPPING)
+        self.numeric_features = list(NUMERIC_FEATURES)
+
+    @property
+    def n_text_features(self):
+        if isinstance(self.vectorizer, HashingTfidfVectorizer):
+            return self.vectorizer.n_features
+        # Also covers fixed-vocabulary vectorizers that were never fitted
+        return len(self.vectorizer.get_feature_names_out())
+
+    @property
+    def n_features(self):
+        return len(self.numeric_features) + self.n_text_features
+
+    def feature_names(self):
+        return self.numeric_features + [f'text:{term}' for term in self.vectorizer.get_feature_names_out()]
+
+    def numeric(self, columns):
+        """Unscaled numeric block as a float64 (rows, 5) array"""
+        moods = columns['mood']
+        mapping, default = self.mood_mapping, DEFAULT_MOOD_VALUE
+        block = np.empty((len(moods), len(self.numeric_features)))
+        block[:, 0] = np.fromiter((mapping.get(mood, default) for mood in moods), dtype=np.float64, count=len(moods))
+        for i, name in enumerate(INPUT_COLUMNS[1:-1], start=1):
+            block[:, i] = columns[name]
+        return block
+
+    def scale(self, numeric):
+        # The same arithmetic as StandardScaler.transform, without its
+        # per-call validation
+        return (numeric - self.scaler.mean_) / self.scaler.scale_
+
+    def text(self, texts):
+        """Text block as CSR; empty texts give all-zero rows"""
+        if not any(texts):
+            return sparse.csr_matrix((len(texts), self.n_text_features))
+        return self.vectorizer.transform(texts)
+
+    def combine(self, scaled_numeric, text_features):
+        return sparse.hstack([sparse.csr_matrix(scaled_numeric), text_features], format='csr')
+
+    def transform(self, columns):
+        """Model input matrix for the given columns"""
+        return self.combine(self.scale(self.numeric(columns)), self.text(columns['journal_text']))
+
+    def fit(self, columns):
+        self.scaler.fit(self.numeric(columns))
+        self.vectorizer.fit(columns['journal_text'])
+        return self
+
+    def partial_fit(self, columns):
+        """Update the scaler and vectorizer statistics (incremental training)"""
+        self.scaler.partial_fit(self.numeric(columns))
+        self.vectorizer.partial_fit(columns['journal_text'])
+        return self
+
+    def fit_transform(self, columns):
+        return self.fit(columns).transform(columns)
+
+    def with_vectorizer(self, vectorizer):
+        """Copy of this pipeline using another (e.g. compacted) vectorizer"""
+        pipeline = copy.copy(self)
+        pipeline.vectorizer = vectorizer
+        return pipeline
+
+
+def same_matrix(a, b):
+    """True if two CSR matrices are byte-for-byte identical"""
+    a, b = a.tocsr(), b.tocsr()
+    a.sort_indices()
+    b.sort_indices()
+    return (
+        a.shape == b.shape
+        and a.dtype == b.dtype
+        and np.array_equal(a.indptr, b.indptr)
+        and a.indices.tobytes() == b.indices.tobytes()
+        and a.data.tobytes() == b.data.tobytes()
+    )
+
+
+def check_parity(n_rows=5000):
+    """Compare the training feature matrix with both serving paths.
+
+    Returns (batch_identical, single_identical).
+    """
+    from emotion_tracking.synthetic_data import generate_synthetic_data
+    from emotion_tracking.train_models import build_features
+
+    df = generate_synthetic_data(n_rows)
+    X_train, _, pipeline = build_features(df)
+
+    # What the API hands the predictor: emotion_data dicts plus texts
+    records = df[INPUT_COLUMNS[:-1]].to_dict('records')
+    texts = df['journal_text'].tolist()
+    X_batch = pipeline.transform(columns_from_records(records, texts))
+    X_single = sparse.vstack(
+        [pipeline.transform(columns_from_records([record], [text])) for record, text in zip(records, texts)],
+        format='csr',
+    )
+    return same_matrix(X_train, X_batch), same_matrix(X_train, X_single)
+
+
+def measure_throughput(n_rows=1_000_000, fit_rows=2000):
+    """Rows/sec of transform() on n_rows, from a frame and from records"""
+    from emotion_tracking.synthetic_data import generate_synthetic_data_fast
+
+    df = generate_synthetic_data_fast(n_rows)
+    pipeline = FeaturePipeline().fit(columns_from_frame(df.head(fit_rows)))
+
+    start = time.perf_counter()
+    X = pipeline.transform(columns_from_frame(df))
+    frame_seconds = time.perf_counter() - start
+
+    records = df[INPUT_COLUMNS[:-1]].to_dict('records')
+    texts = df['journal_text'].tolist()
+    start = time.perf_counter()
+    pipeline.transform(columns_from_records(records, texts))
+    records_seconds = time.perf_counter() - start
+    return {
+        'rows': n_rows,
+        'features': X.shape[1],
+        'frame_rows_per_sec': n_rows / frame_seconds,
+        'records_rows_per_sec': n_rows / records_seconds,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000, help='rows for the throughput run')
+    parser.add_argument('--check-rows', type=int, default=5000, help='rows for the train/serve parity check')
+    args = parser.parse_args()
+
+    batch_identical, single_identical = check_parity(args.check_rows)
+    print(f"Train vs serve (batch):  {'identical' if batch_identical else 'DIFFERENT'}")
+    print(f"Train vs serve (single): {'identical' if single_identical else 'DIFFERENT'}")
+
+    results = measure_throughput(args.rows)
+    print(f"Throughput on {results['rows']:,} rows x {results['features']} features:")
+    print(f"  from a DataFrame: {results['frame_rows_per_sec']:,.0f} rows/sec")
+    print(f"  from records:     {results['records_rows_per_sec']:,.0f} rows/sec")
+    raise SystemExit(0 if batch_identical and single_identical else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+Incremental retraining on real EmotionEntry history.
+
+Labelled entries are streamed from the database in (labelled at, id) order
+with QuerySet.iterator(), so the table is never loaded whole. Rows are collected
+into batches; each batch first updates the scaler (StandardScaler.partial_fit)
+and the hashed TF-IDF document frequencies, then grows the warm-started
+forest by a few trees fitted on that batch. The oldest trees are dropped once
+the forest reaches max_trees, so it tracks recent history.
+
+The resume state (the last (updated_at, id) consumed, row counts) is stored in
+the published bundle's manifest, so a nightly run continues from the bundle
+that is actually serving and only reads rows labelled since it was trained.
+
+Labels come from LABEL_SOURCES:
+
+* 'confirmed' (the default): the risk category a clinician confirmed for the
+  entry (EmotionEntry.confirmed_risk_category, set in the admin), ordered by
+  risk_confirmed_at. Entries nobody reviewed are skipped.
+* 'predicted': the entry's stored risk_category, i.e. the serving model's
+  own prediction. This is self-training: the forest is distilled from the
+  model it replaces, learns nothing the model did not already predict and
+  can reinforce its mistakes. It must be chosen explicitly
+  (ML_INCREMENTAL_LABELS or --labels) and is only useful for exercising the
+  pipeline.
+
+A bundle trained from one source is not continued with the other.
+
+Scaler and idf statistics keep moving after a tree is grown, so older trees
+see slightly shifted inputs; with a long history the statistics settle and
+the shift becomes negligible.
+"""
+
+import time
+from datetime import datetime
+from itertools import islice
+
+import numpy as np
+from django.db.models import Q
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score
+from sklearn.preprocessing import StandardScaler
+
+from . import model_bundle
+from .features import FeaturePipeline, HashingTfidfVectorizer
+from .ml_models import DEFAULT_MODEL_DIR
+from .models import EmotionEntry, RiskAssessment
+from .train_models import compile_forest, save_bundle
+
+
+CLASSES = sorted(category for category, _ in RiskAssessment.RISK_CATEGORIES)
+# (label column, column the checkpoint follows) per label source
+LABEL_SOURCES = {
+    'confirmed': ('confirmed_risk_category', 'risk_confirmed_at'),
+    'predicted': ('risk_category', 'updated_at'),
+}
+DEFAULT_LABEL_SOURCE = 'confirmed'
+FEATURE_FIELDS = ('mood', 'anxiety_level', 'sleep_hours', 'energy_level', 'appetite', 'journal_text')
+DEFAULT_FOREST_PARAMS = {'max_depth': 10}
+
+
+class IncrementalTrainer:
+    """Resumable training loop over EmotionEntry rows"""
+
+    def __init__(self, model_dir=None, chunk_size=2000, batch_rows=5000, trees_per_batch=10,
+                 max_trees=200, forest_params=None, text_features=1024, labels=DEFAULT_LABEL_SOURCE):
+        if labels not in LABEL_SOURCES:
+            raise ValueError(f"labels must be one of {', '.join(LABEL_SOURCES)}")
+        self.model_dir = model_dir or DEFAULT_MODEL_DIR
+        self.labels = labels
+        self.chunk_size = chunk_size
+        self.batch_rows = batch_rows
+        self.trees_per_batch = trees_per_batch
+        self.max_trees = max_trees
+        self.forest_params = forest_params or DEFAULT_FOREST_PARAMS
+        self.text_features = text_features
+
+        self.model = None
+        self.pipeline = None
+        self.state = None
+
+    def load_state(self, reset=False):
+        """Resume from the published bundle, or start empty.
+
+        Bundles not written by this pipeline (e.g. the synthetic model from
+        train_models.py) have no resume state and are not continued, nor
+        are bundles trained from another label source. Bundles from before
+        label sources were recorded were trained on predictions.
+        """
+        manifest_state = None
+        if not reset and model_bundle.current_version(self.model_dir):
+            bundle = model_bundle.read_bundle(self.model_dir, mmap_mode=None)
+            manifest_state = bundle.manifest.get('training')
+            if manifest_state is not None and manifest_state.get('labels', 'predicted') != self.labels:
+                manifest_state = None
+            if manifest_state is not None:
+                self.model = bundle.objects['risk_model']
+                self.pipeline = bundle.objects.get('feature_pipeline') or FeaturePipeline(
+                    bundle.objects['text_vectorizer'], bundle.objects['scaler'], bundle.manifest['mood_mapping']
+                )
+                self.state = manifest_state
+
+        if manifest_state is None:
+            self.model = None
+            self.pipeline = FeaturePipeline(HashingTfidfVectorizer(n_features=self.text_features), StandardScaler())
+            self.state = {'checkpoint': None, 'rows_seen': 0, 'batches': 0}
+        self.state['labels'] = self.labels
+        return self.state
+
+    def pending_rows(self):
+        """(id, labelled at, *FEATURE_FIELDS, label) of rows labelled since the checkpoint, oldest first"""
+        label, labelled_at = LABEL_SOURCES[self.labels]
+        queryset = EmotionEntry.objects.filter(**{f'{label}__in': CLASSES, f'{labelled_at}__isnull': False})
+        checkpoint = self.state['checkpoint']
+        if checkpoint is not None:
+            # Checkpoints of bundles trained on predictions before label sources used updated_at
+            since = datetime.fromisoformat(checkpoint.get('labelled_at') or checkpoint['updated_at'])
+            queryset = queryset.filter(
+                Q(**{f'{labelled_at}__gt': since}) | Q(**{labelled_at: since, 'id__gt': checkpoint['id']})
+            )
+        return queryset.order_by(labelled_at, 'id').values_list(
+            'id', labelled_at, *FEATURE_FIELDS, label
+        ).iterator(chunk_size=self.chunk_size)
+
+    def _columns(self, rows):
+        """Pipeline input columns and labels from pending_rows() tuples"""
+        fields = list(zip(*rows))
+        columns = {'mood': fields[2], 'journal_text': [text or "" for text in fields[7]]}
+        for name, values in zip(('anxiety_level', 'sleep_hours', 'energy_level', 'appetite'), fields[3:7]):
+            columns[name] = np.asarray(values, dtype=np.float64)
+        return columns, np.asarray(fields[8])
+
+    def train_batch(self, rows):
+        """Fold one batch into the statistics and grow the forest on it.
+
+        Returns (accuracy, X): the accuracy of the forest on the batch before
+        it was trained on it (None for a new forest) and the batch's features.
+        """
+        columns, y = self._columns(rows)
+        X = self.pipeline.partial_fit(columns).transform(columns)
+
+        holdout_accuracy = None
+        if self.model is None:
+            self.model = RandomForestClassifier(
+                n_estimators=self.trees_per_batch, warm_start=True, random_state=42, **self.forest_params
+            )
+        else:
+            holdout_accuracy = float(accuracy_score(y, self.model.predict(X)))
+            self.model.n_estimators = len(self.model.estimators_) + self.trees_per_batch
+        self.model.fit(X, y)
+
+        if len(self.model.estimators_) > self.max_trees:
+            self.model.estimators_ = self.model.estimators_[-self.max_trees:]
+            self.model.n_estimators = self.max_trees
+
+        last = rows[-1]
+        self.state = {
+            'checkpoint': {'labelled_at': last[1].isoformat(), 'id': last[0]},
+            'rows_seen': self.state['rows_seen'] + len(rows),
+            'batches': self.state['batches'] + 1,
+            'labels': self.labels,
+        }
+        return holdout_accuracy, X
+
+    def run(self, reset=False, stdout=None):
+        """Train on every new row and publish a bundle; returns its version.
+
+        Returns None when there were not enough new rows for a batch. Rows left
+        over after the last full batch are read again on the next run.
+        """
+        write = stdout.write if stdout else print
+        self.load_state(reset=reset)
+        start = time.perf_counter()
+
+        rows = self.pending_rows()
+        buffer = []
+        accuracies = []
+        X_last = None
+        while True:
+            chunk = list(islice(rows, self.chunk_size))
+            buffer.extend(chunk)
+            # Warm-started trees must agree on the forest's class list, so a
+            # batch is only closed once it contains every class
+            if len(buffer) >= self.batch_rows and {row[8] for row in buffer} >= set(CLASSES):
+                accuracy, X_last = self.train_batch(buffer)
+                if accuracy is not None:
+                    accuracies.append(accuracy)
+                write(f"Batch {self.state['batches']}: {len(buffer)} rows, {len(self.model.estimators_)} trees"
+                      + (f", accuracy before update {accuracy:.3f}" if accuracy is not None else ""))
+                buffer = []
+            if not chunk:
+                break
+
+        if X_last is None:
+            write(f"Not enough newly labelled rows ({self.labels}) for a batch "
+                  f"({len(buffer)} pending, need {self.batch_rows})")
+            return None
+
+        compiled = compile_forest(self.model, X_last)
+        metrics = {
+            'rows_seen': self.state['rows_seen'],
+            'trees': len(self.model.estimators_),
+            'prequential_accuracy': float(np.mean(accuracies)) if accuracies else None,
+            'labels': self.labels,
+            'params': {**self.forest_params, 'trees_per_batch': self.trees_per_batch, 'max_trees': self.max_trees},
+        }
+        version = save_bundle(self.model_dir, self.model, self.pipeline, compiled, metrics,
+                              training=self.state)
+        write(f"Published bundle {version} after {time.perf_counter() - start:.1f}s "
+              f"({len(buffer)} rows left for the next run)")
+        return version
@@ -0,0 +1,115 @@
+import json
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from emotion_tracking.catalogue import FACTORS, RECOMMENDATIONS
+from emotion_tracking.models import EmotionEntry, RiskAssessment
+from emotion_tracking.renderers import FastJSONRenderer, orjson
+from emotion_tracking.serializers import (
+    EmotionEntryListSerializer, EmotionEntrySerializer, RiskAssessmentListSerializer, RiskAssessmentSerializer,
+)
+
+
+# Sparse fieldsets a history/trend screen would ask for
+SPARSE_FIELDS = {
+    'entries': ['id', 'date', 'mood', 'risk_score', 'risk_category'],
+    'risk assessments': ['id', 'date', 'risk_category', 'risk_score'],
+}
+
+
+class Command(BaseCommand):
+    help = ("Compare list serialization (DRF serializer + JSONRenderer) with the .values()-based "
+            "list serializers and FastJSONRenderer on throwaway rows (rolled back)")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000, help='entries and assessments to serialize')
+        parser.add_argument('--repeats', type=int, default=5, help='runs per variant (median reported)')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = self._populate(options['rows'])
+            failures = self._run(user, options['rows'], options['repeats'])
+            transaction.set_rollback(True)
+        if failures:
+            raise CommandError("\n".join(failures))
+
+    def _populate(self, n_rows):
+        rng = random.Random(0)
+        user = get_user_model().objects.create_user('serialization-benchmark', password=None)
+        today = timezone.now().date()
+        moods = [mood for mood, _ in EmotionEntry.MOOD_CHOICES]
+        words = ['tired', 'calm', 'worried', 'slept', 'baby', 'better', 'alone', 'walk', 'happy', 'crying']
+        factor_codes, recommendation_codes = list(FACTORS), list(RECOMMENDATIONS)
+        # bulk_create skips the per-entry summary upkeep, which is not measured here
+        EmotionEntry.objects.bulk_create([
+            EmotionEntry(
+                user=user, date=today - timedelta(days=i), mood=rng.choice(moods),
+                anxiety_level=rng.randint(1, 5), sleep_hours=round(rng.uniform(3, 10), 1),
+                energy_level=rng.randint(1, 5), appetite=rng.randint(1, 5),
+                journal_text=' '.join(rng.choices(words, k=rng.randint(5, 40))),
+                risk_score=rng.random(), risk_category=rng.choice(['low', 'moderate', 'high']),
+            )
+            for i in range(n_rows)
+        ], batch_size=2000)
+        RiskAssessment.objects.bulk_create([
+            RiskAssessment(
+                user=user, date=today - timedelta(days=i), risk_category=rng.choice(['low', 'moderate', 'high']),
+                risk_score=rng.random(),
+                factor_codes=rng.sample(factor_codes, 2),
+                recommendation_codes=rng.sample(recommendation_codes, 3),
+                feature_contributions={'mood': rng.random(), 'sleep': rng.random(), 'journal': rng.random()},
+                model_version='benchmark',
+            )
+            for i in range(n_rows)
+        ], batch_size=2000)
+        return user
+
+    def _time(self, function, repeats):
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            body = function()
+            timings.append(time.perf_counter() - start)
+        return statistics.median(timings), body
+
+    def _run(self, user, n_rows, repeats):
+        variants = {
+            'entries': (EmotionEntry, EmotionEntrySerializer, EmotionEntryListSerializer),
+            'risk assessments': (RiskAssessment, RiskAssessmentSerializer, RiskAssessmentListSerializer),
+        }
+        failures = []
+        self.stdout.write(f"{n_rows} rows, median of {repeats} runs (query + serialize + render); "
+                          f"orjson {'installed' if orjson else 'missing, JSONRenderer used'}")
+        self.stdout.write(f"{'':18s}{'variant':34s}{'time':>10s}{'rows/sec':>12s}{'bytes':>12s}")
+        for name, (model, serializer_class, list_serializer_class) in variants.items():
+            queryset = model.objects.filter(user=user).order_by('-date', '-id')
+
+            def current():
+                return JSONRenderer().render(serializer_class(queryset, many=True).data)
+
+            def lean(fields=None):
+                serializer = list_serializer_class(fields)
+                return FastJSONRenderer().render(serializer.to_representation(serializer.values(queryset)))
+
+            results = {
+                'serializer + JSONRenderer': self._time(current, repeats),
+                'values() + FastJSONRenderer': self._time(lean, repeats),
+                f'  ?fields={",".join(SPARSE_FIELDS[name])}': self._time(lambda: lean(SPARSE_FIELDS[name]), repeats),
+            }
+            baseline = results['serializer + JSONRenderer'][0]
+            for variant, (seconds, body) in results.items():
+                speedup = '' if seconds == baseline else f"  ({baseline / seconds:.1f}x)"
+                self.stdout.write(f"{name:18s}{variant:34s}{seconds * 1000:8.1f}ms"
+                                  f"{n_rows / seconds:12,.0f}{len(body):12,d}{speedup}")
+
+            if json.loads(results['values() + FastJSONRenderer'][1]) != json.loads(results['serializer + JSONRenderer'][1]):
+                failures.append(f"{name}: lean serialization differs from {serializer_class.__name__}")
+        return failures
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from emotion_tracking.models import EmotionEntry, EmotionSummary, WeeklyEmotionRollup
+from emotion_tracking.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Recompute every user's streak summary and emotion rollups from their entries"
+
+    def handle(self, *args, **options):
+        user_ids = set(EmotionEntry.objects.values_list('user_id', flat=True).distinct())
+        # Users whose entries are all gone keep stale rows otherwise
+        user_ids.update(EmotionSummary.objects.exclude(last_entry_date=None).values_list('user_id', flat=True))
+        user_ids.update(WeeklyEmotionRollup.objects.values_list('user_id', flat=True).distinct())
+        days = 0
+        for user_id in sorted(user_ids):
+            EmotionSummary.refresh(user_id)
+            days += rebuild_rollups(user_id)
+        self.stdout.write(f"Rebuilt streaks and rollups for {len(user_ids)} users ({days} days)")
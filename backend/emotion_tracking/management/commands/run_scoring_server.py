@@ -0,0 +1,92 @@
+import os
+import signal
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from emotion_tracking.model_registry import get_predictor
+from emotion_tracking.scoring_client import ScoringClient, ScoringUnavailable, server_options
+from emotion_tracking.scoring_server import ScoringServer, serve
+from emotion_tracking.synthetic_data import generate_synthetic_data_fast
+
+
+class Command(BaseCommand):
+    help = "Serve risk predictions to web workers over a Unix domain socket"
+
+    def add_arguments(self, parser):
+        options = server_options()
+        parser.add_argument('--socket', default=options['SOCKET'], help='socket path (default ML_SCORING_SOCKET)')
+        parser.add_argument('--max-wait-ms', type=float, default=options['MAX_WAIT_MS'],
+                            help='how long a batch waits for more requests')
+        parser.add_argument('--max-batch-rows', type=int, default=options['MAX_BATCH_ROWS'],
+                            help='rows that close a batch early')
+        parser.add_argument('--check', type=int, metavar='N',
+                            help='serve on a temporary socket, score N entries through it from '
+                                 'concurrent clients, compare with in-process scoring and exit')
+        parser.add_argument('--clients', type=int, default=16, help='concurrent clients for --check')
+
+    def handle(self, *args, **options):
+        max_wait = options['max_wait_ms'] / 1000
+        if options['check']:
+            self._check(options['check'], options['clients'], max_wait, options['max_batch_rows'])
+            return
+        if not options['socket']:
+            raise CommandError("No socket path: pass --socket or set ML_SCORING_SOCKET")
+        self.stdout.write(f"Serving predictions on {options['socket']}")
+        # Process managers stop the daemon with SIGTERM; exit through the
+        # normal shutdown path so the socket file is removed
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+        try:
+            serve(options['socket'], max_wait=max_wait, max_rows=options['max_batch_rows'])
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping scoring server")
+
+    def _check(self, n_rows, n_clients, max_wait, max_rows):
+        """End-to-end run on this machine: parity, latency, batching and fallback"""
+        df = generate_synthetic_data_fast(n_rows)
+        entries = df[['mood', 'anxiety_level', 'sleep_hours', 'energy_level', 'appetite']].to_dict('records')
+        texts = df['journal_text'].tolist()
+        expected = get_predictor().predict_risk_batch(entries, texts)
+
+        socket_path = os.path.join(tempfile.mkdtemp(), 'scoring.sock')
+        server = ScoringServer(socket_path, max_wait=max_wait, max_rows=max_rows)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        client = ScoringClient(socket_path, pool_size=n_clients)
+
+        def score(i):
+            start = time.perf_counter()
+            result = client.predict_risk_batch([entries[i]], [texts[i]])[0]
+            return result, time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=n_clients) as pool:
+            outcomes = list(pool.map(score, range(n_rows)))
+        elapsed = time.perf_counter() - start
+
+        mismatches = sum(result != reference for (result, _), reference in zip(outcomes, expected))
+        latencies = np.array([seconds for _, seconds in outcomes]) * 1000
+        self.stdout.write(f"{n_rows} single-entry requests from {n_clients} clients in {elapsed:.2f}s "
+                          f"({n_rows / elapsed:,.0f} rows/sec)")
+        self.stdout.write(f"Latency: p50 {np.percentile(latencies, 50):.2f} ms, "
+                          f"p99 {np.percentile(latencies, 99):.2f} ms")
+        self.stdout.write(f"Batches: {server.batcher.batches} "
+                          f"(avg {server.batcher.rows / max(server.batcher.batches, 1):.1f} rows)")
+        self.stdout.write(f"Results differing from in-process scoring: {mismatches}")
+
+        server.shutdown()
+        server.server_close()
+        try:
+            client.predict_risk_batch(entries[:1], texts[:1])
+        except ScoringUnavailable:
+            self.stdout.write("Stopped server reported as unavailable (callers fall back to in-process)")
+        else:
+            raise CommandError("Client still answered after the server stopped")
+        client.close()
+        if mismatches:
+            raise CommandError(f"{mismatches} results differ from in-process scoring")
@@ -0,0 +1,54 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from emotion_tracking.scoring_queue import new_worker_id, queue_options, run_once
+
+
+class Command(BaseCommand):
+    help = "Run a pool of workers that score queued emotion entries"
+
+    def add_arguments(self, parser):
+        options = queue_options()
+        parser.add_argument('--workers', type=int, default=2, help='number of worker threads')
+        parser.add_argument('--batch-size', type=int, default=options['BATCH_SIZE'])
+        parser.add_argument('--poll-interval', type=float, default=options['POLL_INTERVAL'],
+                            help='seconds to wait when the queue is empty')
+        parser.add_argument('--once', action='store_true', help='exit once the queue is drained')
+
+    def handle(self, *args, **options):
+        stop = threading.Event()
+        threads = [
+            threading.Thread(target=self._work, args=(stop, options), name=f'scoring-worker-{i}', daemon=True)
+            for i in range(options['workers'])
+        ]
+        self.stdout.write(f"Starting {len(threads)} scoring workers")
+        for thread in threads:
+            thread.start()
+        try:
+            while any(thread.is_alive() for thread in threads):
+                time.sleep(0.2)
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping workers...")
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+    def _work(self, stop, options):
+        worker_id = new_worker_id()
+        processed = 0
+        try:
+            while not stop.is_set():
+                close_old_connections()
+                claimed = run_once(worker_id, options['batch_size'])
+                processed += claimed
+                if claimed:
+                    continue
+                if options['once']:
+                    break
+                stop.wait(options['poll_interval'])
+        finally:
+            close_old_connections()
+            self.stdout.write(f"Worker {worker_id} processed {processed} jobs")
@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from emotion_tracking.incremental_training import DEFAULT_LABEL_SOURCE, LABEL_SOURCES, IncrementalTrainer
+
+
+class Command(BaseCommand):
+    help = "Update the risk model with emotion entries changed since the last run"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000, help='rows fetched per database round trip')
+        parser.add_argument('--batch-rows', type=int, default=5000, help='rows per forest update')
+        parser.add_argument('--trees-per-batch', type=int, default=10)
+        parser.add_argument('--max-trees', type=int, default=200, help='oldest trees are dropped beyond this')
+        parser.add_argument('--max-depth', type=int, default=10)
+        parser.add_argument('--labels', choices=sorted(LABEL_SOURCES),
+                            default=getattr(settings, 'ML_INCREMENTAL_LABELS', DEFAULT_LABEL_SOURCE),
+                            help="'confirmed': clinician-confirmed risk categories (default); "
+                                 "'predicted': the model's own predictions (self-training)")
+        parser.add_argument('--reset', action='store_true',
+                            help='ignore the published bundle and train from the first row')
+
+    def handle(self, *args, **options):
+        trainer = IncrementalTrainer(
+            model_dir=getattr(settings, 'ML_MODEL_DIR', None),
+            chunk_size=options['chunk_size'],
+            batch_rows=options['batch_rows'],
+            trees_per_batch=options['trees_per_batch'],
+            max_trees=options['max_trees'],
+            forest_params={'max_depth': options['max_depth']},
+            labels=options['labels'],
+        )
+        if options['labels'] == 'predicted':
+            self.stderr.write("Training on the model's own predictions (self-training): "
+                              "no ground truth is involved")
+        trainer.run(reset=options['reset'], stdout=self.stdout)
@@ -0,0 +1,101 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:36
+
+from django.db import migrations, models
+
+
+# Frozen copy of the catalogue as it was when assessments stored text, so this
+# migration keeps working if emotion_tracking.catalogue grows later
+FACTORS = {
+    1: ('sleep', 'Poor sleep may be affecting your wellbeing'),
+    2: ('sleep', 'Excessive sleep might indicate low energy'),
+    3: ('anxiety', 'High anxiety levels detected'),
+    4: ('mood', 'Current mood (sad) may need attention'),
+    5: ('mood', 'Current mood (angry) may need attention'),
+    6: ('mood', 'Current mood (anxious) may need attention'),
+    7: ('energy', 'Low energy levels detected'),
+    8: ('appetite', 'Poor appetite may indicate stress'),
+}
+RECOMMENDATIONS = {
+    1: "Continue maintaining your current routine",
+    2: "Practice daily gratitude exercises",
+    3: "Stay connected with your support system",
+    4: "Get regular gentle exercise like walking",
+    5: "Try deep breathing exercises for 5 minutes daily",
+    6: "Consider talking to a friend or family member",
+    7: "Maintain a consistent sleep schedule",
+    8: "Practice self-care activities you enjoy",
+    9: "Limit caffeine and screen time before bed",
+    10: "Consider reaching out to a healthcare professional",
+    11: "Contact postpartum support helpline: 1-800-PPD-MOMS",
+    12: "Ask your partner or family for additional support",
+    13: "Prioritize rest and recovery",
+    14: "Don't hesitate to seek professional help",
+    15: "Try to get at least 7-8 hours of sleep",
+    16: "Practice mindfulness or meditation",
+}
+
+
+def text_to_codes(apps, schema_editor):
+    RiskAssessment = apps.get_model('emotion_tracking', 'RiskAssessment')
+    factor_codes = {factor: code for code, factor in FACTORS.items()}
+    recommendation_codes = {text: code for code, text in RECOMMENDATIONS.items()}
+
+    batch = []
+    for assessment in RiskAssessment.objects.only('id', 'contributing_factors', 'recommendations').iterator(chunk_size=2000):
+        # Text that is not in the catalogue cannot be represented and is dropped
+        assessment.factor_codes = [
+            factor_codes[item] for item in (assessment.contributing_factors or {}).items() if item in factor_codes
+        ]
+        assessment.recommendation_codes = [
+            recommendation_codes[text] for text in (assessment.recommendations or []) if text in recommendation_codes
+        ]
+        batch.append(assessment)
+        if len(batch) >= 2000:
+            RiskAssessment.objects.bulk_update(batch, ['factor_codes', 'recommendation_codes'])
+            batch = []
+    RiskAssessment.objects.bulk_update(batch, ['factor_codes', 'recommendation_codes'])
+
+
+def codes_to_text(apps, schema_editor):
+    RiskAssessment = apps.get_model('emotion_tracking', 'RiskAssessment')
+
+    batch = []
+    for assessment in RiskAssessment.objects.only('id', 'factor_codes', 'recommendation_codes').iterator(chunk_size=2000):
+        assessment.contributing_factors = dict(FACTORS[code] for code in assessment.factor_codes if code in FACTORS)
+        assessment.recommendations = [
+            RECOMMENDATIONS[code] for code in assessment.recommendation_codes if code in RECOMMENDATIONS
+        ]
+        batch.append(assessment)
+        if len(batch) >= 2000:
+            RiskAssessment.objects.bulk_update(batch, ['contributing_factors', 'recommendations'])
+            batch = []
+    RiskAssessment.objects.bulk_update(batch, ['contributing_factors', 'recommendations'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('emotion_tracking', '0003_scoringjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='riskassessment',
+            name='factor_codes',
+            field=models.JSONField(default=list),
+        ),
+        migrations.AddField(
+            model_name='riskassessment',
+            name='recommendation_codes',
+            field=models.JSONField(default=list),
+        ),
+        migrations.RunPython(text_to_codes, codes_to_text),
+        migrations.RemoveField(
+            model_name='riskassessment',
+            name='contributing_factors',
+        ),
+        migrations.RemoveField(
+            model_name='riskassessment',
+            name='recommendations',
+        ),
+    ]
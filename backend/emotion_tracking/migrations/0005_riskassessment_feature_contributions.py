@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('emotion_tracking', '0004_riskassessment_codes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='riskassessment',
+            name='feature_contributions',
+            field=models.JSONField(default=dict),
+        ),
+    ]
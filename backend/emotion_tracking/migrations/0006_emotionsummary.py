@@ -0,0 +1,31 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:58
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('emotion_tracking', '0005_riskassessment_feature_contributions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmotionSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('current_streak', models.PositiveIntegerField(default=0)),
+                ('longest_streak', models.PositiveIntegerField(default=0)),
+                ('streak_start', models.DateField(blank=True, null=True)),
+                ('last_entry_date', models.DateField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='emotion_summary', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'emotion summaries',
+            },
+        ),
+    ]
@@ -0,0 +1,103 @@
+# Generated by Django 4.2.7 on 2026-10-17 00:00
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+MOODS = ('happy', 'sad', 'angry', 'anxious', 'neutral')
+SUM_FIELDS = ('entries', 'anxiety_sum', 'sleep_sum', 'energy_sum', 'appetite_sum',
+              'risk_sum', 'risk_count', *(f'{mood}_count' for mood in MOODS))
+
+
+def backfill_rollups(apps, schema_editor):
+    EmotionEntry = apps.get_model('emotion_tracking', 'EmotionEntry')
+    DailyEmotionRollup = apps.get_model('emotion_tracking', 'DailyEmotionRollup')
+    WeeklyEmotionRollup = apps.get_model('emotion_tracking', 'WeeklyEmotionRollup')
+    db = schema_editor.connection.alias
+
+    daily, weeks = [], {}
+    for entry in EmotionEntry.objects.using(db).order_by().iterator(chunk_size=2000):
+        values = {
+            'entries': 1,
+            'anxiety_sum': entry.anxiety_level,
+            'sleep_sum': entry.sleep_hours,
+            'energy_sum': entry.energy_level,
+            'appetite_sum': entry.appetite,
+            'risk_sum': entry.risk_score or 0,
+            'risk_count': int(entry.risk_score is not None),
+            **{f'{mood}_count': int(entry.mood == mood) for mood in MOODS},
+        }
+        daily.append(DailyEmotionRollup(user_id=entry.user_id, date=entry.date, **values))
+        week = weeks.setdefault((entry.user_id, entry.date - timedelta(days=entry.date.weekday())), {})
+        for field in SUM_FIELDS:
+            week[field] = week.get(field, 0) + values[field]
+        if len(daily) >= 2000:
+            DailyEmotionRollup.objects.using(db).bulk_create(daily)
+            daily = []
+    DailyEmotionRollup.objects.using(db).bulk_create(daily)
+    WeeklyEmotionRollup.objects.using(db).bulk_create(
+        [WeeklyEmotionRollup(user_id=user_id, week_start=start, **totals)
+         for (user_id, start), totals in weeks.items()],
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('emotion_tracking', '0006_emotionsummary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WeeklyEmotionRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entries', models.PositiveIntegerField(default=0)),
+                ('anxiety_sum', models.IntegerField(default=0)),
+                ('sleep_sum', models.FloatField(default=0)),
+                ('energy_sum', models.IntegerField(default=0)),
+                ('appetite_sum', models.IntegerField(default=0)),
+                ('risk_sum', models.FloatField(default=0)),
+                ('risk_count', models.PositiveIntegerField(default=0)),
+                ('happy_count', models.PositiveIntegerField(default=0)),
+                ('sad_count', models.PositiveIntegerField(default=0)),
+                ('angry_count', models.PositiveIntegerField(default=0)),
+                ('anxious_count', models.PositiveIntegerField(default=0)),
+                ('neutral_count', models.PositiveIntegerField(default=0)),
+                ('week_start', models.DateField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'week_start')},
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyEmotionRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entries', models.PositiveIntegerField(default=0)),
+                ('anxiety_sum', models.IntegerField(default=0)),
+                ('sleep_sum', models.FloatField(default=0)),
+                ('energy_sum', models.IntegerField(default=0)),
+                ('appetite_sum', models.IntegerField(default=0)),
+                ('risk_sum', models.FloatField(default=0)),
+                ('risk_count', models.PositiveIntegerField(default=0)),
+                ('happy_count', models.PositiveIntegerField(default=0)),
+                ('sad_count', models.PositiveIntegerField(default=0)),
+                ('angry_count', models.PositiveIntegerField(default=0)),
+                ('anxious_count', models.PositiveIntegerField(default=0)),
+                ('neutral_count', models.PositiveIntegerField(default=0)),
+                ('date', models.DateField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'date')},
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
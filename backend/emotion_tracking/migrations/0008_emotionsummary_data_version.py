@@ -0,0 +1,24 @@
+# Generated by Django 4.2.7 on 2026-10-17 00:03
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('emotion_tracking', '0007_emotion_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='emotionsummary',
+            name='data_changed_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='emotionsummary',
+            name='data_version',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-17 00:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('emotion_tracking', '0008_emotionsummary_data_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='emotionentry',
+            name='confirmed_risk_category',
+            field=models.CharField(blank=True, choices=[('low', 'Low Risk'), ('moderate', 'Moderate Risk'), ('high', 'High Risk')], max_length=20, null=True),
+        ),
+        migrations.AddField(
+            model_name='emotionentry',
+            name='risk_confirmed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
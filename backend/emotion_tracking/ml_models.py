@@ -1,162 +1,536 @@
 import os
-import joblib
 import numpy as np
-import pandas as pd
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.linear_model import LogisticRegression
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.preprocessing import StandardScaler
-from datetime import datetime, timedelta
+from scipy import sparse
+
+from . import catalogue, model_bundle
+# HashingTfidfVectorizer is re-exported so bundles pickled while it lived in
+# this module still load
+from .features import (
+    MOOD_MAPPING, NUMERIC_FEATURES, FeaturePipeline, HashingTfidfVectorizer, columns_from_records,
+)
+
+
+DEFAULT_MODEL_DIR = model_bundle.DEFAULT_MODEL_DIR
+
+# Inputs that risk_score is attributed to: the numeric features, then all
+# journal text columns together
+ATTRIBUTION_GROUPS = ['mood', 'anxiety_level', 'sleep_hours', 'energy_level', 'appetite', 'journal_text']
+
+
+class CompiledForest:
+    """Array-backed copy of a fitted RandomForestClassifier.
+
+    All trees are flattened into contiguous arrays indexed by a global node id,
+    so one loop of max_depth vectorized steps walks every tree for every row.
+    Leaves point to themselves, which lets shallow trees idle until the
+    deepest tree finishes. Results match sklearn's predict_proba exactly.
+    """
+    ARRAYS = ('feature', 'threshold', 'children_left', 'children_right', 'value', 'roots', 'classes', 'n_features')
+    CHUNK_ROWS = 4096
+    SMALL_BATCH_ROWS = 64
+
+    def __init__(self, feature, threshold, children_left, children_right, value, roots, classes, n_features):
+        # np.asarray drops the np.memmap subclass (and its per-operation
+        # overhead) while still sharing the mapped pages
+        self.feature = np.asarray(feature)
+        self.threshold = np.asarray(threshold)
+        self.children_left = np.asarray(children_left)
+        self.children_right = np.asarray(children_right)
+        self.value = np.asarray(value)
+        self.roots = np.asarray(roots)
+        self.classes = np.asarray(classes)
+        self.n_features = int(np.asarray(n_features).item())
+        self.max_depth = self._depth()
+        self._path_contributions = {}
+        self._class_values = None
+    
+    @classmethod
+    def from_sklearn(cls, model):
+        """Flatten the trees of a fitted forest"""
+        import sklearn
+        
+        # Before 1.4 trees store class counts and predict_proba normalizes
+        # them; newer versions store the fractions and return them unchanged.
+        normalize_leaves = tuple(int(part) for part in sklearn.__version__.split('.')[:2]) < (1, 4)
+        
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            node_ids = np.arange(tree.node_count)
+            is_leaf = tree.children_left == -1
+            
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(tree.threshold)
+            lefts.append(np.where(is_leaf, node_ids, tree.children_left) + offset)
+            rights.append(np.where(is_leaf, node_ids, tree.children_right) + offset)
+            
+            # Leaf output exactly as DecisionTreeClassifier.predict_proba returns it
+            value = tree.value[:, 0, :]
+            if normalize_leaves:
+                normalizer = value.sum(axis=1, keepdims=True)
+                normalizer[normalizer == 0.0] = 1.0
+                value = value / normalizer
+            values.append(value)
+            
+            roots.append(offset)
+            offset += tree.node_count
+        
+        return cls(
+            feature=np.ascontiguousarray(np.concatenate(features), dtype=np.intp),
+            threshold=np.ascontiguousarray(np.concatenate(thresholds), dtype=np.float64),
+            children_left=np.ascontiguousarray(np.concatenate(lefts), dtype=np.intp),
+            children_right=np.ascontiguousarray(np.concatenate(rights), dtype=np.intp),
+            value=np.ascontiguousarray(np.concatenate(values), dtype=np.float64),
+            roots=np.asarray(roots, dtype=np.intp),
+            classes=np.asarray(model.classes_, dtype=str),
+            n_features=model.n_features_in_,
+        )
+    
+    @classmethod
+    def from_arrays(cls, arrays):
+        return cls(**{name: arrays[name] for name in cls.ARRAYS})
+    
+    def to_arrays(self):
+        return {name: np.asarray(getattr(self, name)) for name in self.ARRAYS}
+    
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as arrays:
+            return cls.from_arrays(arrays)
+    
+    def save(self, path):
+        np.savez(path, **self.to_arrays())
+    
+    def _subset(self, roots, feature=None, children_right=None, n_features=None):
+        """Forest of the given roots with unreachable nodes removed and ids renumbered"""
+        feature = self.feature if feature is None else feature
+        children_right = self.children_right if children_right is None else children_right
+        keep = self._reachable_from(roots, children_right)
+        new_id = np.full(len(self.feature), -1, dtype=np.intp)
+        new_id[keep] = np.arange(len(keep))
+        index_dtype = self.children_left.dtype
+        return CompiledForest(
+            feature=feature[keep],
+            threshold=self.threshold[keep],
+            children_left=new_id[self.children_left[keep]].astype(index_dtype),
+            children_right=new_id[children_right[keep]].astype(index_dtype),
+            value=self.value[keep],
+            roots=new_id[np.asarray(roots)].astype(self.roots.dtype),
+            classes=self.classes,
+            n_features=self.n_features if n_features is None else n_features,
+        )
+    
+    def _reachable_from(self, roots, children_right):
+        reachable = np.zeros(len(self.feature), dtype=bool)
+        frontier = np.asarray(roots)
+        while frontier.size:
+            reachable[frontier] = True
+            children = np.concatenate([self.children_left[frontier], children_right[frontier]])
+            frontier = np.unique(children[~reachable[children]])
+        return np.flatnonzero(reachable)
+    
+    def select_trees(self, indices):
+        """Forest made of the given trees, summed in the given order"""
+        return self._subset(self.roots[np.asarray(indices)])
+    
+    def drop_features(self, keep):
+        """Forest over only the columns in keep (ascending column indices).
+
+        Dropped columns are treated as always zero: splits on them take the
+        left branch, which is exact for non-negative features such as TF-IDF
+        weights, and the subtrees that become unreachable are removed.
+        """
+        keep = np.asarray(keep)
+        column = np.full(self.n_features, -1, dtype=np.intp)
+        column[keep] = np.arange(len(keep))
+        is_leaf = self.children_left == np.arange(len(self.feature))
+        dropped = (column[self.feature] == -1) & ~is_leaf
+        children_right = np.where(dropped, self.children_left, self.children_right)
+        feature = np.where(dropped | is_leaf, 0, column[self.feature]).astype(self.feature.dtype)
+        return self._subset(self.roots, feature=feature, children_right=children_right, n_features=len(keep))
+    
+    def to_float32(self):
+        """Copy with float32 thresholds and leaf values and int32 node ids.
+
+        Each threshold is rounded down to the nearest float32, so every
+        float32 input still takes the same branch as with float64 thresholds.
+        """
+        threshold = self.threshold.astype(np.float32)
+        rounded_up = threshold.astype(np.float64) > self.threshold
+        threshold[rounded_up] = np.nextafter(threshold[rounded_up], np.float32(-np.inf))
+        return CompiledForest(
+            feature=self.feature.astype(np.int32),
+            threshold=threshold,
+            children_left=self.children_left.astype(np.int32),
+            children_right=self.children_right.astype(np.int32),
+            value=self.value.astype(np.float32),
+            roots=self.roots.astype(np.int32),
+            classes=self.classes,
+            n_features=self.n_features,
+        )
+    
+    @property
+    def nbytes(self):
+        return sum(np.asarray(getattr(self, name)).nbytes for name in self.ARRAYS if name != 'n_features')
+    
+    def _depth(self):
+        """Number of steps needed for every root to reach a leaf"""
+        nodes = self.roots.copy()
+        depth = 0
+        while True:
+            is_leaf = self.children_left[nodes] == nodes
+            if is_leaf.all():
+                return depth
+            nodes = nodes[~is_leaf]
+            nodes = np.concatenate([self.children_left[nodes], self.children_right[nodes]])
+            depth += 1
+    
+    def predict_proba(self, X):
+        """Class probabilities for a dense array or a CSR matrix"""
+        if not sparse.issparse(X):
+            X = np.asarray(X)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"Expected {self.n_features} features, got shape {X.shape}")
+        if X.shape[0] <= self.CHUNK_ROWS:
+            return self._predict_proba_chunk(X)
+        return np.vstack([
+            self._predict_proba_chunk(X[start:start + self.CHUNK_ROWS])
+            for start in range(0, X.shape[0], self.CHUNK_ROWS)
+        ])
+    
+    def _predict_proba_chunk(self, X):
+        return self._leaf_proba(self._leaves(X))
+    
+    def _leaves(self, X):
+        """(trees, rows) array of the leaf each row reaches in each tree"""
+        # Only one chunk is ever densified, so sparse input stays bounded in memory
+        if sparse.issparse(X):
+            X = X.toarray()
+        # sklearn evaluates splits on float32 inputs against float64 thresholds
+        X = np.asarray(X, dtype=np.float32)
+        rows = np.arange(X.shape[0])
+        nodes = np.repeat(self.roots[:, None], X.shape[0], axis=1)
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.children_left[nodes], self.children_right[nodes])
+        return nodes
+    
+    def _leaf_proba(self, leaves):
+        # Sum trees sequentially in estimator order, as the forest does
+        if leaves.shape[1] <= self.SMALL_BATCH_ROWS:
+            leaf_values = self.value[leaves]
+            return np.add.accumulate(leaf_values, axis=0, dtype=np.float64)[-1] / len(self.roots)
+        
+        # Larger batches: one contiguous gather per class and in-place adds
+        # instead of materializing every partial sum (same order, same result)
+        if self._class_values is None:
+            self._class_values = np.ascontiguousarray(self.value.T)
+        columns = []
+        for class_values in self._class_values:
+            tree_values = np.take(class_values, leaves)
+            total = tree_values[0].astype(np.float64)
+            for values in tree_values[1:]:
+                total += values
+            columns.append(total)
+        return np.stack(columns, axis=1) / len(self.roots)
+    
+    def path_contributions(self, column, groups):
+        """Per-node totals of tree-interpreter contributions, by feature group.
+
+        Entry [g, n] of the result sums, for feature group g, the change in
+        one class probability along the path from the tree's root to node n:
+        every edge parent -> child adds value[child] - value[parent] to the
+        group of the feature the parent splits on. A prediction's attribution
+        is then just these entries looked up at its leaves. Computed once per
+        (column, groups) and reused for every explained batch.
+        """
+        groups = np.asarray(groups)
+        key = (column, groups.tobytes())
+        table = self._path_contributions.get(key)
+        if table is None:
+            value = self.value[:, column].astype(np.float64)
+            table = np.zeros((len(self.feature), int(groups.max()) + 1))
+            frontier = self.roots
+            while frontier.size:
+                frontier = frontier[self.children_left[frontier] != frontier]
+                group = groups[self.feature[frontier]]
+                for children in (self.children_left[frontier], self.children_right[frontier]):
+                    table[children] = table[frontier]
+                    table[children, group] += value[children] - value[frontier]
+                frontier = np.concatenate([self.children_left[frontier], self.children_right[frontier]])
+            # One contiguous row per group makes the per-leaf lookups cheap
+            table = self._path_contributions[key] = np.ascontiguousarray(table.T)
+        return table
+    
+    def explain(self, X, column, groups, leaf_finder=None):
+        """Probabilities plus per-group contributions to one class column.
+
+        groups maps each input column to a group index (e.g. all TF-IDF
+        columns to one group). Returns (probabilities, contributions, bias)
+        where, per row, bias + contributions.sum() equals
+        probabilities[:, column]. leaf_finder(X) may supply the (trees, rows)
+        leaf ids instead of the NumPy walk, e.g. from the sklearn forest.
+        """
+        if not sparse.issparse(X):
+            X = np.asarray(X)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"Expected {self.n_features} features, got shape {X.shape}")
+        table = self.path_contributions(column, groups)
+        leaf_finder = leaf_finder or self._leaves
+        probabilities, contributions = [], []
+        for start in range(0, X.shape[0], self.CHUNK_ROWS):
+            leaves = leaf_finder(X[start:start + self.CHUNK_ROWS])
+            probabilities.append(self._leaf_proba(leaves))
+            contributions.append(np.stack([np.take(group, leaves).sum(axis=0) for group in table], axis=1) / len(self.roots))
+        if len(probabilities) == 1:
+            return probabilities[0], contributions[0], self._bias(column)
+        return np.vstack(probabilities), np.vstack(contributions), self._bias(column)
+    
+    def _bias(self, column):
+        # Average root value: the prediction before any split is applied
+        return float(self.value[self.roots, column].astype(np.float64).mean())
+    
+    def predict(self, X):
+        """Return (probabilities, categories) from a single pass"""
+        probabilities = self.predict_proba(X)
+        return probabilities, self.classes[np.argmax(probabilities, axis=1)]
 
 
 class EmotionRiskPredictor:
-    def __init__(self):
-        self.model_dir = os.path.join(os.path.dirname(__file__), 'saved_models')
-        os.makedirs(self.model_dir, exist_ok=True)
+    # Pre-bundle artifact layout, still loaded when no bundle is published
+    ARTIFACTS = ('risk_model.pkl', 'text_vectorizer.pkl', 'scaler.pkl')
+    COMPILED_FOREST = 'risk_model_compiled.npz'
+    # Above this many rows sklearn's Cython tree walk beats the NumPy evaluator
+    COMPILED_MAX_ROWS = 256
+    # Column of predict_proba reported as risk_score and explained by feature_contributions
+    RISK_SCORE_COLUMN = 1
+    WARM_UP_ENTRY = {'mood': 'neutral', 'anxiety_level': 3, 'sleep_hours': 7.0, 'energy_level': 3, 'appetite': 3}
+
+    def __init__(self, model_dir=None, model_version=None):
+        self.model_dir = model_dir or DEFAULT_MODEL_DIR
+        self.model_version = model_version
         
         self.risk_model = None
-        self.text_vectorizer = None
-        self.scaler = None
+        self.compiled_forest = None
+        self.feature_pipeline = None
+        self.manifest = None
+        self._attribution_groups = None
         self.load_models()
     
     def load_models(self):
         """Load pre-trained models"""
+        if model_bundle.current_version(self.model_dir):
+            self.load_bundle()
+        else:
+            self.load_legacy_models()
+    
+    def load_bundle(self):
+        """Load the published bundle, memory-mapping its arrays"""
+        try:
+            bundle = model_bundle.read_bundle(self.model_dir)
+        except model_bundle.BundleError as e:
+            print(f"Could not load model bundle: {e}")
+            return
+        
+        self.manifest = bundle.manifest
+        self.model_version = self.model_version or bundle.version
+        # Compact bundles ship only the compiled forest
+        self.risk_model = bundle.objects.get('risk_model')
+        self.feature_pipeline = bundle.objects.get('feature_pipeline')
+        if self.feature_pipeline is None:
+            # Bundles from before the shared pipeline store its parts
+            self.feature_pipeline = FeaturePipeline(
+                bundle.objects['text_vectorizer'], bundle.objects['scaler'], bundle.manifest['mood_mapping']
+            )
+        if 'forest' in bundle.arrays:
+            self.compiled_forest = CompiledForest.from_arrays(bundle.arrays['forest'])
+    
+    def load_legacy_models(self):
+        """Load the separate pickles written before model bundles"""
+        import joblib
+        
         try:
             self.risk_model = joblib.load(os.path.join(self.model_dir, 'risk_model.pkl'))
-            self.text_vectorizer = joblib.load(os.path.join(self.model_dir, 'text_vectorizer.pkl'))
-            self.scaler = joblib.load(os.path.join(self.model_dir, 'scaler.pkl'))
+            self.feature_pipeline = FeaturePipeline(
+                joblib.load(os.path.join(self.model_dir, 'text_vectorizer.pkl')),
+                joblib.load(os.path.join(self.model_dir, 'scaler.pkl')),
+            )
         except FileNotFoundError:
             print("Models not found. Please train the models first using train_models.py")
+            return
+        
+        compiled_path = os.path.join(self.model_dir, self.COMPILED_FOREST)
+        if os.path.exists(compiled_path):
+            compiled_forest = CompiledForest.load(compiled_path)
+            # Ignore an export left over from a previous training run
+            if compiled_forest.roots.shape[0] == len(self.risk_model.estimators_):
+                self.compiled_forest = compiled_forest
+    
+    @property
+    def is_loaded(self):
+        return self.risk_model is not None or self.compiled_forest is not None
+    
+    def warm_up(self):
+        """Run throwaway predictions through every code path.
+
+        Builds the per-model caches (attribution tables, per-class leaf
+        values) and triggers lazy imports, so the first real request is not
+        slow and, when called before a server forks, all of it is shared.
+        """
+        if not self.is_loaded:
+            return
+        text = "feeling okay today"
+        self.predict_risk(self.WARM_UP_ENTRY, text)
+        # Large enough for the sklearn leaf lookup and the large-batch summation
+        rows = self.COMPILED_MAX_ROWS + 1
+        self.predict_risk_batch([self.WARM_UP_ENTRY] * rows, [text] * rows)
+    
+    @property
+    def text_vectorizer(self):
+        return self.feature_pipeline.vectorizer if self.feature_pipeline else None
+    
+    @property
+    def scaler(self):
+        return self.feature_pipeline.scaler if self.feature_pipeline else None
+    
+    @property
+    def mood_mapping(self):
+        return self.feature_pipeline.mood_mapping if self.feature_pipeline else MOOD_MAPPING
+    
+    # The three stages below are the pipeline's, split out for profiling
+    # (see benchmark_models.py); predict_risk runs them through transform()
     
     def preprocess_features(self, data):
-        """Preprocess input data for ML prediction"""
-        # Convert mood to numeric
-        mood_mapping = {'happy': 5, 'neutral': 3, 'sad': 2, 'anxious': 1, 'angry': 1}
-        
-        features = []
-        for entry in data:
-            feature_vector = [
-                mood_mapping.get(entry['mood'], 3),
-                entry['anxiety_level'],
-                entry['sleep_hours'],
-                entry['energy_level'],
-                entry['appetite'],
-            ]
-            features.append(feature_vector)
-        
-        features = np.array(features)
-        
-        # Scale features
-        if self.scaler:
-            features = self.scaler.transform(features)
-        
-        return features
+        """Scaled numeric features for a list of emotion_data dicts"""
+        return self.feature_pipeline.scale(self.feature_pipeline.numeric(columns_from_records(data)))
+    
+    @property
+    def text_feature_count(self):
+        """Width of the text block, taken from the fitted vectorizer"""
+        if self.feature_pipeline is not None:
+            return self.feature_pipeline.n_text_features
+        if self.risk_model is not None:
+            return self.risk_model.n_features_in_ - len(NUMERIC_FEATURES)
+        if self.compiled_forest is not None:
+            return self.compiled_forest.n_features - len(NUMERIC_FEATURES)
+        return 0
     
     def extract_text_features(self, journal_text):
-        """Extract features from journal text"""
-        if not journal_text or not self.text_vectorizer:
-            return np.zeros((1, 100))  # Return zero vector if no text or model
+        """Extract features from journal text as a 1-row CSR matrix"""
+        return self.extract_text_features_batch([journal_text])
+    
+    def extract_text_features_batch(self, journal_texts):
+        """Extract features for many journal texts with a single transform"""
+        return self.feature_pipeline.text([text or "" for text in journal_texts])
+    
+    def combine_features(self, numeric_features, text_features):
+        """Join scaled numeric columns and text columns into one CSR matrix"""
+        return self.feature_pipeline.combine(numeric_features, text_features)
+    
+    @property
+    def attribution_groups(self):
+        """Index into ATTRIBUTION_GROUPS for every model input column"""
+        n_features = self.compiled_forest.n_features
+        if self._attribution_groups is None or len(self._attribution_groups) != n_features:
+            # Numeric columns map to themselves, every text column to 'journal_text'
+            self._attribution_groups = np.minimum(np.arange(n_features), len(NUMERIC_FEATURES))
+        return self._attribution_groups
+    
+    def _sklearn_leaves(self, combined_features):
+        # apply() gives per-tree local node ids; the compiled forest numbers
+        # nodes globally, each tree starting at its root
+        return self.risk_model.apply(combined_features).T + self.compiled_forest.roots[:, None]
+    
+    def _predict(self, combined_features):
+        """Return (probabilities, categories, contributions) from a single forest pass.
+
+        contributions holds one row of per-feature contributions to risk_score
+        per entry (see ATTRIBUTION_GROUPS), or is None for models without a
+        compiled forest.
+        """
+        if self.compiled_forest is not None:
+            leaf_finder = None
+            if self.risk_model is not None and combined_features.shape[0] > self.COMPILED_MAX_ROWS:
+                leaf_finder = self._sklearn_leaves
+            probabilities, contributions, _ = self.compiled_forest.explain(
+                combined_features, self.RISK_SCORE_COLUMN, self.attribution_groups, leaf_finder
+            )
+            return probabilities, self.compiled_forest.classes[np.argmax(probabilities, axis=1)], contributions
         
-        text_features = self.text_vectorizer.transform([journal_text])
-        return text_features.toarray()
+        # predict() would be argmax over the same probabilities; skip the second pass
+        probabilities = self.risk_model.predict_proba(combined_features)
+        return probabilities, self.risk_model.classes_[np.argmax(probabilities, axis=1)], None
     
     def predict_risk(self, emotion_data, journal_text=""):
         """Predict risk category and score"""
-        if not self.risk_model:
+        if not self.is_loaded:
             return {
                 'risk_score': 0.5,
                 'risk_category': 'moderate',
                 'contributing_factors': {},
+                'recommendations': [],
+                'factor_codes': [],
+                'recommendation_codes': [],
+                'feature_contributions': {},
+                'model_version': None,
                 'error': 'Model not loaded'
             }
         
-        # Preprocess numeric features
-        numeric_features = self.preprocess_features([emotion_data])
+        # Same feature code, and fitted state, as training
+        combined_features = self.feature_pipeline.transform(columns_from_records([emotion_data], [journal_text]))
         
-        # Extract text features if available
-        text_features = self.extract_text_features(journal_text)
+        # Make prediction
+        probabilities, categories, contributions = self._predict(combined_features)
+        risk_score = probabilities[0, self.RISK_SCORE_COLUMN]
+        risk_category = categories[0]
         
-        # Combine features
-        combined_features = np.hstack([numeric_features, text_features])
+        # Contributing factors and recommendations come from the catalogue
+        if contributions is not None:
+            contributions = np.round(contributions[0], 4).tolist()
+        return self._result(emotion_data, risk_score, risk_category, contributions)
+    
+    def predict_risk_batch(self, emotion_data_list, journal_texts=None):
+        """Predict risk for many entries in one vectorized pass.
+
+        Returns one result per entry, identical to calling predict_risk on
+        each entry individually.
+        """
+        if journal_texts is None:
+            journal_texts = [""] * len(emotion_data_list)
+        if len(journal_texts) != len(emotion_data_list):
+            raise ValueError("journal_texts must have one item per entry")
         
-        # Make prediction
-        risk_score = self.risk_model.predict_proba(combined_features)[0, 1]  # Probability of high risk
-        risk_category = self.risk_model.predict(combined_features)[0]
+        if not self.is_loaded:
+            return [self.predict_risk(emotion_data) for emotion_data in emotion_data_list]
+        if not emotion_data_list:
+            return []
         
-        # Determine contributing factors
-        contributing_factors = self._analyze_contributing_factors(emotion_data, risk_score)
+        combined_features = self.feature_pipeline.transform(columns_from_records(emotion_data_list, journal_texts))
         
-        # Generate recommendations
-        recommendations = self._generate_recommendations(risk_category, emotion_data)
+        probabilities, risk_categories, contributions = self._predict(combined_features)
+        risk_scores = probabilities[:, self.RISK_SCORE_COLUMN]
+        # Rounded once for the whole batch; Python floats from here on
+        contributions = [None] * len(emotion_data_list) if contributions is None else np.round(contributions, 4).tolist()
         
+        return [
+            self._result(emotion_data, risk_score, risk_category, row_contributions)
+            for emotion_data, risk_score, risk_category, row_contributions
+            in zip(emotion_data_list, risk_scores, risk_categories, contributions)
+        ]
+    
+    def _result(self, emotion_data, risk_score, risk_category, contributions=None):
+        """Prediction dict with factor and recommendation codes and their text"""
+        factor_codes = catalogue.factor_codes(emotion_data)
+        recommendation_codes = catalogue.recommendation_codes(risk_category, emotion_data)
+        feature_contributions = {} if contributions is None else dict(zip(ATTRIBUTION_GROUPS, contributions))
         return {
             'risk_score': float(risk_score),
             'risk_category': risk_category,
-            'contributing_factors': contributing_factors,
-            'recommendations': recommendations
+            'contributing_factors': catalogue.expand_factors(factor_codes),
+            'recommendations': catalogue.expand_recommendations(recommendation_codes),
+            'factor_codes': factor_codes,
+            'recommendation_codes': recommendation_codes,
+            'feature_contributions': feature_contributions,
+            'model_version': self.model_version
         }
-    
-    def _analyze_contributing_factors(self, emotion_data, risk_score):
-        """Analyze which factors contribute most to risk score"""
-        factors = {}
-        
-        # Sleep analysis
-        if emotion_data['sleep_hours'] < 6:
-            factors['sleep'] = 'Poor sleep may be affecting your wellbeing'
-        elif emotion_data['sleep_hours'] > 9:
-            factors['sleep'] = 'Excessive sleep might indicate low energy'
-        
-        # Anxiety analysis
-        if emotion_data['anxiety_level'] >= 4:
-            factors['anxiety'] = 'High anxiety levels detected'
-        
-        # Mood analysis
-        if emotion_data['mood'] in ['sad', 'angry', 'anxious']:
-            factors['mood'] = f'Current mood ({emotion_data["mood"]}) may need attention'
-        
-        # Energy analysis
-        if emotion_data['energy_level'] <= 2:
-            factors['energy'] = 'Low energy levels detected'
-        
-        # Appetite analysis
-        if emotion_data['appetite'] <= 2:
-            factors['appetite'] = 'Poor appetite may indicate stress'
-        
-        return factors
-    
-    def _generate_recommendations(self, risk_category, emotion_data):
-        """Generate personalized recommendations based on risk category"""
-        recommendations = []
-        
-        if risk_category == 'low':
-            recommendations = [
-                "Continue maintaining your current routine",
-                "Practice daily gratitude exercises",
-                "Stay connected with your support system",
-                "Get regular gentle exercise like walking"
-            ]
-        elif risk_category == 'moderate':
-            recommendations = [
-                "Try deep breathing exercises for 5 minutes daily",
-                "Consider talking to a friend or family member",
-                "Maintain a consistent sleep schedule",
-                "Practice self-care activities you enjoy",
-                "Limit caffeine and screen time before bed"
-            ]
-        else:  # high
-            recommendations = [
-                "Consider reaching out to a healthcare professional",
-                "Contact postpartum support helpline: 1-800-PPD-MOMS",
-                "Ask your partner or family for additional support",
-                "Prioritize rest and recovery",
-                "Don't hesitate to seek professional help"
-            ]
-        
-        # Add specific recommendations based on data
-        if emotion_data['sleep_hours'] < 6:
-            recommendations.append("Try to get at least 7-8 hours of sleep")
-        
-        if emotion_data['anxiety_level'] >= 4:
-            recommendations.append("Practice mindfulness or meditation")
-        
-        return recommendations
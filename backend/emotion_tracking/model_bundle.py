@@ -0,0 +1,198 @@
+"""
+Versioned model bundles.
+
+A bundle is one directory holding everything a predictor needs, described by
+a manifest (feature order, mood mapping, vocabulary size, per-file SHA-256 and
+an overall checksum):
+
+    saved_models/
+        CURRENT                     name of the published bundle
+        bundles/<version>/
+            manifest.json
+            objects/<name>.joblib   fitted sklearn objects
+            arrays/<group>/<name>.npy
+
+Large numeric arrays are plain .npy files so they can be loaded with
+mmap_mode='r' and shared read-only between worker processes. A bundle is
+written to a temporary directory, renamed into place and only then published
+by atomically replacing CURRENT, so readers never see a partial or mixed set
+of artifacts.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+from types import SimpleNamespace
+
+
+DEFAULT_MODEL_DIR = os.path.join(os.path.dirname(__file__), 'saved_models')
+FORMAT_VERSION = 1
+CURRENT_FILE = 'CURRENT'
+BUNDLES_DIR = 'bundles'
+MANIFEST_FILE = 'manifest.json'
+
+
+class BundleError(Exception):
+    """A bundle is missing, incomplete or fails its checksum"""
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _combined_checksum(files):
+    lines = ''.join(f"{name}:{files[name]}\n" for name in sorted(files))
+    return hashlib.sha256(lines.encode()).hexdigest()
+
+
+def _fsync_dir(path):
+    if os.name == 'posix':
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+def current_version(model_dir):
+    """Name of the published bundle, or None if nothing has been published"""
+    try:
+        with open(os.path.join(model_dir, CURRENT_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def write_bundle(model_dir, objects, arrays, manifest, keep=3):
+    """Write and publish a bundle; returns its version.
+
+    objects maps names to picklable objects, arrays maps group names to
+    {name: ndarray} dicts, and manifest holds the descriptive fields.
+    The `keep` most recent bundles are retained for readers still using them.
+    """
+    import joblib
+    import numpy as np
+
+    bundles_dir = os.path.join(model_dir, BUNDLES_DIR)
+    os.makedirs(bundles_dir, exist_ok=True)
+    tmp_dir = os.path.join(bundles_dir, f'.tmp-{uuid.uuid4().hex}')
+    os.makedirs(tmp_dir)
+
+    try:
+        files = {}
+        for name, obj in objects.items():
+            relpath = os.path.join('objects', f'{name}.joblib')
+            path = os.path.join(tmp_dir, relpath)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Uncompressed so numpy arrays inside can be memory-mapped on load
+            joblib.dump(obj, path)
+            files[relpath] = _file_sha256(path)
+
+        for group, group_arrays in arrays.items():
+            for name, array in group_arrays.items():
+                relpath = os.path.join('arrays', group, f'{name}.npy')
+                path = os.path.join(tmp_dir, relpath)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                np.save(path, np.ascontiguousarray(array), allow_pickle=False)
+                files[relpath] = _file_sha256(path)
+
+        checksum = _combined_checksum(files)
+        version = f"{time.strftime('%Y%m%d-%H%M%S')}-{checksum[:8]}"
+        manifest = {
+            **manifest,
+            'format': FORMAT_VERSION,
+            'version': version,
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'objects': sorted(objects),
+            'arrays': {group: sorted(group_arrays) for group, group_arrays in arrays.items()},
+            'files': files,
+            'checksum': checksum,
+        }
+        with open(os.path.join(tmp_dir, MANIFEST_FILE), 'w') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+            f.flush()
+            os.fsync(f.fileno())
+
+        bundle_dir = os.path.join(bundles_dir, version)
+        os.rename(tmp_dir, bundle_dir)
+        _fsync_dir(bundles_dir)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    # Publish: readers switch over in one rename
+    pointer_tmp = os.path.join(model_dir, f'.{CURRENT_FILE}.{uuid.uuid4().hex}')
+    with open(pointer_tmp, 'w') as f:
+        f.write(version + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(pointer_tmp, os.path.join(model_dir, CURRENT_FILE))
+    _fsync_dir(model_dir)
+
+    _prune(bundles_dir, keep=keep, current=version)
+    return version
+
+
+def _prune(bundles_dir, keep, current):
+    versions = sorted(
+        name for name in os.listdir(bundles_dir)
+        if not name.startswith('.') and os.path.isdir(os.path.join(bundles_dir, name))
+    )
+    for name in versions[:-keep] if keep else []:
+        if name != current:
+            shutil.rmtree(os.path.join(bundles_dir, name), ignore_errors=True)
+
+
+def read_bundle(model_dir, version=None, mmap_mode='r', verify=True):
+    """Load a bundle (the published one by default).
+
+    Returns a namespace with manifest, objects and arrays. With mmap_mode set,
+    arrays are memory-mapped read-only instead of copied into the process.
+    """
+    # Imported on use: current_version() must stay cheap for processes that
+    # only check which bundle is published
+    import joblib
+    import numpy as np
+
+    version = version or current_version(model_dir)
+    if version is None:
+        raise BundleError(f"No model bundle published in {model_dir}")
+    bundle_dir = os.path.join(model_dir, BUNDLES_DIR, version)
+
+    try:
+        with open(os.path.join(bundle_dir, MANIFEST_FILE)) as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        raise BundleError(f"Bundle {version} has no manifest")
+    if manifest.get('format') != FORMAT_VERSION:
+        raise BundleError(f"Unsupported bundle format {manifest.get('format')!r}")
+
+    files = manifest['files']
+    if verify:
+        for relpath, expected in files.items():
+            path = os.path.join(bundle_dir, relpath)
+            if not os.path.exists(path) or _file_sha256(path) != expected:
+                raise BundleError(f"Bundle {version}: {relpath} is missing or corrupt")
+        if _combined_checksum(files) != manifest['checksum']:
+            raise BundleError(f"Bundle {version}: manifest checksum mismatch")
+
+    objects = {
+        name: joblib.load(os.path.join(bundle_dir, 'objects', f'{name}.joblib'), mmap_mode=mmap_mode)
+        for name in manifest['objects']
+    }
+    arrays = {
+        group: {
+            name: np.load(os.path.join(bundle_dir, 'arrays', group, f'{name}.npy'),
+                          mmap_mode=mmap_mode, allow_pickle=False)
+            for name in names
+        }
+        for group, names in manifest['arrays'].items()
+    }
+    return SimpleNamespace(version=version, manifest=manifest, objects=objects, arrays=arrays)
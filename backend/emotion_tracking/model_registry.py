@@ -0,0 +1,203 @@
+"""
+Process-wide registry for the emotion risk models.
+
+The trained artifacts are loaded once per process and shared by every request.
+When train_models.py writes new artifacts the registry notices the change on
+disk and swaps in a freshly loaded predictor, so a retrain never needs a
+worker restart.
+
+predict_risk() and predict_risk_batch() are the entry points for the views:
+they score through the current predictor and the prediction cache, or through
+the scoring daemon when ML_SCORING_SERVER['SOCKET'] is set (falling back to
+this process if the daemon cannot answer).
+"""
+
+import gc
+import hashlib
+import os
+import threading
+import time
+
+from django.conf import settings
+
+from . import model_bundle
+from .prediction_cache import get_prediction_cache, prediction_key
+from .scoring_client import ScoringUnavailable, get_scoring_client
+
+
+def artifact_version(model_dir):
+    """Version of the artifacts a predictor would load from model_dir.
+
+    This is the published bundle's version. For the older layout of separate
+    pickles it is a short id derived from each file's mtime and size, or None
+    while any required file is missing.
+    """
+    version = model_bundle.current_version(model_dir)
+    if version is not None:
+        return version
+
+    from .ml_models import EmotionRiskPredictor
+    parts = []
+    for name in EmotionRiskPredictor.ARTIFACTS + (EmotionRiskPredictor.COMPILED_FOREST,):
+        try:
+            stat = os.stat(os.path.join(model_dir, name))
+        except FileNotFoundError:
+            if name in EmotionRiskPredictor.ARTIFACTS:
+                return None
+            continue
+        parts.append(f"{name}:{stat.st_mtime_ns}:{stat.st_size}")
+    return hashlib.sha1('|'.join(parts).encode()).hexdigest()[:12]
+
+
+class ModelRegistry:
+    """Thread-safe holder of the current EmotionRiskPredictor"""
+
+    def __init__(self, model_dir=None, check_interval=5.0):
+        self.model_dir = model_dir or model_bundle.DEFAULT_MODEL_DIR
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._predictor = None
+        self._last_check = 0.0
+        self._reload_listeners = []
+
+    @property
+    def version(self):
+        predictor = self._predictor
+        return predictor.model_version if predictor else None
+
+    def get_predictor(self):
+        """Return the current predictor, reloading it if the artifacts changed"""
+        predictor = self._predictor
+        if predictor is not None and time.monotonic() - self._last_check < self.check_interval:
+            return predictor
+
+        # Only the first caller blocks on the initial load. Once a predictor
+        # exists, concurrent requests keep using it while one thread reloads.
+        if not self._lock.acquire(blocking=predictor is None):
+            return predictor
+        try:
+            if self._predictor is None or time.monotonic() - self._last_check >= self.check_interval:
+                self._refresh()
+            return self._predictor
+        finally:
+            self._lock.release()
+
+    def add_reload_listener(self, callback):
+        """Call callback(predictor) whenever a new predictor is swapped in"""
+        self._reload_listeners.append(callback)
+
+    def reload(self):
+        """Force a reload from disk, e.g. right after training"""
+        with self._lock:
+            self._refresh(force=True)
+            return self._predictor
+
+    def _refresh(self, force=False):
+        # The ML stack (numpy, scipy, sklearn) is imported on the first
+        # load, not when the views are imported
+        from .ml_models import EmotionRiskPredictor
+
+        version = artifact_version(self.model_dir)
+        current = self._predictor
+        if force or current is None or version != current.model_version:
+            # Build the new predictor completely before publishing it; the
+            # attribute assignment is the atomic swap.
+            predictor = EmotionRiskPredictor(model_dir=self.model_dir, model_version=version)
+            if not predictor.is_loaded and current is not None and current.is_loaded:
+                # Keep serving the working model; the load is retried next check
+                self._last_check = time.monotonic()
+                return
+            predictor.warm_up()
+            self._predictor = predictor
+            for callback in self._reload_listeners:
+                callback(predictor)
+        self._last_check = time.monotonic()
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                registry = ModelRegistry(
+                    model_dir=getattr(settings, 'ML_MODEL_DIR', None),
+                    check_interval=getattr(settings, 'ML_MODEL_RELOAD_INTERVAL', 5.0),
+                )
+                cache = get_prediction_cache()
+                if cache is not None:
+                    registry.add_reload_listener(lambda predictor: cache.clear())
+                _registry = registry
+    return _registry
+
+
+def get_predictor():
+    return get_registry().get_predictor()
+
+
+def preload_models(freeze=True):
+    """Load and warm up the model ahead of the first request.
+
+    Called from backend/wsgi.py. Under a pre-forking server that imports the
+    WSGI module in its master process (gunicorn --preload) the workers then
+    inherit the loaded model instead of each loading a copy. freeze moves
+    every object allocated so far into the collector's permanent generation
+    (gc.freeze), so garbage collection in the workers never writes to the
+    pages holding the model and they stay shared copy-on-write.
+
+    Does nothing when predictions are delegated to the scoring server.
+    Returns the predictor, or None.
+    """
+    if get_scoring_client() is not None:
+        return None
+    predictor = get_predictor()
+    if freeze:
+        gc.collect()
+        gc.freeze()
+    return predictor
+
+
+def predict_risk(emotion_data, journal_text=""):
+    """Score one entry with the current model, using the prediction cache"""
+    return predict_risk_batch([emotion_data], [journal_text])[0]
+
+
+def predict_risk_batch(emotion_data_list, journal_texts=None):
+    """Score many entries, on the scoring daemon if one is configured"""
+    client = get_scoring_client()
+    if client is not None:
+        try:
+            return client.predict_risk_batch(emotion_data_list, journal_texts)
+        except ScoringUnavailable:
+            pass
+    return predict_risk_batch_local(emotion_data_list, journal_texts)
+
+
+def predict_risk_batch_local(emotion_data_list, journal_texts=None):
+    """Score many entries in this process; only cache misses go through the model"""
+    predictor = get_predictor()
+    cache = get_prediction_cache()
+    if journal_texts is None:
+        journal_texts = [""] * len(emotion_data_list)
+    if cache is None or predictor.model_version is None:
+        return predictor.predict_risk_batch(emotion_data_list, journal_texts)
+
+    keys = [
+        prediction_key(emotion_data, journal_text, predictor.model_version)
+        for emotion_data, journal_text in zip(emotion_data_list, journal_texts)
+    ]
+    results = [cache.get(key) for key in keys]
+    missing = [i for i, result in enumerate(results) if result is None]
+    if missing:
+        scored = predictor.predict_risk_batch(
+            [emotion_data_list[i] for i in missing],
+            [journal_texts[i] for i in missing],
+        )
+        for i, result in zip(missing, scored):
+            if 'error' not in result:
+                cache.set(keys[i], result)
+            results[i] = result
+    return results
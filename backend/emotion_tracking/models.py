@@ -1,10 +1,31 @@
-from django.db import models
+from datetime import timedelta
+
+from django.db import models, router, transaction
+from django.db.models.functions import Greatest
 from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+from .catalogue import expand_factors, expand_recommendations
+from .streaks import compute_streaks
 
 User = get_user_model()
 
+RISK_CATEGORIES = [
+    ('low', 'Low Risk'),
+    ('moderate', 'Moderate Risk'),
+    ('high', 'High Risk'),
+]
+
 
 class EmotionEntry(models.Model):
+    """One day's check-in.
+
+    save() and delete() keep the user's EmotionSummary and rollups current.
+    Queryset .update() and .delete() bypass them: follow those with
+    EmotionSummary.data_changed(user_id, recompute=True) and
+    rebuild_rollups(user_id) for the affected users, or run
+    `manage.py rebuild_emotion_summaries`.
+    """
     MOOD_CHOICES = [
         ('happy', 'Happy'),
         ('sad', 'Sad'),
@@ -41,6 +62,11 @@ class EmotionEntry(models.Model):
     # ML predictions
     risk_score = models.FloatField(null=True, blank=True)
     risk_category = models.CharField(max_length=20, null=True, blank=True)
+
+    # Ground truth confirmed by a clinician (set in the admin); the labels
+    # train_incremental learns from
+    confirmed_risk_category = models.CharField(max_length=20, choices=RISK_CATEGORIES, null=True, blank=True)
+    risk_confirmed_at = models.DateTimeField(null=True, blank=True)
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -52,20 +78,281 @@ class EmotionEntry(models.Model):
     def __str__(self):
         return f"{self.user.username} - {self.date} - {self.mood}"
 
+    _loaded_date = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Lets save() tell whether the date changed without another query
+        instance._loaded_date = instance.__dict__.get('date')
+        return instance
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        previous_date = None if adding else self._loaded_date
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using):
+            super().save(*args, **kwargs)
+            self.written(adding, previous_date, using=using)
+
+    def written(self, added, previous_date=None, using='default'):
+        """Update the user's summary, rollups and data version for a write of this entry.
+
+        Run by save(); writes that bypass it (entry_writes.py) call it in
+        their own transaction.
+        """
+        if added:
+            EmotionSummary.entry_added(self.user_id, self.date, using=using)
+        else:
+            EmotionSummary.data_changed(self.user_id, using=using, recompute=self.date != previous_date)
+        DailyEmotionRollup.entry_saved(self, previous_date, using=using)
+        self._loaded_date = self.date
+
+    def delete(self, *args, **kwargs):
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using):
+            deleted = super().delete(*args, **kwargs)
+            DailyEmotionRollup.entry_removed(self.user_id, self.date, using=using)
+            EmotionSummary.data_changed(self.user_id, using=using, recompute=True)
+        return deleted
+
+    @property
+    def risk_status(self):
+        """'pending' while the entry waits for asynchronous scoring"""
+        return 'scored' if self.risk_category else 'pending'
+
+
+class EmotionSummary(models.Model):
+    """Per-user streak record, maintained by EmotionEntry.save() and delete().
+
+    Adding an entry after the latest one extends or restarts the current
+    streak in place; anything else (deletes, date changes, backfilled days)
+    recomputes the record from the entries in one query (see streaks.py).
+
+    data_version is incremented by every entry and risk assessment write, so
+    cached responses for the user (response_cache.py) can be checked against
+    it with a single lookup. Entry writes bump it in the same UPDATE that
+    stores their streak changes.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='emotion_summary')
+    current_streak = models.PositiveIntegerField(default=0)
+    longest_streak = models.PositiveIntegerField(default=0)
+    # First and last day of the latest run of consecutive entries
+    streak_start = models.DateField(null=True, blank=True)
+    last_entry_date = models.DateField(null=True, blank=True)
+    data_version = models.PositiveBigIntegerField(default=0)
+    data_changed_at = models.DateTimeField(default=timezone.now)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'emotion summaries'
+
+    def __str__(self):
+        return f"{self.user_id}: {self.current_streak} day streak (longest {self.longest_streak})"
+
+    def streak_on(self, day):
+        """Consecutive days with an entry ending on `day`, 0 if `day` has none"""
+        if self.last_entry_date is None:
+            return 0
+        if self.streak_start <= day <= self.last_entry_date:
+            return (day - self.streak_start).days + 1
+        return 0
+
+    @classmethod
+    def entry_added(cls, user_id, day, using='default'):
+        """Account for a new entry on `day` and invalidate the user's cached responses"""
+        extends = models.Q(last_entry_date=day - timedelta(days=1))
+        current_streak = models.Case(
+            models.When(extends, then=models.F('current_streak') + 1), default=models.Value(1),
+        )
+        # One conditional UPDATE; a day at or before the latest one can merge
+        # or split runs, and those (like a missing record) are recomputed
+        updated = cls.objects.using(using).filter(user_id=user_id, last_entry_date__lt=day).update(
+            current_streak=current_streak,
+            longest_streak=Greatest('longest_streak', current_streak),
+            streak_start=models.Case(models.When(extends, then='streak_start'), default=models.Value(day)),
+            last_entry_date=day,
+            **cls._changed(),
+        )
+        if not updated:
+            cls.data_changed(user_id, using=using, recompute=True)
+
+    @classmethod
+    def refresh(cls, user_id, using='default'):
+        """Recompute one user's record from their entries"""
+        summary, _ = cls.objects.using(using).update_or_create(
+            user_id=user_id,
+            defaults=compute_streaks(EmotionEntry, user_id, using=using),
+        )
+        return summary
+
+    @classmethod
+    def _changed(cls):
+        return {'data_version': models.F('data_version') + 1, 'data_changed_at': timezone.now()}
+
+    @classmethod
+    def data_changed(cls, user_id, using='default', recompute=False):
+        """Invalidate the user's cached responses.
+
+        With recompute the streak fields are recomputed from the entries and
+        stored by the same UPDATE.
+        """
+        streaks = compute_streaks(EmotionEntry, user_id, using=using) if recompute else {}
+        updated = cls.objects.using(using).filter(user_id=user_id).update(**streaks, **cls._changed())
+        if not updated:
+            cls.refresh(user_id, using=using)
+
+    @classmethod
+    def for_user(cls, user):
+        """The user's record, computed on first use for users who predate it"""
+        try:
+            return cls.objects.get(user=user)
+        except cls.DoesNotExist:
+            return cls.refresh(user.pk)
+
+
+def week_start(day):
+    """Monday of the week containing `day`"""
+    return day - timedelta(days=day.weekday())
+
+
+class EmotionRollup(models.Model):
+    """Sums over one user's entries in a period; averages are sum / entries"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    entries = models.PositiveIntegerField(default=0)
+    anxiety_sum = models.IntegerField(default=0)
+    sleep_sum = models.FloatField(default=0)
+    energy_sum = models.IntegerField(default=0)
+    appetite_sum = models.IntegerField(default=0)
+    # Unscored entries have no risk score, so they are counted separately
+    risk_sum = models.FloatField(default=0)
+    risk_count = models.PositiveIntegerField(default=0)
+    # Mood histogram, one column per EmotionEntry.MOOD_CHOICES value
+    happy_count = models.PositiveIntegerField(default=0)
+    sad_count = models.PositiveIntegerField(default=0)
+    angry_count = models.PositiveIntegerField(default=0)
+    anxious_count = models.PositiveIntegerField(default=0)
+    neutral_count = models.PositiveIntegerField(default=0)
+
+    MOOD_COUNT_FIELDS = {mood: f'{mood}_count' for mood, _ in EmotionEntry.MOOD_CHOICES}
+    SUM_FIELDS = (
+        'entries', 'anxiety_sum', 'sleep_sum', 'energy_sum', 'appetite_sum',
+        'risk_sum', 'risk_count', *MOOD_COUNT_FIELDS.values(),
+    )
+
+    class Meta:
+        abstract = True
+
+
+class DailyEmotionRollup(EmotionRollup):
+    """One day of a user's entries, written on every entry save and delete"""
+    date = models.DateField()
+
+    class Meta:
+        unique_together = ['user', 'date']
+
+    def __str__(self):
+        return f"{self.user_id} - {self.date} ({self.entries} entries)"
+
+    @classmethod
+    def from_entry(cls, entry):
+        rollup = cls(
+            user_id=entry.user_id,
+            date=entry.date,
+            entries=1,
+            anxiety_sum=entry.anxiety_level,
+            sleep_sum=entry.sleep_hours,
+            energy_sum=entry.energy_level,
+            appetite_sum=entry.appetite,
+            risk_sum=entry.risk_score or 0,
+            risk_count=int(entry.risk_score is not None),
+        )
+        setattr(rollup, cls.MOOD_COUNT_FIELDS[entry.mood], 1)
+        return rollup
+
+    @classmethod
+    def entry_saved(cls, entry, previous_date=None, using='default'):
+        # Entries are unique per user and day, so a day's rollup is just its
+        # entry and is upserted without reading anything
+        cls.objects.using(using).bulk_create(
+            [cls.from_entry(entry)],
+            update_conflicts=True,
+            unique_fields=['user', 'date'],
+            update_fields=cls.SUM_FIELDS,
+        )
+        if previous_date is not None and previous_date != entry.date:
+            cls.entry_removed(entry.user_id, previous_date, using=using)
+        WeeklyEmotionRollup.refresh(entry.user_id, week_start(entry.date), using=using, has_entries=True)
+
+    @classmethod
+    def entries_saved(cls, entries, using='default'):
+        """entry_saved() for a batch of one user's entries that did not change date"""
+        cls.objects.using(using).bulk_create(
+            [cls.from_entry(entry) for entry in entries],
+            update_conflicts=True,
+            unique_fields=['user', 'date'],
+            update_fields=cls.SUM_FIELDS,
+        )
+        for user_id, start in sorted({(entry.user_id, week_start(entry.date)) for entry in entries}):
+            WeeklyEmotionRollup.refresh(user_id, start, using=using, has_entries=True)
+
+    @classmethod
+    def entry_removed(cls, user_id, day, using='default'):
+        cls.objects.using(using).filter(user_id=user_id, date=day).delete()
+        WeeklyEmotionRollup.refresh(user_id, week_start(day), using=using)
+
+
+class WeeklyEmotionRollup(EmotionRollup):
+    """A Monday-to-Sunday week of a user's daily rollups"""
+    week_start = models.DateField()
+
+    class Meta:
+        unique_together = ['user', 'week_start']
+
+    def __str__(self):
+        return f"{self.user_id} - week of {self.week_start} ({self.entries} entries)"
+
+    @classmethod
+    def refresh(cls, user_id, start, using='default', has_entries=False):
+        """Re-sum one week from its daily rollups.
+
+        has_entries tells that the week has at least one day row (one was
+        just saved); an existing row is then re-summed by a single UPDATE.
+        """
+        days = DailyEmotionRollup.objects.using(using).filter(
+            user_id=user_id, date__gte=start, date__lt=start + timedelta(days=7)
+        )
+        if has_entries and cls.objects.using(using).filter(user_id=user_id, week_start=start).update(**{
+            field: models.Subquery(days.values('user_id').annotate(total=models.Sum(field)).values('total'))
+            for field in cls.SUM_FIELDS
+        }):
+            return
+        totals = days.aggregate(**{field: models.Sum(field) for field in cls.SUM_FIELDS})
+        if not totals['entries']:
+            cls.objects.using(using).filter(user_id=user_id, week_start=start).delete()
+            return
+        cls.objects.using(using).bulk_create(
+            [cls(user_id=user_id, week_start=start, **totals)],
+            update_conflicts=True,
+            unique_fields=['user', 'week_start'],
+            update_fields=cls.SUM_FIELDS,
+        )
+
 
 class RiskAssessment(models.Model):
-    RISK_CATEGORIES = [
-        ('low', 'Low Risk'),
-        ('moderate', 'Moderate Risk'),
-        ('high', 'High Risk'),
-    ]
+    RISK_CATEGORIES = RISK_CATEGORIES
 
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='risk_assessments')
     date = models.DateField()
     risk_category = models.CharField(max_length=20, choices=RISK_CATEGORIES)
     risk_score = models.FloatField()
-    contributing_factors = models.JSONField(default=dict)
-    recommendations = models.JSONField(default=list)
+    # Codes from emotion_tracking.catalogue, expanded to text when serialized
+    factor_codes = models.JSONField(default=list)
+    recommendation_codes = models.JSONField(default=list)
+    # Model attribution of risk_score per input (tree-interpreter contributions)
+    feature_contributions = models.JSONField(default=dict)
+    model_version = models.CharField(max_length=64, blank=True, default='')
     
     created_at = models.DateTimeField(auto_now_add=True)
 
@@ -75,3 +362,52 @@ class RiskAssessment(models.Model):
 
     def __str__(self):
         return f"{self.user.username} - {self.date} - {self.risk_category}"
+
+    def save(self, *args, **kwargs):
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using):
+            super().save(*args, **kwargs)
+            EmotionSummary.data_changed(self.user_id, using=using)
+
+    def delete(self, *args, **kwargs):
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using):
+            deleted = super().delete(*args, **kwargs)
+            EmotionSummary.data_changed(self.user_id, using=using)
+        return deleted
+
+    @property
+    def contributing_factors(self):
+        return expand_factors(self.factor_codes)
+
+    @property
+    def recommendations(self):
+        return expand_recommendations(self.recommendation_codes)
+
+
+class ScoringJob(models.Model):
+    """Queued risk scoring for an entry, processed by run_scoring_workers"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    entry = models.OneToOneField(EmotionEntry, on_delete=models.CASCADE, related_name='scoring_job')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=64, blank=True, default='')
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default='')
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['run_after']
+        indexes = [models.Index(fields=['status', 'run_after'])]
+
+    def __str__(self):
+        return f"Scoring job for entry {self.entry_id} ({self.status})"
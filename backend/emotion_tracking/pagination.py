@@ -0,0 +1,105 @@
+"""
+Keyset pagination and query validation for the per-user list endpoints.
+
+`?fields=id,date,mood` limits the items to those fields (sparse fieldsets).
+
+Entries and risk assessments are listed newest first, ordered by (date, id)
+descending; the date is unique per user, so this is the model's Meta.ordering
+with a tie-breaker. A page is fetched with `?limit=N` (up to MAX_PAGE_SIZE).
+When more rows follow, the response carries an opaque cursor for the last row
+in an `X-Next-Cursor` header and as a `Link: <...>; rel="next"` URL; passing
+it back as `?cursor=` continues with rows strictly after that (date, id) pair.
+The database seeks straight to the cursor on the (user, date) index instead
+of skipping rows with OFFSET, so every page costs the same. The response body
+stays a plain list.
+"""
+
+import base64
+import binascii
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework.utils.urls import replace_query_param
+
+
+DEFAULT_PAGINATION_OPTIONS = {
+    'PAGE_SIZE': 100,
+    'MAX_PAGE_SIZE': 500,
+    # Upper bound for the ?days= window of the list and stats endpoints
+    'MAX_DAYS': 3660,
+}
+
+
+def pagination_options():
+    return {**DEFAULT_PAGINATION_OPTIONS, **getattr(settings, 'EMOTION_PAGINATION', {})}
+
+
+class InvalidQuery(ValueError):
+    """A query parameter is malformed or out of range"""
+
+
+def int_param(request, name, default, minimum, maximum):
+    value = request.query_params.get(name)
+    if value is None or value == '':
+        return default
+    try:
+        value = int(value)
+    except ValueError:
+        raise InvalidQuery(f"{name} must be an integer") from None
+    if not minimum <= value <= maximum:
+        raise InvalidQuery(f"{name} must be between {minimum} and {maximum}")
+    return value
+
+
+def fields_param(request, allowed):
+    """Field names from a comma-separated ?fields=, or None for all of them"""
+    value = request.query_params.get('fields', '')
+    fields = [name.strip() for name in value.split(',') if name.strip()]
+    if not fields:
+        return None
+    unknown = [name for name in fields if name not in allowed]
+    if unknown:
+        raise InvalidQuery(f"Unknown fields: {', '.join(unknown)}; choose from {', '.join(allowed)}")
+    return fields
+
+
+def window_start(request, default_days=30):
+    """First date of the validated ?days= window ending today"""
+    days = int_param(request, 'days', default_days, 0, pagination_options()['MAX_DAYS'])
+    return timezone.now().date() - timedelta(days=days)
+
+
+def encode_cursor(day, pk):
+    token = f'{day.isoformat()}.{pk}'.encode()
+    return base64.urlsafe_b64encode(token).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        token = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        day, pk = token.split('.')
+        return date.fromisoformat(day), int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidQuery("cursor is invalid") from None
+
+
+def paginate(request, queryset):
+    """(rows of one page, response headers) for a queryset of .values() rows with date and id"""
+    options = pagination_options()
+    limit = int_param(request, 'limit', options['PAGE_SIZE'], 1, options['MAX_PAGE_SIZE'])
+    queryset = queryset.order_by('-date', '-id')
+    cursor = request.query_params.get('cursor')
+    if cursor:
+        day, pk = decode_cursor(cursor)
+        queryset = queryset.filter(Q(date__lt=day) | Q(date=day, id__lt=pk))
+
+    # One extra row tells whether another page follows, without a COUNT
+    rows = list(queryset[:limit + 1])
+    if len(rows) <= limit:
+        return rows, {}
+    rows = rows[:limit]
+    next_cursor = encode_cursor(rows[-1]['date'], rows[-1]['id'])
+    url = replace_query_param(request.build_absolute_uri(), 'cursor', next_cursor)
+    return rows, {'X-Next-Cursor': next_cursor, 'Link': f'<{url}>; rel="next"'}
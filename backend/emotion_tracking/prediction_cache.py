@@ -0,0 +1,162 @@
+"""
+Cache for risk predictions.
+
+Check-ins often share identical inputs (1-5 scales, similar sleep hours, empty
+journal text), and re-saving an entry with unchanged scoring fields would
+otherwise rerun the model. Results are keyed by a hash of the normalized
+inputs and the model version, so a model reload can never serve a stale
+prediction.
+"""
+
+import copy
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+
+# Bump when the shape of a cached result changes, so old entries are not served
+RESULT_FORMAT = 3
+
+
+def prediction_key(emotion_data, journal_text, model_version):
+    """Content hash of everything that influences a prediction"""
+    normalized = [
+        RESULT_FORMAT,
+        model_version,
+        emotion_data['mood'],
+        int(emotion_data['anxiety_level']),
+        float(emotion_data['sleep_hours']),
+        int(emotion_data['energy_level']),
+        int(emotion_data['appetite']),
+        # TF-IDF lowercases and tokenizes on whitespace, so neither affects the result
+        ' '.join((journal_text or '').lower().split()),
+    ]
+    payload = json.dumps(normalized, separators=(',', ':')).encode()
+    return hashlib.sha256(payload).hexdigest()
+
+
+class PredictionCache:
+    """In-process LRU cache with per-entry TTL"""
+
+    def __init__(self, max_size=4096, ttl=3600):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None or item[0] < time.monotonic():
+                if item is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            result = item[1]
+        # Callers may mutate the lists in the result
+        return copy.deepcopy(result)
+
+    def set(self, key, result):
+        result = copy.deepcopy(result)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'backend': 'local',
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+class DjangoPredictionCache:
+    """Prediction cache stored in one of Django's configured caches.
+
+    Shared between workers when the cache backend is (e.g. Redis or
+    Memcached). Eviction is left to the backend; entries expire after ttl.
+    Hit/miss counters are per process.
+    """
+
+    def __init__(self, alias='default', ttl=3600, key_prefix='emotion:prediction:'):
+        self.alias = alias
+        self.ttl = ttl
+        self.key_prefix = key_prefix
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def _cache(self):
+        from django.core.cache import caches
+        return caches[self.alias]
+
+    def get(self, key):
+        result = self._cache.get(self.key_prefix + key)
+        with self._lock:
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return result
+
+    def set(self, key, result):
+        self._cache.set(self.key_prefix + key, result, self.ttl)
+
+    def clear(self):
+        # Keys embed the model version, so entries from an old model are
+        # unreachable after a reload and simply expire.
+        pass
+
+    def stats(self):
+        with self._lock:
+            return {
+                'backend': 'django',
+                'alias': self.alias,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_prediction_cache():
+    """The configured cache, or None when ML_PREDICTION_CACHE['BACKEND'] is unset"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                options = getattr(settings, 'ML_PREDICTION_CACHE', {})
+                backend = options.get('BACKEND', 'local')
+                ttl = options.get('TTL', 3600)
+                if backend == 'local':
+                    _cache = PredictionCache(max_size=options.get('MAX_SIZE', 4096), ttl=ttl)
+                elif backend == 'django':
+                    _cache = DjangoPredictionCache(alias=options.get('CACHE_ALIAS', 'default'), ttl=ttl)
+                elif backend:
+                    raise ValueError(f"Unknown ML_PREDICTION_CACHE backend: {backend!r}")
+                else:
+                    _cache = False
+    return _cache or None
@@ -0,0 +1,36 @@
+"""
+JSON encoding and decoding for the API.
+
+FastJSONRenderer encodes with orjson, which is several times faster than the
+standard library encoder on long lists, and produces the same JSON as DRF's
+JSONRenderer for this API's data (compact, UTF-8, datetimes with a 'Z' for
+UTC). Without orjson installed, or when indented output is requested (the
+browsable API), it falls back to JSONRenderer. json_loads decodes with
+orjson when it is available.
+"""
+
+import json
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+_encoder = encoders.JSONEncoder()
+
+json_loads = orjson.loads if orjson is not None else json.loads
+
+
+class FastJSONRenderer(JSONRenderer):
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if orjson is None or self.get_indent(accepted_media_type or '', renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        # Decimals, lazy translation strings etc. go through DRF's encoder
+        return orjson.dumps(data, default=_encoder.default, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
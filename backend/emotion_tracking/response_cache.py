@@ -0,0 +1,123 @@
+"""
+Per-user cache for the read endpoints.
+
+The app re-fetches the dashboard, stats, entries and risk assessments every
+time a screen gains focus, but that data only changes when the user writes an
+entry or an assessment is scored. Every such write increments the user's
+EmotionSummary.data_version, so a GET is answered from its version:
+
+* the ETag is derived from the endpoint, the query string, the version and
+  today's date (the windows and streak move at midnight without a write).
+  A matching If-None-Match, or an If-Modified-Since no older than the last
+  change, gets a bodiless 304;
+* otherwise the response data is looked up in the Django cache under the
+  same key and only computed by the view on a miss.
+
+Either way the only query is the version lookup. Keys embed the version, so
+writes never delete anything: stale entries become unreachable and expire.
+"""
+
+import hashlib
+import math
+from datetime import datetime, time, timezone as dt_timezone
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+from django.utils.http import http_date, parse_http_date_safe
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import EmotionSummary
+
+
+# Bump when the shape of a cached value changes, so old values are not served
+RESPONSE_FORMAT = 2
+
+DEFAULT_RESPONSE_CACHE_OPTIONS = {
+    'CACHE_ALIAS': 'default',
+    'TTL': 300,
+    'KEY_PREFIX': 'emotion:response:',
+}
+
+
+def response_cache_options():
+    return {**DEFAULT_RESPONSE_CACHE_OPTIONS, **getattr(settings, 'EMOTION_RESPONSE_CACHE', {})}
+
+
+def _data_version(user):
+    row = EmotionSummary.objects.filter(user=user).values_list('data_version', 'data_changed_at').first()
+    if row is None:
+        summary = EmotionSummary.for_user(user)
+        row = summary.data_version, summary.data_changed_at
+    return row
+
+
+def _if_none_match(request, etag):
+    header = request.headers.get('If-None-Match', '')
+    return header.strip() == '*' or etag in (tag.strip() for tag in header.split(','))
+
+
+def _not_modified_since(request, last_modified):
+    since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+    return since is not None and last_modified <= since
+
+
+def cached_response(name):
+    """Serve GETs of a per-user read endpoint from its data version.
+
+    Apply below @api_view/@permission_classes so request.user is the
+    authenticated user. Other methods and non-200 responses pass through.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET':
+                return view(request, *args, **kwargs)
+
+            version, changed_at = _data_version(request.user)
+            # The views' date windows (and the streak) move at midnight UTC
+            today = timezone.now().date()
+            last_modified = max(changed_at, datetime.combine(today, time.min, tzinfo=dt_timezone.utc))
+            # HTTP dates have whole seconds; rounding up keeps If-Modified-Since
+            # usable (the ETag tells apart two writes within one second)
+            last_modified = math.ceil(last_modified.timestamp())
+            params = sorted(request.query_params.lists())
+            key = (f'{RESPONSE_FORMAT}:{request.user.pk}:{version}:{today.isoformat()}:'
+                   f'{name}:{args}:{sorted(kwargs.items())}:{params}')
+            key = hashlib.sha256(key.encode()).hexdigest()[:32]
+            headers = {
+                'ETag': f'"{key}"',
+                'Last-Modified': http_date(last_modified),
+                # Clients may keep the body but must revalidate before using it
+                'Cache-Control': 'private, no-cache',
+            }
+
+            # If-None-Match takes precedence over If-Modified-Since (RFC 9110)
+            if 'If-None-Match' in request.headers:
+                not_modified = _if_none_match(request, headers['ETag'])
+            else:
+                not_modified = _not_modified_since(request, last_modified)
+            if not_modified:
+                return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+            options = response_cache_options()
+            cache = caches[options['CACHE_ALIAS']] if options['CACHE_ALIAS'] else None
+            cache_key = options['KEY_PREFIX'] + key
+            cached = cache.get(cache_key) if cache is not None else None
+            if cached is None:
+                response = view(request, *args, **kwargs)
+                if response.status_code != status.HTTP_200_OK:
+                    return response
+                if cache is not None:
+                    # Headers the view set itself, e.g. the next-page cursor
+                    cache.set(cache_key, (response.data, dict(response.items())), options['TTL'])
+            else:
+                data, view_headers = cached
+                response = Response(data, headers=view_headers)
+            for header, value in headers.items():
+                response[header] = value
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,103 @@
+"""
+Emotion statistics from the rollup tables.
+
+DailyEmotionRollup and WeeklyEmotionRollup hold per-user sums (entry count,
+the numeric inputs, risk score and a mood histogram) and are rewritten by
+EmotionEntry.save() and delete(). Stats for a window are the sums of the rows
+covering it, so the entries themselves are never scanned.
+
+With interval='day' the window is read from the daily rows (one query; the
+risk trend has one point per day). With interval='week' only the days before
+the first full week come from daily rows and the rest from weekly rows, so a
+year is about 60 rows instead of 365, and the trend has one point per week.
+"""
+
+from datetime import timedelta
+
+from django.db import transaction
+
+from .models import DailyEmotionRollup, EmotionEntry, EmotionRollup, WeeklyEmotionRollup, week_start
+
+
+INTERVALS = ('day', 'week')
+
+EMPTY_STATS = {
+    'avg_anxiety': 0,
+    'avg_sleep': 0,
+    'avg_energy': 0,
+    'avg_appetite': 0,
+    'mood_distribution': {},
+    'risk_trend': [],
+    'entries_count': 0,
+}
+
+
+def _add(totals, row):
+    for field in EmotionRollup.SUM_FIELDS:
+        totals[field] = totals.get(field, 0) + getattr(row, field)
+
+
+def _window_rows(user, start_date, interval):
+    """(bucket start, rollup row) pairs covering start_date onwards"""
+    if interval == 'day':
+        rows = DailyEmotionRollup.objects.filter(user=user, date__gte=start_date).order_by('date')
+        return [(row.date, row) for row in rows]
+
+    first_full_week = week_start(start_date + timedelta(days=6))
+    head = DailyEmotionRollup.objects.filter(user=user, date__gte=start_date, date__lt=first_full_week)
+    weeks = WeeklyEmotionRollup.objects.filter(user=user, week_start__gte=first_full_week).order_by('week_start')
+    return [(week_start(row.date), row) for row in head] + [(row.week_start, row) for row in weeks]
+
+
+def window_stats(user, start_date, interval='day'):
+    """The emotion_stats response for entries dated start_date or later"""
+    if interval not in INTERVALS:
+        raise ValueError(f"interval must be one of {', '.join(INTERVALS)}")
+
+    totals = {}
+    buckets = {}
+    for bucket, row in _window_rows(user, start_date, interval):
+        _add(totals, row)
+        _add(buckets.setdefault(bucket, {}), row)
+    if not totals.get('entries'):
+        return dict(EMPTY_STATS)
+
+    entries = totals['entries']
+    moods = {mood: totals[field] for mood, field in sorted(EmotionRollup.MOOD_COUNT_FIELDS.items())
+             if totals[field]}
+    risk_trend = [
+        {
+            'date': bucket.strftime('%Y-%m-%d'),
+            'risk_score': round(bucket_totals['risk_sum'] / bucket_totals['risk_count'], 2),
+            'entries': bucket_totals['entries'],
+        }
+        for bucket, bucket_totals in sorted(buckets.items())
+        if bucket_totals['risk_count']
+    ]
+    return {
+        'avg_anxiety': round(totals['anxiety_sum'] / entries, 2),
+        'avg_sleep': round(totals['sleep_sum'] / entries, 2),
+        'avg_energy': round(totals['energy_sum'] / entries, 2),
+        'avg_appetite': round(totals['appetite_sum'] / entries, 2),
+        'mood_distribution': moods,
+        'risk_trend': risk_trend,
+        'entries_count': entries,
+    }
+
+
+def rebuild_rollups(user_id):
+    """Rewrite one user's daily and weekly rollups from their entries"""
+    with transaction.atomic():
+        DailyEmotionRollup.objects.filter(user_id=user_id).delete()
+        WeeklyEmotionRollup.objects.filter(user_id=user_id).delete()
+        daily = [DailyEmotionRollup.from_entry(entry)
+                 for entry in EmotionEntry.objects.filter(user_id=user_id).order_by()]
+        weeks = {}
+        for row in daily:
+            _add(weeks.setdefault(week_start(row.date), {}), row)
+        DailyEmotionRollup.objects.bulk_create(daily, batch_size=2000)
+        WeeklyEmotionRollup.objects.bulk_create(
+            [WeeklyEmotionRollup(user_id=user_id, week_start=start, **totals) for start, totals in weeks.items()],
+            batch_size=2000,
+        )
+    return len(daily)
@@ -0,0 +1,161 @@
+"""
+Client for the local scoring daemon (see scoring_server.py).
+
+With ML_SCORING_SERVER['SOCKET'] set, model_registry.predict_risk_batch sends
+entries to the daemon instead of scoring them in the web worker. Connections
+are kept in a small pool and reused across requests. Any failure (daemon not
+running, timeout, bad response) raises ScoringUnavailable, and the caller
+scores in process instead; after a failure the daemon is not tried again for
+RETRY_INTERVAL seconds, so an outage costs one timeout rather than one per
+request.
+"""
+
+import logging
+import queue
+import socket
+import threading
+import time
+
+from django.conf import settings
+
+from . import scoring_protocol
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SERVER_OPTIONS = {
+    'SOCKET': '',
+    'POOL_SIZE': 8,
+    'TIMEOUT': 1.0,
+    'RETRY_INTERVAL': 5.0,
+    'MAX_WAIT_MS': 2.0,
+    'MAX_BATCH_ROWS': 256,
+}
+
+
+def server_options():
+    return {**DEFAULT_SERVER_OPTIONS, **getattr(settings, 'ML_SCORING_SERVER', {})}
+
+
+class ScoringUnavailable(Exception):
+    """The scoring daemon could not produce a result"""
+
+
+class ScoringClient:
+    """Pooled, thread-safe connection to the scoring daemon"""
+
+    def __init__(self, socket_path, pool_size=8, timeout=1.0, retry_interval=5.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.retry_interval = retry_interval
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+        self._down_until = 0.0
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        # Bounds connect and every send/recv, not the whole call
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def _release(self, sock):
+        try:
+            self._pool.put_nowait(sock)
+        except queue.Full:
+            sock.close()
+
+    def _mark_down(self, reason):
+        logger.warning("Scoring server at %s unavailable (%s); scoring in process for %.0fs",
+                       self.socket_path, reason, self.retry_interval)
+        with self._lock:
+            self._down_until = time.monotonic() + self.retry_interval
+        self.close()
+
+    def _round_trip(self, request):
+        # A pooled connection may have been closed by a restarted daemon;
+        # that is only noticed on use, so such failures get one fresh retry
+        while True:
+            try:
+                sock, pooled = self._pool.get_nowait(), True
+            except queue.Empty:
+                sock, pooled = self._connect(), False
+            try:
+                scoring_protocol.send_frame(sock, request)
+                response = scoring_protocol.recv_frame(sock)
+            except socket.timeout:
+                sock.close()
+                raise
+            except (OSError, EOFError):
+                sock.close()
+                if pooled:
+                    continue
+                raise
+            except BaseException:
+                sock.close()
+                raise
+            self._release(sock)
+            return response
+
+    def predict_risk_batch(self, emotion_data_list, journal_texts=None):
+        """Results as EmotionRiskPredictor.predict_risk_batch returns them"""
+        if not emotion_data_list:
+            return []
+        if journal_texts is None:
+            journal_texts = [""] * len(emotion_data_list)
+        if len(journal_texts) != len(emotion_data_list):
+            raise ValueError("journal_texts must have one item per entry")
+        if time.monotonic() < self._down_until:
+            raise ScoringUnavailable("Scoring server marked unavailable after a recent failure")
+
+        try:
+            request = scoring_protocol.encode_request(emotion_data_list, journal_texts)
+        except scoring_protocol.ProtocolError as e:
+            # An input the protocol cannot carry; the daemon itself is fine
+            raise ScoringUnavailable(str(e)) from e
+        try:
+            results = scoring_protocol.decode_response(self._round_trip(request))
+        except scoring_protocol.RemoteError as e:
+            raise ScoringUnavailable(f"Scoring server error: {e}") from e
+        except (OSError, EOFError, scoring_protocol.ProtocolError) as e:
+            self._mark_down(e)
+            raise ScoringUnavailable(f"Scoring server unreachable: {e}") from e
+        if len(results) != len(emotion_data_list):
+            self._mark_down("wrong number of results")
+            raise ScoringUnavailable("Scoring server returned the wrong number of results")
+        return results
+
+    def close(self):
+        """Close every pooled connection"""
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_scoring_client():
+    """The configured client, or None when ML_SCORING_SERVER['SOCKET'] is unset"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                options = server_options()
+                if options['SOCKET']:
+                    _client = ScoringClient(
+                        options['SOCKET'],
+                        pool_size=options['POOL_SIZE'],
+                        timeout=options['TIMEOUT'],
+                        retry_interval=options['RETRY_INTERVAL'],
+                    )
+                else:
+                    _client = False
+    return _client or None
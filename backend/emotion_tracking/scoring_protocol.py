@@ -0,0 +1,241 @@
+"""
+Wire format between the scoring server and its clients.
+
+Messages are length-prefixed frames (uint32, little endian) over a stream
+socket. A request carries the scoring inputs of a batch of entries; the
+response carries, per entry, the risk score and category, the factor and
+recommendation codes and the feature contributions. Text for the codes is
+expanded from the catalogue on the client, so it never crosses the socket.
+
+Request:  version u8, type u8, rows u32, then per row
+          mood (u8 length + utf-8), anxiety i16, sleep f64, energy i16,
+          appetite i16, journal text (u32 length + utf-8)
+Response: version u8, status u8, then for status OK
+          model version (u8 length + utf-8), contribution groups (u8 count,
+          each u8 length + utf-8), rows u32, then per row
+          flags u8, risk score f64, category (u8 length + utf-8),
+          factor codes (u8 count + u8 each), recommendation codes (same),
+          contributions (u8 count + f64 each), error (u16 length + utf-8,
+          only with FLAG_ERROR)
+          for status ERROR: message (u16 length + utf-8)
+
+This module has no Django or ML imports so web workers can use the client
+without loading the model stack.
+"""
+
+import struct
+
+from . import catalogue
+
+
+PROTOCOL_VERSION = 1
+MSG_SCORE = 1
+STATUS_OK = 0
+STATUS_ERROR = 1
+# Row flags
+FLAG_ERROR = 1
+
+# Frames above this size are rejected rather than buffered
+MAX_FRAME_BYTES = 64 * 1024 * 1024
+
+_FRAME = struct.Struct('<I')
+_HEADER = struct.Struct('<BB')
+_U8 = struct.Struct('<B')
+_U16 = struct.Struct('<H')
+_U32 = struct.Struct('<I')
+_F64 = struct.Struct('<d')
+_ROW_NUMBERS = struct.Struct('<hdhh')
+
+
+class ProtocolError(Exception):
+    """A malformed or unexpected message"""
+
+
+class RemoteError(Exception):
+    """The server could not score the request"""
+
+
+def _short_string(value):
+    data = str(value).encode()
+    if len(data) > 255:
+        raise ProtocolError(f"String too long for the protocol: {value[:40]!r}...")
+    return _U8.pack(len(data)) + data
+
+
+class _Reader:
+    """Sequential unpacking over one payload"""
+
+    def __init__(self, payload):
+        self.payload = memoryview(payload)
+        self.offset = 0
+
+    def unpack(self, layout):
+        try:
+            values = layout.unpack_from(self.payload, self.offset)
+        except struct.error as e:
+            raise ProtocolError(f"Truncated message: {e}") from None
+        self.offset += layout.size
+        return values
+
+    def number(self, layout):
+        return self.unpack(layout)[0]
+
+    def bytes(self, length):
+        end = self.offset + length
+        if end > len(self.payload):
+            raise ProtocolError("Truncated message")
+        data = bytes(self.payload[self.offset:end])
+        self.offset = end
+        return data
+
+    def string(self, length_layout=_U8):
+        return self.bytes(self.number(length_layout)).decode()
+
+    def codes(self):
+        return list(self.bytes(self.number(_U8)))
+
+    def done(self):
+        if self.offset != len(self.payload):
+            raise ProtocolError(f"{len(self.payload) - self.offset} unexpected trailing bytes")
+
+
+def encode_request(emotion_data_list, journal_texts):
+    parts = [_HEADER.pack(PROTOCOL_VERSION, MSG_SCORE), _U32.pack(len(emotion_data_list))]
+    for emotion_data, journal_text in zip(emotion_data_list, journal_texts):
+        text = (journal_text or "").encode()
+        parts.append(_short_string(emotion_data['mood']))
+        try:
+            parts.append(_ROW_NUMBERS.pack(
+                int(emotion_data['anxiety_level']),
+                float(emotion_data['sleep_hours']),
+                int(emotion_data['energy_level']),
+                int(emotion_data['appetite']),
+            ))
+        except struct.error as e:
+            raise ProtocolError(f"Value out of range for the protocol: {e}") from None
+        parts.append(_U32.pack(len(text)))
+        parts.append(text)
+    return b''.join(parts)
+
+
+def decode_request(payload):
+    """Return (emotion_data_list, journal_texts)"""
+    reader = _Reader(payload)
+    version, message_type = reader.unpack(_HEADER)
+    if version != PROTOCOL_VERSION or message_type != MSG_SCORE:
+        raise ProtocolError(f"Unsupported request (version {version}, type {message_type})")
+    emotion_data_list, journal_texts = [], []
+    for _ in range(reader.number(_U32)):
+        mood = reader.string()
+        anxiety_level, sleep_hours, energy_level, appetite = reader.unpack(_ROW_NUMBERS)
+        emotion_data_list.append({
+            'mood': mood,
+            'anxiety_level': anxiety_level,
+            'sleep_hours': sleep_hours,
+            'energy_level': energy_level,
+            'appetite': appetite,
+        })
+        journal_texts.append(reader.string(_U32))
+    reader.done()
+    return emotion_data_list, journal_texts
+
+
+def encode_response(results, model_version, groups):
+    """Pack predictor results; groups names the feature_contributions keys in order"""
+    parts = [
+        _HEADER.pack(PROTOCOL_VERSION, STATUS_OK),
+        _short_string(model_version or ''),
+        _U8.pack(len(groups)),
+        *(_short_string(group) for group in groups),
+        _U32.pack(len(results)),
+    ]
+    for result in results:
+        error = result.get('error')
+        contributions = result['feature_contributions']
+        parts.append(_U8.pack(FLAG_ERROR if error else 0))
+        parts.append(_F64.pack(result['risk_score']))
+        parts.append(_short_string(result['risk_category']))
+        for codes in (result['factor_codes'], result['recommendation_codes']):
+            parts.append(_U8.pack(len(codes)) + bytes(codes))
+        values = [contributions[group] for group in groups] if contributions else []
+        parts.append(_U8.pack(len(values)) + struct.pack(f'<{len(values)}d', *values))
+        if error:
+            message = error.encode()[:65535]
+            parts.append(_U16.pack(len(message)) + message)
+    return b''.join(parts)
+
+
+def encode_error(message):
+    data = str(message).encode()[:65535]
+    return _HEADER.pack(PROTOCOL_VERSION, STATUS_ERROR) + _U16.pack(len(data)) + data
+
+
+def decode_response(payload):
+    """Return the list of result dicts, shaped like EmotionRiskPredictor's.
+
+    Raises ProtocolError for a malformed response and RemoteError when the
+    server reported a failure.
+    """
+    reader = _Reader(payload)
+    version, status = reader.unpack(_HEADER)
+    if version != PROTOCOL_VERSION:
+        raise ProtocolError(f"Unsupported response version {version}")
+    if status == STATUS_ERROR:
+        raise RemoteError(reader.string(_U16))
+    if status != STATUS_OK:
+        raise ProtocolError(f"Unknown response status {status}")
+
+    model_version = reader.string() or None
+    groups = [reader.string() for _ in range(reader.number(_U8))]
+    results = []
+    for _ in range(reader.number(_U32)):
+        flags = reader.number(_U8)
+        risk_score = reader.number(_F64)
+        risk_category = reader.string()
+        factor_codes = reader.codes()
+        recommendation_codes = reader.codes()
+        n_contributions = reader.number(_U8)
+        contributions = reader.unpack(struct.Struct(f'<{n_contributions}d')) if n_contributions else ()
+        result = {
+            'risk_score': risk_score,
+            'risk_category': risk_category,
+            'contributing_factors': catalogue.expand_factors(factor_codes),
+            'recommendations': catalogue.expand_recommendations(recommendation_codes),
+            'factor_codes': factor_codes,
+            'recommendation_codes': recommendation_codes,
+            'feature_contributions': dict(zip(groups, contributions)),
+            'model_version': model_version,
+        }
+        if flags & FLAG_ERROR:
+            # Same shape as the predictor's "not loaded" result
+            result['model_version'] = None
+            result['error'] = reader.string(_U16)
+        results.append(result)
+    reader.done()
+    return results
+
+
+def recv_exactly(sock, size):
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        n = sock.recv_into(view[received:])
+        if n == 0:
+            if received == 0:
+                raise EOFError("Connection closed")
+            raise ProtocolError("Connection closed mid-frame")
+        received += n
+    return buffer
+
+
+def send_frame(sock, payload):
+    sock.sendall(_FRAME.pack(len(payload)) + payload)
+
+
+def recv_frame(sock):
+    """Next frame's payload; EOFError if the peer closed between frames"""
+    (size,) = _FRAME.unpack(recv_exactly(sock, _FRAME.size))
+    if size > MAX_FRAME_BYTES:
+        raise ProtocolError(f"Frame of {size} bytes exceeds the {MAX_FRAME_BYTES} byte limit")
+    return recv_exactly(sock, size) if size else bytearray()
@@ -0,0 +1,174 @@
+"""
+Asynchronous risk scoring backed by the app's own database.
+
+With ML_SCORING_MODE = 'async' the views persist the entry, enqueue a
+ScoringJob and respond straight away with a pending risk state. Workers started
+by `manage.py run_scoring_workers` claim jobs in batches, score them with one
+vectorized model call and write the results back; clients see them on their
+next fetch. No external broker is needed.
+
+Jobs are claimed with a conditional UPDATE (status and lock owner checked in
+the WHERE clause), so several workers can share the table on any database
+backend without SELECT ... FOR UPDATE SKIP LOCKED.
+"""
+
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .model_registry import predict_risk_batch
+from .models import RiskAssessment, ScoringJob
+
+
+DEFAULT_QUEUE_OPTIONS = {
+    'BATCH_SIZE': 64,
+    'MAX_ATTEMPTS': 5,
+    'RETRY_DELAY': 10,
+    'LOCK_TIMEOUT': 300,
+    'POLL_INTERVAL': 1.0,
+}
+
+
+def queue_options():
+    return {**DEFAULT_QUEUE_OPTIONS, **getattr(settings, 'ML_SCORING_QUEUE', {})}
+
+
+def async_scoring_enabled():
+    return getattr(settings, 'ML_SCORING_MODE', 'sync') == 'async'
+
+
+def entry_emotion_data(entry):
+    return {
+        'mood': entry.mood,
+        'anxiety_level': entry.anxiety_level,
+        'sleep_hours': entry.sleep_hours,
+        'energy_level': entry.energy_level,
+        'appetite': entry.appetite,
+    }
+
+
+def save_prediction(entry, prediction):
+    """Write a prediction onto the entry and its day's RiskAssessment"""
+    entry.risk_score = prediction['risk_score']
+    entry.risk_category = prediction['risk_category']
+    entry.save(update_fields=['risk_score', 'risk_category', 'updated_at'])
+
+    RiskAssessment.objects.update_or_create(
+        user_id=entry.user_id,
+        date=entry.date,
+        defaults={
+            'risk_category': prediction['risk_category'],
+            'risk_score': prediction['risk_score'],
+            'factor_codes': prediction['factor_codes'],
+            'recommendation_codes': prediction['recommendation_codes'],
+            'feature_contributions': prediction['feature_contributions'],
+            'model_version': prediction['model_version'] or ''
+        }
+    )
+
+
+def new_worker_id():
+    return uuid.uuid4().hex[:16]
+
+
+def _claimable(now, lock_timeout):
+    # Pending jobs that are due, plus running jobs whose worker died
+    return (
+        Q(status='pending', run_after__lte=now)
+        | Q(status='running', locked_at__lt=now - timedelta(seconds=lock_timeout))
+    )
+
+
+def claim_jobs(worker_id, batch_size=None, max_tries=3):
+    """Atomically take up to batch_size due jobs for this worker"""
+    options = queue_options()
+    batch_size = batch_size or options['BATCH_SIZE']
+
+    for _ in range(max_tries):
+        now = timezone.now()
+        claimable = _claimable(now, options['LOCK_TIMEOUT'])
+        candidate_ids = list(
+            ScoringJob.objects.filter(claimable)
+            .order_by('run_after')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not candidate_ids:
+            return []
+
+        # Re-checking the claimable condition in the UPDATE means a job taken
+        # by another worker in the meantime is simply skipped
+        claimed = ScoringJob.objects.filter(claimable, id__in=candidate_ids).update(
+            status='running',
+            locked_by=worker_id,
+            locked_at=now,
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return list(
+                ScoringJob.objects.filter(id__in=candidate_ids, status='running', locked_by=worker_id, locked_at=now)
+                .select_related('entry')
+            )
+        # Another worker won every candidate; look again
+    return []
+
+
+def _owned(job):
+    # Guards against overwriting a job that was re-enqueued while running
+    return ScoringJob.objects.filter(id=job.id, status='running', locked_by=job.locked_by, locked_at=job.locked_at)
+
+
+def process_jobs(jobs):
+    """Score a claimed batch in one model pass and record the outcome.
+
+    Returns the number of jobs completed.
+    """
+    if not jobs:
+        return 0
+
+    try:
+        predictions = predict_risk_batch(
+            [entry_emotion_data(job.entry) for job in jobs],
+            [job.entry.journal_text or "" for job in jobs],
+        )
+        failed = [prediction.get('error') for prediction in predictions]
+    except Exception as exc:
+        predictions = [None] * len(jobs)
+        failed = [f"{type(exc).__name__}: {exc}"] * len(jobs)
+
+    completed = 0
+    for job, prediction, error in zip(jobs, predictions, failed):
+        if error:
+            _retry_or_fail(job, error)
+            continue
+        with transaction.atomic():
+            if _owned(job).update(status='done', locked_by='', locked_at=None, last_error=''):
+                save_prediction(job.entry, prediction)
+                completed += 1
+    return completed
+
+
+def _retry_or_fail(job, error):
+    options = queue_options()
+    if job.attempts >= options['MAX_ATTEMPTS']:
+        _owned(job).update(status='failed', locked_by='', locked_at=None, last_error=error)
+        return
+    # Exponential backoff: RETRY_DELAY, 2x, 4x, ...
+    delay = options['RETRY_DELAY'] * 2 ** (job.attempts - 1)
+    _owned(job).update(
+        status='pending',
+        locked_by='',
+        locked_at=None,
+        run_after=timezone.now() + timedelta(seconds=delay),
+        last_error=error,
+    )
+
+
+def run_once(worker_id, batch_size=None):
+    """Claim and process one batch; returns the number of jobs claimed"""
+    jobs = claim_jobs(worker_id, batch_size)
+    process_jobs(jobs)
+    return len(jobs)
@@ -0,0 +1,190 @@
+"""
+Local scoring daemon.
+
+One process owns the EmotionRiskPredictor (through the model registry, so it
+picks up retrained bundles by itself) and serves predictions over a Unix
+domain socket using scoring_protocol. Web workers then never load sklearn or
+the forest; they talk to it through scoring_client.
+
+Requests that arrive within max_wait seconds of each other are merged into a
+single predict_risk_batch call, so concurrent single-entry requests share one
+vectorized forest pass. Start it with `manage.py run_scoring_server`.
+"""
+
+import os
+import queue
+import socket
+import socketserver
+import stat
+import threading
+import time
+
+from . import scoring_protocol
+from .ml_models import ATTRIBUTION_GROUPS
+from .model_registry import get_predictor, predict_risk_batch_local
+
+
+class _Pending:
+    """One submitted request waiting for its share of a batch"""
+
+    def __init__(self, emotion_data_list, journal_texts):
+        self.emotion_data_list = emotion_data_list
+        self.journal_texts = journal_texts
+        self.results = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class MicroBatcher:
+    """Merges requests that arrive close together into one scoring call.
+
+    A batch closes max_wait seconds after its first request arrives, or as
+    soon as it holds max_rows rows. A single request larger than max_rows is
+    scored on its own, never split.
+    """
+
+    def __init__(self, score_batch, max_wait=0.002, max_rows=256):
+        self.score_batch = score_batch
+        self.max_wait = max_wait
+        self.max_rows = max_rows
+        self.batches = 0
+        self.rows = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='scoring-batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, emotion_data_list, journal_texts):
+        """Score one request; blocks until its batch has been scored"""
+        pending = _Pending(emotion_data_list, journal_texts)
+        self._queue.put(pending)
+        pending.done.wait()
+        if pending.error is not None:
+            raise pending.error
+        return pending.results
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        rows = len(batch[0].emotion_data_list)
+        deadline = time.monotonic() + self.max_wait
+        while rows < self.max_rows:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                pending = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(pending)
+            rows += len(pending.emotion_data_list)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            emotion_data_list, journal_texts = [], []
+            for pending in batch:
+                emotion_data_list.extend(pending.emotion_data_list)
+                journal_texts.extend(pending.journal_texts)
+            try:
+                results = self.score_batch(emotion_data_list, journal_texts)
+            except Exception as e:
+                for pending in batch:
+                    pending.error = e
+                    pending.done.set()
+                continue
+            self.batches += 1
+            self.rows += len(results)
+            offset = 0
+            for pending in batch:
+                size = len(pending.emotion_data_list)
+                pending.results = results[offset:offset + size]
+                offset += size
+                pending.done.set()
+
+
+class _ScoringHandler(socketserver.BaseRequestHandler):
+    """Serves one client connection; clients keep connections open and reuse them"""
+
+    def setup(self):
+        with self.server.connections_lock:
+            self.server.connections.add(self.request)
+
+    def finish(self):
+        with self.server.connections_lock:
+            self.server.connections.discard(self.request)
+
+    def handle(self):
+        while True:
+            try:
+                payload = scoring_protocol.recv_frame(self.request)
+            except (EOFError, OSError, scoring_protocol.ProtocolError):
+                return
+            try:
+                emotion_data_list, journal_texts = scoring_protocol.decode_request(payload)
+                results = self.server.batcher.submit(emotion_data_list, journal_texts)
+                model_version = next((r['model_version'] for r in results if r['model_version']), None)
+                response = scoring_protocol.encode_response(results, model_version, ATTRIBUTION_GROUPS)
+            except Exception as e:
+                response = scoring_protocol.encode_error(f"{type(e).__name__}: {e}")
+            try:
+                scoring_protocol.send_frame(self.request, response)
+            except OSError:
+                return
+
+
+class ScoringServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Unix-socket server with one thread per client connection"""
+    daemon_threads = True
+    # Every web worker opens several pooled connections at startup
+    request_queue_size = 128
+
+    def __init__(self, socket_path, max_wait=0.002, max_rows=256, score_batch=None):
+        self.socket_path = socket_path
+        _remove_stale_socket(socket_path)
+        self.batcher = MicroBatcher(score_batch or predict_risk_batch_local, max_wait=max_wait, max_rows=max_rows)
+        self.connections = set()
+        self.connections_lock = threading.Lock()
+        super().__init__(socket_path, _ScoringHandler)
+
+    def server_close(self):
+        super().server_close()
+        # Pooled client connections would otherwise keep being served
+        with self.connections_lock:
+            for connection in self.connections:
+                try:
+                    connection.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+        try:
+            os.unlink(self.socket_path)
+        except FileNotFoundError:
+            pass
+
+
+def _remove_stale_socket(socket_path):
+    """Delete a socket file left by a server that is no longer running"""
+    try:
+        mode = os.stat(socket_path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise FileExistsError(f"{socket_path} exists and is not a socket")
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(socket_path)
+    except OSError:
+        os.unlink(socket_path)
+    else:
+        raise OSError(f"A scoring server is already listening on {socket_path}")
+    finally:
+        probe.close()
+
+
+def serve(socket_path, max_wait=0.002, max_rows=256):
+    """Load the model, then serve until interrupted"""
+    get_predictor()
+    server = ScoringServer(socket_path, max_wait=max_wait, max_rows=max_rows)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
@@ -1,14 +1,23 @@
-from rest_framework import serializers
+from django.conf import settings
+from django.db.models import JSONField, TextField
+from django.db.models.functions import Cast
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+from .catalogue import expand_factors, expand_recommendations
 from .models import EmotionEntry, RiskAssessment
+from .renderers import json_loads
 
 
 class EmotionEntrySerializer(serializers.ModelSerializer):
+    risk_status = serializers.CharField(read_only=True)
+
     class Meta:
         model = EmotionEntry
         fields = [
             'id', 'date', 'mood', 'anxiety_level', 'sleep_hours', 
             'energy_level', 'appetite', 'journal_text', 
-            'risk_score', 'risk_category', 'created_at'
+            'risk_score', 'risk_category', 'risk_status', 'created_at'
         ]
         read_only_fields = ['risk_score', 'risk_category', 'created_at']
 
@@ -38,9 +47,10 @@ class RiskAssessmentSerializer(serializers.ModelSerializer):
         model = RiskAssessment
         fields = [
             'id', 'date', 'risk_category', 'risk_score', 
-            'contributing_factors', 'recommendations', 'created_at'
+            'contributing_factors', 'recommendations', 'feature_contributions',
+            'model_version', 'created_at'
         ]
-        read_only_fields = ['created_at']
+        read_only_fields = ['feature_contributions', 'model_version', 'created_at']
 
 
 class EmotionStatsSerializer(serializers.Serializer):
@@ -51,3 +61,113 @@ class EmotionStatsSerializer(serializers.Serializer):
     mood_distribution = serializers.DictField()
     risk_trend = serializers.ListField()
     entries_count = serializers.IntegerField()
+
+
+def _date_converter():
+    """Formats like DRF's DateField, or None when the JSON encoder already does"""
+    if api_settings.DATE_FORMAT == ISO_8601:
+        return None
+    return serializers.DateField().to_representation
+
+
+def _datetime_converter():
+    """Formats like DRF's DateTimeField, or None when the JSON encoder already does"""
+    # Both JSON renderers write datetimes as ISO 8601 with 'Z' for UTC, which
+    # is what DateTimeField produces as long as it has no zone to convert to
+    if api_settings.DATETIME_FORMAT == ISO_8601 and (
+            not settings.USE_TZ or timezone.get_current_timezone_name() == 'UTC'):
+        return None
+    return serializers.DateTimeField().to_representation
+
+
+class ValuesListSerializer:
+    """Read-only list serialization from `.values()` rows.
+
+    Renders to the same JSON as `serializer_class(queryset, many=True).data`
+    without building model instances or running per-field DRF serialization:
+    values from the database are used as they are. Dates and datetimes are
+    left to the JSON renderer, which formats them as DRF's fields do, unless
+    a date format or a non-UTC time zone is configured. JSON columns are
+    read as text and decoded here, with orjson when installed, instead of
+    by the model field. Fields that are
+    computed from other columns are listed in computed_fields as
+    (source columns, function of the row). `fields` selects a subset, in
+    serializer order.
+    """
+    serializer_class = None
+    computed_fields = {}
+    _serializer_fields = None
+
+    def __init__(self, fields=None):
+        self.fields = [name for name in self.all_fields() if fields is None or name in fields]
+        cls = type(self)
+        if cls._serializer_fields is None:
+            cls._serializer_fields = cls.serializer_class().fields
+        columns = []
+        for name in self.fields:
+            columns.extend(self.computed_fields[name][0] if name in self.computed_fields else [name])
+        self.columns = list(dict.fromkeys(columns))
+
+    @classmethod
+    def all_fields(cls):
+        return list(cls.serializer_class.Meta.fields)
+
+    def values(self, queryset, *extra_columns):
+        """The queryset as .values() rows with the columns these fields need"""
+        columns = list(dict.fromkeys([*self.columns, *extra_columns]))
+        model = queryset.model
+        json_columns = [name for name in columns if isinstance(model._meta.get_field(name), JSONField)]
+        self._json_aliases = {f'{name}_text': name for name in json_columns}
+        return queryset.values(
+            *[name for name in columns if name not in json_columns],
+            **{alias: Cast(name, TextField()) for alias, name in self._json_aliases.items()},
+        )
+
+    def _decode_json(self, rows):
+        aliases = getattr(self, '_json_aliases', {})
+        for row in rows:
+            for alias, name in aliases.items():
+                text = row.pop(alias)
+                row[name] = None if text is None else json_loads(text)
+            yield row
+
+    def _getters(self):
+        """(name, function of the row or None to copy the column) per field"""
+        getters = []
+        for name in self.fields:
+            field = self._serializer_fields[name]
+            if name in self.computed_fields:
+                getters.append((name, self.computed_fields[name][1]))
+            else:
+                convert = None
+                if isinstance(field, serializers.DateTimeField):
+                    convert = _datetime_converter()
+                elif isinstance(field, serializers.DateField):
+                    convert = _date_converter()
+                if convert is None:
+                    getters.append((name, None))
+                else:
+                    getters.append((name, lambda row, name=name, convert=convert: convert(row[name])))
+        return getters
+
+    def to_representation(self, rows):
+        getters = self._getters()
+        return [
+            {name: row[name] if getter is None else getter(row) for name, getter in getters}
+            for row in self._decode_json(rows)
+        ]
+
+
+class EmotionEntryListSerializer(ValuesListSerializer):
+    serializer_class = EmotionEntrySerializer
+    computed_fields = {
+        'risk_status': (['risk_category'], lambda row: 'scored' if row['risk_category'] else 'pending'),
+    }
+
+
+class RiskAssessmentListSerializer(ValuesListSerializer):
+    serializer_class = RiskAssessmentSerializer
+    computed_fields = {
+        'contributing_factors': (['factor_codes'], lambda row: expand_factors(row['factor_codes'])),
+        'recommendations': (['recommendation_codes'], lambda row: expand_recommendations(row['recommendation_codes'])),
+    }
@@ -0,0 +1,98 @@
+"""
+Streak arithmetic for EmotionSummary.
+
+A streak is a run of consecutive days with an entry. EmotionSummary keeps the
+latest run and the longest one up to date as entries are added, so reading
+them is a single-row lookup. When an entry is removed, moved to another day or
+backfilled before the latest day, runs can split or merge; compute_streaks
+then recomputes them from the entries in one query.
+
+The query is the classic gaps-and-islands pattern: subtracting a row's rank
+(ordered by date) from its day number gives the same value for every day of
+one run, so grouping by it yields the runs. The latest group is the current
+streak and the largest is the longest.
+"""
+
+from datetime import date, timedelta
+
+from django.db import connections
+
+
+# A DATE column as a whole number of days, per database backend
+DAY_NUMBER_SQL = {
+    'postgresql': "({column} - DATE '1970-01-01')",
+    'sqlite': "CAST(julianday({column}) AS INTEGER)",
+    'mysql': "TO_DAYS({column})",
+}
+
+ISLANDS_SQL = """
+SELECT MIN(day), MAX(day), COUNT(*), MAX(COUNT(*)) OVER ()
+FROM (
+    SELECT {date} AS day, {day_number} - ROW_NUMBER() OVER (ORDER BY {date}) AS island
+    FROM {table}
+    WHERE {user_id} = %s
+) days
+GROUP BY island
+ORDER BY MAX(day) DESC
+LIMIT 1
+"""
+
+NO_STREAKS = {
+    'streak_start': None,
+    'last_entry_date': None,
+    'current_streak': 0,
+    'longest_streak': 0,
+}
+
+
+def _as_date(value):
+    # SQLite hands back raw DATE columns as ISO strings
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+
+def streaks_from_dates(dates):
+    """Streak fields from a user's entry dates in ascending order"""
+    if not dates:
+        return dict(NO_STREAKS)
+    start = dates[0]
+    longest = 1
+    for previous, day in zip(dates, dates[1:]):
+        if day - previous != timedelta(days=1):
+            start = day
+        longest = max(longest, (day - start).days + 1)
+    return {
+        'streak_start': start,
+        'last_entry_date': dates[-1],
+        'current_streak': (dates[-1] - start).days + 1,
+        'longest_streak': longest,
+    }
+
+
+def compute_streaks(entries_model, user_id, using='default'):
+    """Streak fields for one user, recomputed from their entries in one query"""
+    connection = connections[using]
+    day_number = DAY_NUMBER_SQL.get(connection.vendor)
+    if day_number is None:
+        dates = list(entries_model._default_manager.using(using)
+                     .filter(user_id=user_id).order_by('date').values_list('date', flat=True))
+        return streaks_from_dates(dates)
+
+    quote = connection.ops.quote_name
+    sql = ISLANDS_SQL.format(
+        date=quote('date'),
+        day_number=day_number.format(column=quote('date')),
+        table=quote(entries_model._meta.db_table),
+        user_id=quote('user_id'),
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [user_id])
+        row = cursor.fetchone()
+    if row is None:
+        return dict(NO_STREAKS)
+    start, last, current, longest = row
+    return {
+        'streak_start': _as_date(start),
+        'last_entry_date': _as_date(last),
+        'current_streak': current,
+        'longest_streak': longest,
+    }
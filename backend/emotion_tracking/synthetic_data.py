@@ -0,0 +1,217 @@
+#!/usr/bin/env python
+"""
+Synthetic emotion entries for training and load testing
+
+generate_synthetic_data is the original row-by-row generator used to train
+the shipped model. generate_synthetic_data_fast draws every column with one
+NumPy call and applies the same distributions and risk rules, so millions of
+rows take seconds; iter_synthetic_chunks streams datasets larger than memory.
+
+    python -m emotion_tracking.synthetic_data --rows 1000000 --output entries.csv
+    python -m emotion_tracking.synthetic_data --compare 20000
+"""
+
+import argparse
+import random
+import time
+
+import numpy as np
+import pandas as pd
+
+
+MOODS = ['happy', 'sad', 'angry', 'anxious', 'neutral']
+MOOD_RISK = {'happy': 0.1, 'neutral': 0.3, 'sad': 0.6, 'anxious': 0.7, 'angry': 0.8}
+JOURNAL_TEXTS = {
+    'happy': ["feeling good today", "baby is smiling", "great day", "so happy"],
+    'sad': ["feeling down", "miss my old life", "crying a lot", "feeling empty"],
+    'anxious': ["worried about baby", "can't sleep", "overwhelmed", "anxious thoughts"],
+    'angry': ["frustrated", "irritable", "angry at nothing", "losing patience"],
+    'neutral': ["okay today", "normal day", "nothing special", "just another day"]
+}
+COLUMNS = [
+    'mood', 'anxiety_level', 'sleep_hours', 'energy_level', 'appetite',
+    'journal_text', 'risk_category', 'risk_score'
+]
+
+
+def generate_synthetic_data(n_samples=1000):
+    """Generate synthetic training data for demonstration"""
+    np.random.seed(42)
+    random.seed(42)
+
+    data = []
+
+    for i in range(n_samples):
+        # Generate base features
+        mood = random.choice(MOODS)
+        anxiety_level = random.randint(1, 5)
+        sleep_hours = np.random.normal(7, 2)  # Normal distribution around 7 hours
+        sleep_hours = max(0, min(12, sleep_hours))  # Clamp between 0-12
+        energy_level = random.randint(1, 5)
+        appetite = random.randint(1, 5)
+
+        # Generate journal text based on mood
+        journal_text = random.choice(JOURNAL_TEXTS[mood])
+
+        # Calculate risk score based on features
+        base_risk = MOOD_RISK[mood]
+
+        # Adjust risk based on other factors
+        if anxiety_level >= 4:
+            base_risk += 0.2
+        if sleep_hours < 6:
+            base_risk += 0.15
+        if energy_level <= 2:
+            base_risk += 0.1
+        if appetite <= 2:
+            base_risk += 0.1
+
+        # Add some randomness
+        base_risk += np.random.normal(0, 0.1)
+        base_risk = max(0, min(1, base_risk))
+
+        # Determine risk category
+        if base_risk < 0.3:
+            risk_category = 'low'
+        elif base_risk < 0.7:
+            risk_category = 'moderate'
+        else:
+            risk_category = 'high'
+
+        data.append({
+            'mood': mood,
+            'anxiety_level': anxiety_level,
+            'sleep_hours': sleep_hours,
+            'energy_level': energy_level,
+            'appetite': appetite,
+            'journal_text': journal_text,
+            'risk_category': risk_category,
+            'risk_score': base_risk
+        })
+
+    return pd.DataFrame(data)
+
+
+# Lookup tables for the vectorized generator, indexed by position in MOODS
+_MOOD_ARRAY = np.array(MOODS, dtype=object)
+_MOOD_RISK_ARRAY = np.array([MOOD_RISK[mood] for mood in MOODS])
+_JOURNAL_TABLE = np.array([JOURNAL_TEXTS[mood] for mood in MOODS], dtype=object)
+_CATEGORY_ARRAY = np.array(['low', 'moderate', 'high'], dtype=object)
+
+
+def generate_synthetic_data_fast(n_samples=1000, seed=42, rng=None):
+    """Vectorized equivalent of generate_synthetic_data.
+
+    Same columns, distributions and risk rules; the same seed always gives
+    the same rows (but not the rows of the loop-based generator).
+    """
+    rng = rng if rng is not None else np.random.default_rng(seed)
+
+    mood_index = rng.integers(0, len(MOODS), n_samples)
+    anxiety_level = rng.integers(1, 6, n_samples)
+    sleep_hours = np.clip(rng.normal(7, 2, n_samples), 0, 12)
+    energy_level = rng.integers(1, 6, n_samples)
+    appetite = rng.integers(1, 6, n_samples)
+    text_index = rng.integers(0, _JOURNAL_TABLE.shape[1], n_samples)
+
+    # Same additions, in the same order, as the loop
+    risk_score = _MOOD_RISK_ARRAY[mood_index]
+    risk_score = risk_score + np.where(anxiety_level >= 4, 0.2, 0.0)
+    risk_score = risk_score + np.where(sleep_hours < 6, 0.15, 0.0)
+    risk_score = risk_score + np.where(energy_level <= 2, 0.1, 0.0)
+    risk_score = risk_score + np.where(appetite <= 2, 0.1, 0.0)
+    risk_score = np.clip(risk_score + rng.normal(0, 0.1, n_samples), 0, 1)
+
+    # 0 = low (< 0.3), 1 = moderate (< 0.7), 2 = high
+    category_index = np.searchsorted([0.3, 0.7], risk_score, side='right')
+
+    return pd.DataFrame({
+        'mood': _MOOD_ARRAY[mood_index],
+        'anxiety_level': anxiety_level,
+        'sleep_hours': sleep_hours,
+        'energy_level': energy_level,
+        'appetite': appetite,
+        'journal_text': _JOURNAL_TABLE[mood_index, text_index],
+        'risk_category': _CATEGORY_ARRAY[category_index],
+        'risk_score': risk_score,
+    }, columns=COLUMNS)
+
+
+def iter_synthetic_chunks(n_samples, chunk_size=100_000, seed=42):
+    """Yield DataFrames of at most chunk_size rows, n_samples rows in total.
+
+    Each chunk gets its own child seed, so output is reproducible for a given
+    (n_samples, chunk_size, seed) and only one chunk is in memory at a time.
+    """
+    n_chunks = -(-n_samples // chunk_size)
+    children = np.random.SeedSequence(seed).spawn(n_chunks)
+    for i, child in enumerate(children):
+        rows = min(chunk_size, n_samples - i * chunk_size)
+        yield generate_synthetic_data_fast(rows, rng=np.random.default_rng(child))
+
+
+def write_synthetic_csv(path, n_samples, chunk_size=100_000, seed=42):
+    """Stream a synthetic dataset to CSV without holding it in memory"""
+    with open(path, 'w', newline='') as f:
+        for i, chunk in enumerate(iter_synthetic_chunks(n_samples, chunk_size, seed)):
+            chunk.to_csv(f, header=(i == 0), index=False)
+
+
+def distribution_stats(df):
+    """Summary statistics used to compare generators"""
+    stats = {}
+    for column in ['anxiety_level', 'sleep_hours', 'energy_level', 'appetite', 'risk_score']:
+        stats[f'{column}_mean'] = float(df[column].mean())
+        stats[f'{column}_std'] = float(df[column].std())
+    for column in ['mood', 'journal_text', 'risk_category']:
+        for value, share in df[column].value_counts(normalize=True).items():
+            stats[f'{column}={value}'] = float(share)
+    return stats
+
+
+def compare_generators(n_samples=20000, tolerance=0.02):
+    """Compare the distribution statistics of both generators.
+
+    Returns (loop_stats, fast_stats, mismatched_keys); a statistic mismatches
+    when it differs by more than tolerance (relative for means and standard
+    deviations, absolute for category shares).
+    """
+    loop_stats = distribution_stats(generate_synthetic_data(n_samples))
+    fast_stats = distribution_stats(generate_synthetic_data_fast(n_samples))
+    mismatched = []
+    for key in sorted(set(loop_stats) | set(fast_stats)):
+        expected, actual = loop_stats.get(key, 0.0), fast_stats.get(key, 0.0)
+        scale = abs(expected) if key.endswith(('_mean', '_std')) else 1.0
+        if abs(expected - actual) > tolerance * max(scale, 1e-9):
+            mismatched.append(key)
+    return loop_stats, fast_stats, mismatched
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--chunk-size', type=int, default=100_000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='CSV file to stream the dataset to')
+    parser.add_argument('--compare', type=int, metavar='N',
+                        help='compare N-row distribution statistics of both generators and exit')
+    args = parser.parse_args()
+
+    if args.compare:
+        loop_stats, fast_stats, mismatched = compare_generators(args.compare)
+        for key in sorted(loop_stats):
+            flag = '  <-- differs' if key in mismatched else ''
+            print(f"{key:40s} loop={loop_stats[key]:.4f} fast={fast_stats.get(key, 0.0):.4f}{flag}")
+        raise SystemExit(1 if mismatched else 0)
+
+    start = time.perf_counter()
+    if args.output:
+        write_synthetic_csv(args.output, args.rows, args.chunk_size, args.seed)
+        print(f"Wrote {args.rows:,} rows to {args.output} in {time.perf_counter() - start:.1f}s")
+    else:
+        rows = sum(len(chunk) for chunk in iter_synthetic_chunks(args.rows, args.chunk_size, args.seed))
+        print(f"Generated {rows:,} rows in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
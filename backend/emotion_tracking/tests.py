@@ -0,0 +1,1101 @@
+import contextlib
+import importlib
+import io
+import os
+import pickle
+import random
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from unittest import mock
+
+import numpy as np
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models import Avg, Count
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, force_authenticate
+from sklearn.ensemble import RandomForestClassifier
+
+from . import benchmark_models, catalogue, model_bundle, model_registry, prediction_cache, renderers, scoring_queue
+from .entry_writes import sync_entries
+from .features import (
+    INPUT_COLUMNS, FeaturePipeline, HashingTfidfVectorizer, check_parity, columns_from_frame,
+    columns_from_records, same_matrix,
+)
+from .incremental_training import IncrementalTrainer
+from .ml_models import CompiledForest, EmotionRiskPredictor
+from .models import (
+    DailyEmotionRollup, EmotionEntry, EmotionRollup, EmotionSummary, RiskAssessment, ScoringJob,
+    WeeklyEmotionRollup,
+)
+from .pagination import encode_cursor, paginate
+from .rollups import EMPTY_STATS, INTERVALS, rebuild_rollups
+from .scoring_client import ScoringClient, ScoringUnavailable
+from .scoring_server import ScoringServer
+from .serializers import (
+    EmotionEntryListSerializer, EmotionEntrySerializer, RiskAssessmentListSerializer, RiskAssessmentSerializer,
+)
+from .streaks import compute_streaks, streaks_from_dates
+from .synthetic_data import (
+    compare_generators, distribution_stats, generate_synthetic_data, generate_synthetic_data_fast,
+    iter_synthetic_chunks,
+)
+from .train_models import build_features, compact_model, compile_forest, save_bundle, train_models
+from .views import dashboard_summary, emotion_entries, emotion_entry_detail, emotion_stats, risk_assessments
+
+
+STREAK_FIELDS = ('streak_start', 'last_entry_date', 'current_streak', 'longest_streak')
+MOODS = [mood for mood, _ in EmotionEntry.MOOD_CHOICES]
+
+
+def fixed_predictions(emotion_data_list, journal_texts=None):
+    """Stand-in for predict_risk_batch that does not need a trained model"""
+    return [
+        {
+            'risk_score': round(1 - data['sleep_hours'] / 10, 2),
+            'risk_category': 'high' if data['sleep_hours'] < 5 else 'low',
+            'factor_codes': [], 'recommendation_codes': [], 'recommendations': [],
+            'feature_contributions': {}, 'model_version': 'test',
+        }
+        for data in emotion_data_list
+    ]
+
+
+def publish_model(model_dir, seed=0):
+    """Train a small forest and publish it as a bundle in model_dir; returns its version"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        X, y, pipeline = build_features(generate_synthetic_data_fast(300, seed=seed))
+        model = RandomForestClassifier(n_estimators=5, max_depth=4, random_state=seed).fit(X, y)
+        return save_bundle(model_dir, model, pipeline, compile_forest(model, X), {})
+
+
+class SyntheticDataTests(SimpleTestCase):
+
+    def test_fast_generator_matches_loop_distributions(self):
+        loop_stats, fast_stats, mismatched = compare_generators(20000, tolerance=0.02)
+        self.assertEqual(set(loop_stats), set(fast_stats))
+        self.assertEqual(mismatched, [], {
+            key: (loop_stats.get(key), fast_stats.get(key)) for key in mismatched
+        })
+
+    def test_fast_generator_is_deterministic_per_seed(self):
+        first = generate_synthetic_data_fast(1000, seed=7)
+        self.assertTrue(first.equals(generate_synthetic_data_fast(1000, seed=7)))
+        self.assertFalse(first.equals(generate_synthetic_data_fast(1000, seed=8)))
+
+    def test_chunks_cover_the_requested_rows(self):
+        chunks = list(iter_synthetic_chunks(2500, chunk_size=1000, seed=3))
+        self.assertEqual([len(chunk) for chunk in chunks], [1000, 1000, 500])
+        stats = distribution_stats(generate_synthetic_data_fast(2500, seed=3))
+        self.assertAlmostEqual(sum(value for key, value in stats.items() if key.startswith('mood=')), 1.0)
+
+
+class FeaturePipelineTests(SimpleTestCase):
+
+    def test_serving_matches_training_matrix(self):
+        # Training-time matrix vs predict_risk_batch's and predict_risk's inputs
+        self.assertEqual(check_parity(2000), (True, True))
+
+    def test_stored_pipeline_matches_training_matrix(self):
+        df = generate_synthetic_data(500)
+        # Entries without a journal reach the predictor as None
+        texts = [None if i % 7 == 0 else text for i, text in enumerate(df['journal_text'])]
+        df['journal_text'] = texts
+        columns = columns_from_frame(df)
+        # Fitted by train_models.py, and incrementally by train_incremental
+        for pipeline in (
+            FeaturePipeline().fit(columns),
+            FeaturePipeline(HashingTfidfVectorizer(n_features=256)).partial_fit(columns),
+        ):
+            X_train = pipeline.transform(columns)
+            # As EmotionRiskPredictor gets it back from the bundle
+            stored = pickle.loads(pickle.dumps(pipeline))
+            records = df[INPUT_COLUMNS[:-1]].to_dict('records')
+            X_serve = stored.transform(columns_from_records(records, texts))
+            self.assertTrue(same_matrix(X_train, X_serve))
+            self.assertEqual(X_serve.shape[1], stored.n_features)
+
+
+class CompactModelTests(SimpleTestCase):
+
+    def test_compact_pipeline_serves_the_pruned_columns(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            df = generate_synthetic_data(800)
+            X, y, pipeline = build_features(df)
+            model = RandomForestClassifier(n_estimators=40, max_depth=8, random_state=0).fit(X[:600], y[:600])
+            compiled = compile_forest(model, X)
+            forest, compact_pipeline, report = compact_model(
+                model, pipeline, compiled, X[600:700], y[600:700], X[700:], y[700:], tolerance=0.02, min_trees=10,
+            )
+        self.assertLess(report['features'][1], report['features'][0])
+
+        # The training-side matrix, cut to the columns the compact forest kept
+        names = pipeline.feature_names()
+        keep = [names.index(name) for name in compact_pipeline.feature_names()]
+        X_kept = X.tocsc()[:, keep]
+        X_served = compact_pipeline.transform(columns_from_frame(df))
+        self.assertTrue(same_matrix(X_kept, X_served))
+        np.testing.assert_array_equal(forest.predict_proba(X_served), forest.predict_proba(X_kept))
+
+        # And through the published bundle
+        model_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, model_dir)
+        with contextlib.redirect_stdout(io.StringIO()):
+            save_bundle(model_dir, None, compact_pipeline, forest, {})
+        predictor = EmotionRiskPredictor(model_dir=model_dir)
+        records = df[INPUT_COLUMNS[:-1]].to_dict('records')
+        results = predictor.predict_risk_batch(records, df['journal_text'].tolist())
+        expected = forest.predict_proba(X_kept)[:, EmotionRiskPredictor.RISK_SCORE_COLUMN]
+        self.assertEqual([result['risk_score'] for result in results], expected.tolist())
+
+
+class ForestExplanationTests(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        with contextlib.redirect_stdout(io.StringIO()):
+            X, y, _ = build_features(generate_synthetic_data_fast(400, seed=5))
+        cls.model = RandomForestClassifier(n_estimators=15, max_depth=6, random_state=0).fit(X[:300], y[:300])
+        cls.X = X[300:]
+
+    def assertAdditive(self, forest, column, groups, **kwargs):
+        probabilities, contributions, bias = forest.explain(self.X, column, groups, **kwargs)
+        self.assertEqual(contributions.shape, (self.X.shape[0], int(np.max(groups)) + 1))
+        np.testing.assert_array_equal(probabilities, self.model.predict_proba(self.X))
+        np.testing.assert_allclose(bias + contributions.sum(axis=1), probabilities[:, column], atol=1e-12)
+
+    def test_bias_plus_contributions_is_the_probability(self):
+        forest = CompiledForest.from_sklearn(self.model)
+        n_features = self.X.shape[1]
+        for column in range(len(forest.classes)):
+            # One group per column, numeric columns plus one text group, and everything in one group
+            self.assertAdditive(forest, column, np.arange(n_features))
+            self.assertAdditive(forest, column, np.minimum(np.arange(n_features), 5))
+            self.assertAdditive(forest, column, np.zeros(n_features, dtype=int))
+
+    def test_chunked_and_sklearn_leaves_explain_the_same(self):
+        forest = CompiledForest.from_sklearn(self.model)
+        groups = np.minimum(np.arange(self.X.shape[1]), 5)
+        expected = forest.explain(self.X, 1, groups)
+        forest.CHUNK_ROWS = 30
+        chunked = forest.explain(self.X, 1, groups)
+        sklearn_leaves = forest.explain(
+            self.X, 1, groups, leaf_finder=lambda X: self.model.apply(X).T + forest.roots[:, None],
+        )
+        for explanation in (chunked, sklearn_leaves):
+            np.testing.assert_array_equal(explanation[0], expected[0])
+            np.testing.assert_allclose(explanation[1], expected[1], atol=1e-12)
+            self.assertEqual(explanation[2], expected[2])
+        self.assertAdditive(forest, 1, groups)
+
+    def test_path_contributions_sum_to_the_change_from_the_root(self):
+        forest = CompiledForest.from_sklearn(self.model)
+        table = forest.path_contributions(1, np.arange(self.X.shape[1]))
+        nodes = np.arange(len(forest.feature))
+        tree_roots = forest.roots[np.searchsorted(forest.roots, nodes, side='right') - 1]
+        np.testing.assert_allclose(table.sum(axis=0), forest.value[nodes, 1] - forest.value[tree_roots, 1], atol=1e-12)
+        np.testing.assert_array_equal(table[:, forest.roots], 0)
+        self.assertIs(forest.path_contributions(1, np.arange(self.X.shape[1])), table)
+
+
+    def test_served_contributions_add_up_to_the_risk_score(self):
+        model_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, model_dir)
+        publish_model(model_dir, seed=5)
+        predictor = EmotionRiskPredictor(model_dir=model_dir)
+        df = generate_synthetic_data_fast(50, seed=6)
+        results = predictor.predict_risk_batch(df[INPUT_COLUMNS[:-1]].to_dict('records'), df['journal_text'].tolist())
+        bias = predictor.compiled_forest._bias(EmotionRiskPredictor.RISK_SCORE_COLUMN)
+        for result in results:
+            contributions = result['feature_contributions']
+            # Each contribution is rounded to 4 decimals
+            self.assertAlmostEqual(bias + sum(contributions.values()), result['risk_score'],
+                                   delta=0.5e-4 * len(contributions))
+
+class PredictionCacheTests(SimpleTestCase):
+    ENTRY = {'mood': 'sad', 'anxiety_level': 4, 'sleep_hours': 5.5, 'energy_level': 2, 'appetite': 3}
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = prediction_cache.PredictionCache(max_size=2)
+        cache.set('a', {'risk_score': 0.1})
+        cache.set('b', {'risk_score': 0.2})
+        self.assertEqual(cache.get('a'), {'risk_score': 0.1})
+        cache.set('c', {'risk_score': 0.3})
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), {'risk_score': 0.1})
+        self.assertEqual(cache.get('c'), {'risk_score': 0.3})
+        self.assertEqual(cache.stats(), {
+            'backend': 'local', 'size': 2, 'max_size': 2, 'hits': 3, 'misses': 1, 'evictions': 1,
+        })
+
+    def test_entries_expire_after_ttl(self):
+        cache = prediction_cache.PredictionCache(ttl=60)
+        with mock.patch.object(prediction_cache.time, 'monotonic', return_value=1000.0):
+            cache.set('a', {'risk_score': 0.1})
+        with mock.patch.object(prediction_cache.time, 'monotonic', return_value=1060.0):
+            self.assertEqual(cache.get('a'), {'risk_score': 0.1})
+        with mock.patch.object(prediction_cache.time, 'monotonic', return_value=1060.1):
+            self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.stats()['size'], 0)
+
+    def test_cached_results_are_copies(self):
+        cache = prediction_cache.PredictionCache()
+        result = {'recommendations': ['rest']}
+        cache.set('a', result)
+        result['recommendations'].append('changed')
+        cache.get('a')['recommendations'].append('changed')
+        self.assertEqual(cache.get('a'), {'recommendations': ['rest']})
+
+    def test_key_covers_inputs_model_version_and_result_format(self):
+        key = prediction_cache.prediction_key
+        expected = key(self.ENTRY, 'Long  day at\twork', 'v1')
+        # Case and whitespace do not change the text features, nor a numeric string the numbers
+        self.assertEqual(key(self.ENTRY, 'long day at work ', 'v1'), expected)
+        self.assertEqual(key({**self.ENTRY, 'sleep_hours': '5.5'}, 'long day at work', 'v1'), expected)
+        self.assertNotEqual(key(self.ENTRY, 'long day off work', 'v1'), expected)
+        self.assertNotEqual(key({**self.ENTRY, 'appetite': 4}, 'long day at work', 'v1'), expected)
+        self.assertNotEqual(key(self.ENTRY, 'long day at work', 'v2'), expected)
+        with mock.patch.object(prediction_cache, 'RESULT_FORMAT', prediction_cache.RESULT_FORMAT + 1):
+            self.assertNotEqual(key(self.ENTRY, 'long day at work', 'v1'), expected)
+
+    def test_model_reload_clears_the_cache(self):
+        model_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, model_dir)
+        first = publish_model(model_dir, seed=1)
+        cache = prediction_cache.PredictionCache()
+        with override_settings(ML_MODEL_DIR=model_dir), \
+                mock.patch.object(model_registry, '_registry', None), \
+                mock.patch.object(prediction_cache, '_cache', cache), \
+                mock.patch.object(model_registry, 'get_scoring_client', return_value=None):
+            entries = [self.ENTRY, {**self.ENTRY, 'mood': 'happy'}]
+            scored = model_registry.predict_risk_batch(entries, ['', ''])
+            self.assertEqual({result['model_version'] for result in scored}, {first})
+            self.assertEqual(model_registry.predict_risk_batch(entries, ['', '']), scored)
+            self.assertEqual((cache.stats()['size'], cache.hits, cache.misses), (2, 2, 2))
+
+            second = publish_model(model_dir, seed=2)
+            model_registry.get_registry().reload()
+            self.assertEqual(cache.stats()['size'], 0)
+            rescored = model_registry.predict_risk_batch(entries, ['', ''])
+            self.assertEqual({result['model_version'] for result in rescored}, {second})
+            self.assertEqual(cache.misses, 4)
+
+
+class ModelRegistryTests(SimpleTestCase):
+
+    def setUp(self):
+        self.model_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.model_dir)
+        self.first = publish_model(self.model_dir, seed=1)
+        self.registry = model_registry.ModelRegistry(model_dir=self.model_dir, check_interval=0)
+        self.reloaded = []
+        self.registry.add_reload_listener(self.reloaded.append)
+
+    def test_reloads_when_current_changes(self):
+        predictor = self.registry.get_predictor()
+        self.assertEqual(predictor.model_version, self.first)
+        self.assertIs(self.registry.get_predictor(), predictor)
+
+        second = publish_model(self.model_dir, seed=2)
+        self.assertNotEqual(second, self.first)
+        reloaded = self.registry.get_predictor()
+        self.assertEqual((reloaded.model_version, self.registry.version), (second, second))
+        self.assertEqual(self.reloaded, [predictor, reloaded])
+
+        # Pointing CURRENT back at the earlier bundle is a reload too
+        with open(os.path.join(self.model_dir, model_bundle.CURRENT_FILE), 'w') as f:
+            f.write(self.first + '\n')
+        self.assertEqual(self.registry.get_predictor().model_version, self.first)
+
+    def test_changes_are_noticed_after_the_check_interval(self):
+        self.registry.check_interval = 60
+        predictor = self.registry.get_predictor()
+        second = publish_model(self.model_dir, seed=2)
+        self.assertIs(self.registry.get_predictor(), predictor)
+        self.assertEqual(self.registry.reload().model_version, second)
+
+    def test_broken_bundle_keeps_the_old_model(self):
+        predictor = self.registry.get_predictor()
+        second = publish_model(self.model_dir, seed=2)
+        bundle_dir = os.path.join(self.model_dir, model_bundle.BUNDLES_DIR, second)
+        with open(os.path.join(bundle_dir, 'objects', 'feature_pipeline.joblib'), 'ab') as f:
+            f.write(b'corrupt')
+
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            self.assertIs(self.registry.get_predictor(), predictor)
+        self.assertIn('missing or corrupt', output.getvalue())
+        self.assertEqual(self.registry.version, self.first)
+        self.assertEqual(self.reloaded, [predictor])
+        entry = {'mood': 'sad', 'anxiety_level': 4, 'sleep_hours': 5, 'energy_level': 2, 'appetite': 3}
+        self.assertEqual(predictor.predict_risk_batch([entry])[0]['model_version'], self.first)
+
+        # A pointer to a bundle that does not exist is kept out the same way
+        with open(os.path.join(self.model_dir, model_bundle.CURRENT_FILE), 'w') as f:
+            f.write('missing\n')
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertIs(self.registry.get_predictor(), predictor)
+
+        # and the next good bundle is picked up
+        third = publish_model(self.model_dir, seed=3)
+        self.assertEqual(self.registry.get_predictor().model_version, third)
+
+
+class ScoringServerTests(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.model_dir = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, cls.model_dir)
+        with contextlib.redirect_stdout(io.StringIO()):
+            train_models(n_samples=600, model_dir=cls.model_dir)
+        cls.predictor = EmotionRiskPredictor(model_dir=cls.model_dir)
+        df = generate_synthetic_data_fast(200, seed=11)
+        cls.entries = df[INPUT_COLUMNS[:-1]].to_dict('records')
+        cls.texts = df['journal_text'].tolist()
+        cls.expected = cls.predictor.predict_risk_batch(cls.entries, cls.texts)
+
+    def setUp(self):
+        self.socket_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.socket_dir)
+        self.socket_path = os.path.join(self.socket_dir, 'scoring.sock')
+
+    def start_server(self):
+        server = ScoringServer(self.socket_path, score_batch=self.predictor.predict_risk_batch)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server
+
+    def test_server_scores_match_in_process(self):
+        server = self.start_server()
+        client = ScoringClient(self.socket_path, pool_size=8)
+        self.addCleanup(client.close)
+
+        def score(i):
+            return client.predict_risk_batch([self.entries[i]], [self.texts[i]])[0]
+
+        # Concurrent single-entry requests are batched by the server
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            self.assertEqual(list(pool.map(score, range(len(self.entries)))), self.expected)
+        self.assertEqual(server.batcher.rows, len(self.entries))
+        self.assertEqual(client.predict_risk_batch(self.entries[:20], self.texts[:20]), self.expected[:20])
+
+    def test_client_falls_back_without_server(self):
+        client = ScoringClient(self.socket_path, retry_interval=60)
+        with self.assertLogs('emotion_tracking.scoring_client', 'WARNING'), self.assertRaises(ScoringUnavailable):
+            client.predict_risk_batch(self.entries[:1], self.texts[:1])
+
+        # predict_risk_batch scores in process instead
+        with mock.patch.object(model_registry, 'get_scoring_client', return_value=client), \
+                mock.patch.object(model_registry, 'predict_risk_batch_local', self.predictor.predict_risk_batch):
+            self.assertEqual(model_registry.predict_risk_batch(self.entries, self.texts), self.expected)
+        # and the missing server is not tried again until the retry interval passes
+        self.start_server()
+        with self.assertRaisesMessage(ScoringUnavailable, 'marked unavailable'):
+            client.predict_risk_batch(self.entries[:1], self.texts[:1])
+
+
+class BenchmarkBaselineTests(SimpleTestCase):
+
+    def results(self, parity_mismatches=0, **metrics):
+        results = {
+            'meta': {'rows': 2000, 'model_version': 'v1', 'machine': 'x86_64', 'python': '3.12',
+                     'numpy': '2.0', 'sklearn': '1.5'},
+            'load': {'warm_seconds': 1.0},
+            'latency': {'p50_ms': 1.0, 'p95_ms': 2.0, 'p99_ms': 3.0},
+            'throughput': {'batch_rows_per_sec': 1000.0},
+            'memory': {'peak_rss_mb': 100.0},
+            'parity': {'mismatches': parity_mismatches},
+        }
+        for path, value in metrics.items():
+            section, key = path.split('__')
+            results[section][key] = value
+        return results
+
+    def test_regressions_respect_direction_and_tolerance(self):
+        compare = benchmark_models.compare_to_baseline
+        baseline = self.results()
+        self.assertEqual(compare(self.results(), baseline), [])
+        # Lower is better for latency: slower beyond the tolerance regresses, faster never does
+        self.assertEqual(compare(self.results(latency__p95_ms=2.4), baseline, tolerance=0.2), [])
+        self.assertEqual(len(compare(self.results(latency__p95_ms=2.5), baseline, tolerance=0.2)), 1)
+        self.assertEqual(compare(self.results(latency__p95_ms=0.5), baseline, tolerance=0.2), [])
+        # Higher is better for throughput
+        self.assertEqual(compare(self.results(throughput__batch_rows_per_sec=5000.0), baseline), [])
+        [message] = compare(self.results(throughput__batch_rows_per_sec=700.0), baseline, tolerance=0.2)
+        self.assertTrue(message.startswith('throughput.batch_rows_per_sec'))
+        self.assertEqual(compare(self.results(throughput__batch_rows_per_sec=700.0), baseline, tolerance=0.5), [])
+
+    def test_missing_baseline_metrics_are_skipped_and_parity_is_gated(self):
+        baseline = self.results()
+        del baseline['memory']['peak_rss_mb']
+        self.assertEqual(benchmark_models.compare_to_baseline(self.results(memory__peak_rss_mb=900.0), baseline), [])
+        [message] = benchmark_models.compare_to_baseline(self.results(parity_mismatches=3), baseline)
+        self.assertTrue(message.startswith('parity.mismatches'))
+
+    def test_baseline_metadata_mismatches(self):
+        baseline = self.results()
+        self.assertEqual(benchmark_models.baseline_mismatches(self.results(), baseline), ([], []))
+        results = self.results()
+        results['meta'].update(rows=5000, model_version='v2', machine='arm64')
+        incomparable, environment = benchmark_models.baseline_mismatches(results, baseline)
+        self.assertEqual([message.split(':')[0] for message in incomparable], ['rows', 'model_version'])
+        self.assertEqual([message.split(':')[0] for message in environment], ['machine'])
+
+
+class IncrementalTrainingTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('incremental', password=None)
+        self.model_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.model_dir)
+        categories = ['low', 'moderate', 'high']
+        start = date(2025, 1, 1)
+        for i in range(90):
+            EmotionEntry.objects.create(
+                user=self.user, date=start + timedelta(days=i), mood='neutral', anxiety_level=i % 5 + 1,
+                sleep_hours=4 + i % 5, energy_level=3, appetite=3,
+                # The model's prediction, which must not be used as a label
+                risk_score=0.5, risk_category='moderate',
+                # Every other entry reviewed
+                confirmed_risk_category=categories[i % 3] if i % 2 == 0 else None,
+                risk_confirmed_at=timezone.now() + timedelta(seconds=i) if i % 2 == 0 else None,
+            )
+
+    def test_trains_on_confirmed_labels_only(self):
+        trainer = IncrementalTrainer(model_dir=self.model_dir)
+        trainer.load_state(reset=True)
+        rows = list(trainer.pending_rows())
+        self.assertEqual(len(rows), 45)
+        confirmed = dict(EmotionEntry.objects.exclude(confirmed_risk_category=None)
+                         .values_list('id', 'confirmed_risk_category'))
+        self.assertEqual({row[0]: row[-1] for row in rows}, confirmed)
+
+    def test_run_records_label_source_and_resumes(self):
+        trainer = IncrementalTrainer(model_dir=self.model_dir, chunk_size=20, batch_rows=20, trees_per_batch=2)
+        self.assertIsNotNone(trainer.run(stdout=io.StringIO()))
+        manifest = model_bundle.read_bundle(self.model_dir, mmap_mode=None).manifest
+        self.assertEqual(manifest['training']['labels'], 'confirmed')
+
+        resumed = IncrementalTrainer(model_dir=self.model_dir)
+        resumed.load_state()
+        self.assertEqual(len(list(resumed.pending_rows())), 45 - manifest['training']['rows_seen'])
+        # A bundle trained on confirmed labels is not continued by self-training
+        self_training = IncrementalTrainer(model_dir=self.model_dir, labels='predicted')
+        self.assertEqual(self_training.load_state()['checkpoint'], None)
+
+
+class AssessmentCodesTests(SimpleTestCase):
+
+    def test_codes_expand_to_catalogue_text(self):
+        assessment = RiskAssessment(factor_codes=[1, 3, 99], recommendation_codes=[10, 15, 99])
+        self.assertEqual(assessment.contributing_factors, {
+            'sleep': 'Poor sleep may be affecting your wellbeing', 'anxiety': 'High anxiety levels detected',
+        })
+        self.assertEqual(assessment.recommendations, [
+            'Consider reaching out to a healthcare professional', 'Try to get at least 7-8 hours of sleep',
+        ])
+        self.assertEqual(RiskAssessment().contributing_factors, {})
+        self.assertEqual(RiskAssessment().recommendations, [])
+
+    def test_codes_round_trip_through_the_catalogue(self):
+        factor_codes = {factor: code for code, factor in catalogue.FACTORS.items()}
+        recommendation_codes = {text: code for code, text in catalogue.RECOMMENDATIONS.items()}
+        df = generate_synthetic_data_fast(300, seed=4)
+        for data, category in zip(df[INPUT_COLUMNS[:-1]].to_dict('records'), df['risk_category']):
+            codes = catalogue.factor_codes(data)
+            self.assertEqual([factor_codes[item] for item in catalogue.expand_factors(codes).items()], codes)
+            codes = catalogue.recommendation_codes(category, data)
+            self.assertEqual([recommendation_codes[text] for text in catalogue.expand_recommendations(codes)], codes)
+
+    def test_migration_catalogue_is_a_frozen_prefix(self):
+        # Codes are persisted: the catalogue may grow but never renumber
+        migration = importlib.import_module('emotion_tracking.migrations.0004_riskassessment_codes')
+        self.assertLessEqual(migration.FACTORS.items(), catalogue.FACTORS.items())
+        self.assertLessEqual(migration.RECOMMENDATIONS.items(), catalogue.RECOMMENDATIONS.items())
+
+
+class AssessmentCodesMigrationTests(TransactionTestCase):
+    before = [('emotion_tracking', '0003_scoringjob')]
+    after = [('emotion_tracking', '0004_riskassessment_codes')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        self.migrate(executor.loader.graph.leaf_nodes('emotion_tracking'))
+        super().tearDown()
+
+    def test_text_is_converted_to_codes_and_back(self):
+        apps = self.migrate(self.before)
+        user = get_user_model().objects.create_user('migrated', password=None)
+        RiskAssessment = apps.get_model('emotion_tracking', 'RiskAssessment')
+        RiskAssessment.objects.create(
+            user_id=user.pk, date=date(2025, 1, 8), risk_category='high', risk_score=0.8,
+            contributing_factors={
+                'sleep': 'Poor sleep may be affecting your wellbeing',
+                'mood': 'Current mood (sad) may need attention',
+                'custom': 'Not in the catalogue',
+            },
+            recommendations=[
+                'Consider reaching out to a healthcare professional', 'Not in the catalogue',
+                'Try to get at least 7-8 hours of sleep',
+            ],
+        )
+        RiskAssessment.objects.create(user_id=user.pk, date=date(2025, 1, 9), risk_category='low', risk_score=0.1)
+
+        apps = self.migrate(self.after)
+        RiskAssessment = apps.get_model('emotion_tracking', 'RiskAssessment')
+        self.assertEqual(
+            list(RiskAssessment.objects.order_by('date').values_list('factor_codes', 'recommendation_codes')),
+            [([1, 4], [10, 15]), ([], [])],
+        )
+
+        # Reversing restores the text the catalogue can represent
+        apps = self.migrate(self.before)
+        RiskAssessment = apps.get_model('emotion_tracking', 'RiskAssessment')
+        self.assertEqual(
+            list(RiskAssessment.objects.order_by('date').values_list('contributing_factors', 'recommendations')),
+            [
+                ({'sleep': 'Poor sleep may be affecting your wellbeing',
+                  'mood': 'Current mood (sad) may need attention'},
+                 ['Consider reaching out to a healthcare professional', 'Try to get at least 7-8 hours of sleep']),
+                ({}, []),
+            ],
+        )
+
+
+class EntryDataTestCase(TestCase):
+    """Entries written through the models, the views and sync_entries"""
+
+    def setUp(self):
+        # Cached responses are keyed by user id, which the rolled back
+        # database hands out again
+        caches['default'].clear()
+        self.factory = APIRequestFactory()
+        self.today = timezone.now().date()
+        scoring = mock.patch('emotion_tracking.entry_writes.predict_risk_batch', fixed_predictions)
+        scoring.start()
+        self.addCleanup(scoring.stop)
+
+    def make_user(self, name):
+        return get_user_model().objects.create_user(name, password=None)
+
+    def add_entry(self, user, day, **fields):
+        fields = {'mood': 'neutral', 'anxiety_level': 3, 'sleep_hours': 7, 'energy_level': 3, 'appetite': 3,
+                  **fields}
+        return EmotionEntry.objects.create(user=user, date=day, **fields)
+
+    def call(self, view, user, method, path, *args, data=None, headers=None):
+        request = getattr(self.factory, method)(path, data, format='json' if data is not None else None,
+                                                **{f"HTTP_{name.upper().replace('-', '_')}": value
+                                                   for name, value in (headers or {}).items()})
+        force_authenticate(request, user=user)
+        return view(request, *args)
+
+    def rollup_rows(self, user):
+        # Float sums depend on the order the database adds rows in
+        def rounded(rows):
+            return [{name: round(value, 6) if isinstance(value, float) else value for name, value in row.items()}
+                    for row in rows]
+        return (
+            rounded(DailyEmotionRollup.objects.filter(user=user).order_by('date')
+                    .values('date', *EmotionRollup.SUM_FIELDS)),
+            rounded(WeeklyEmotionRollup.objects.filter(user=user).order_by('week_start')
+                    .values('week_start', *EmotionRollup.SUM_FIELDS)),
+        )
+
+    def assertMaintained(self, user, msg=None):
+        """The user's summary and rollups match a computation from scratch"""
+        stored = EmotionSummary.objects.get(user=user)
+        stored = {field: getattr(stored, field) for field in STREAK_FIELDS}
+        dates = list(EmotionEntry.objects.filter(user=user).order_by('date').values_list('date', flat=True))
+        self.assertEqual(stored, compute_streaks(EmotionEntry, user.pk), msg)
+        self.assertEqual(stored, streaks_from_dates(dates), msg)
+        maintained = self.rollup_rows(user)
+        rebuild_rollups(user.pk)
+        self.assertEqual(maintained, self.rollup_rows(user), msg)
+
+
+class SummaryMaintenanceTests(EntryDataTestCase):
+
+    def test_random_writes(self):
+        # Adds, backfills, date moves and deletes in random order
+        rng = random.Random(0)
+        user = self.make_user('maintenance')
+        days = list(range(120))
+        rng.shuffle(days)
+        entries = {}
+        for step, offset in enumerate(days):
+            entries[offset] = self.add_entry(user, self.today - timedelta(days=offset))
+            if step % 7 == 3:
+                # Move an entry to a free day
+                entry = entries.pop(rng.choice(list(entries)))
+                free = max(days) + 1 + step
+                entry.date = self.today - timedelta(days=free)
+                entry.save()
+                entries[free] = entry
+            if step % 11 == 5:
+                entries.pop(rng.choice(list(entries))).delete()
+            self.assertMaintained(user, f"step {step}")
+
+    def test_sync_batches(self):
+        # Bulk upserts that bypass save()
+        rng = random.Random(2)
+        user = self.make_user('sync')
+        for offset in range(0, 60, 3):
+            self.add_entry(user, self.today - timedelta(days=offset))
+        for batch in range(5):
+            # Overwrites, backfills and fresh days, with a repeated date and an invalid item
+            offsets = rng.sample(range(90), 15)
+            items = [
+                {'date': self.today - timedelta(days=offset), 'mood': rng.choice(MOODS),
+                 'anxiety_level': rng.randint(1, 5), 'sleep_hours': round(rng.uniform(3, 10), 1),
+                 'energy_level': rng.randint(1, 5), 'appetite': rng.randint(1, 5)}
+                for offset in offsets + offsets[:1]
+            ] + [{'date': self.today, 'mood': 'unknown'}]
+            version = EmotionSummary.objects.get(user=user).data_version
+            statuses = [result['status'] for result in sync_entries(user, items)]
+            self.assertEqual(statuses[0], 'superseded')
+            self.assertEqual(statuses[-1], 'invalid')
+            self.assertEqual(statuses.count('invalid'), 1)
+            self.assertGreater(EmotionSummary.objects.get(user=user).data_version, version)
+            entries = dict(EmotionEntry.objects.filter(user=user).values_list('date', 'risk_score'))
+            assessments = dict(RiskAssessment.objects.filter(user=user).values_list('date', 'risk_score'))
+            for day in {item['date'] for item in items[:-1]}:
+                self.assertEqual(assessments[day], entries[day])
+            self.assertMaintained(user, f"sync batch {batch}")
+
+    def test_admin_bulk_deletes(self):
+        # "Delete selected" deletes a queryset, bypassing delete()
+        users = [self.make_user('bulk-1'), self.make_user('bulk-2')]
+        for user in users:
+            for offset in range(10):
+                self.add_entry(user, self.today - timedelta(days=offset), sleep_hours=4 + offset / 2)
+            RiskAssessment.objects.create(user=user, date=self.today, risk_category='low', risk_score=0.1)
+        request = self.factory.post('/admin/')
+        versions = dict(EmotionSummary.objects.values_list('user_id', 'data_version'))
+
+        # Split the first user's streak, empty a week and take the latest entry
+        admin.site._registry[EmotionEntry].delete_queryset(request, EmotionEntry.objects.filter(
+            user=users[0], date__in=[self.today - timedelta(days=offset) for offset in (0, 4, 5, 6, 7, 8)],
+        ))
+        self.assertMaintained(users[0])
+        self.assertEqual(EmotionSummary.objects.get(user=users[0]).current_streak, 3)
+        self.assertMaintained(users[1])
+
+        admin.site._registry[RiskAssessment].delete_queryset(request, RiskAssessment.objects.all())
+        self.assertEqual(
+            {user_id: version - versions[user_id]
+             for user_id, version in EmotionSummary.objects.values_list('user_id', 'data_version')},
+            {users[0].pk: 2, users[1].pk: 1},
+        )
+
+
+class StatsTests(EntryDataTestCase):
+
+    def entry_stats(self, user, start_date):
+        """The emotion_stats response computed directly from the entries"""
+        entries = EmotionEntry.objects.filter(user=user, date__gte=start_date)
+        if not entries.exists():
+            return dict(EMPTY_STATS)
+        stats = entries.aggregate(
+            avg_anxiety=Avg('anxiety_level'),
+            avg_sleep=Avg('sleep_hours'),
+            avg_energy=Avg('energy_level'),
+            avg_appetite=Avg('appetite'),
+        )
+        mood_dist = entries.values('mood').annotate(count=Count('mood')).order_by('mood')
+        daily = entries.values('date').annotate(avg_risk=Avg('risk_score'), count=Count('id')).order_by('date')
+        return {
+            'avg_anxiety': round(stats['avg_anxiety'] or 0, 2),
+            'avg_sleep': round(stats['avg_sleep'] or 0, 2),
+            'avg_energy': round(stats['avg_energy'] or 0, 2),
+            'avg_appetite': round(stats['avg_appetite'] or 0, 2),
+            'mood_distribution': {item['mood']: item['count'] for item in mood_dist},
+            'risk_trend': [
+                {'date': item['date'].strftime('%Y-%m-%d'), 'risk_score': round(item['avg_risk'], 2),
+                 'entries': item['count']}
+                for item in daily if item['avg_risk'] is not None
+            ],
+            'entries_count': entries.count(),
+        }
+
+    def test_rollup_stats_match_entries(self):
+        rng = random.Random(1)
+        user = self.make_user('stats')
+        for offset in rng.sample(range(400), 250):
+            entry = self.add_entry(
+                user, self.today - timedelta(days=offset), mood=rng.choice(MOODS),
+                anxiety_level=rng.randint(1, 5), sleep_hours=round(rng.uniform(3, 10), 1),
+                energy_level=rng.randint(1, 5), appetite=rng.randint(1, 5),
+            )
+            # Leave some entries unscored, as asynchronous scoring does
+            if rng.random() < 0.8:
+                entry.risk_score = rng.random()
+                entry.risk_category = 'low'
+                entry.save(update_fields=['risk_score', 'risk_category', 'updated_at'])
+
+        for days in (1, 7, 30, 90, 365, 1000):
+            expected = self.entry_stats(user, self.today - timedelta(days=days))
+            with self.subTest(days=days):
+                results = {
+                    interval: self.call(emotion_stats, user, 'get', '/api/emotions/stats/',
+                                        data={'days': days, 'interval': interval}).data
+                    for interval in INTERVALS
+                }
+                self.assertEqual(results['day'], expected)
+                # Weekly buckets have the same totals
+                self.assertEqual({**results['week'], 'risk_trend': results['day']['risk_trend']}, expected)
+
+    def test_dashboard_query_count_does_not_grow_with_streak(self):
+        for length in (1, 30, 300):
+            user = self.make_user(f'dashboard-{length}')
+            for offset in range(length - 1, -1, -1):
+                self.add_entry(user, self.today - timedelta(days=offset))
+            with self.subTest(streak=length), self.assertNumQueries(5):
+                response = self.call(dashboard_summary, user, 'get', '/api/emotions/dashboard/')
+            self.assertEqual(response.data['streak'], length)
+
+
+@override_settings(ML_SCORING_MODE='sync')
+class EntryWriteTests(EntryDataTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.make_user('writes')
+        # A user's first write computes their summary from the entries once
+        EmotionSummary.for_user(self.user)
+        # A Wednesday: the day before is in the same week
+        self.day = date(2025, 1, 8)
+
+    def post(self, day, **fields):
+        body = {'date': str(day), 'mood': 'sad', 'anxiety_level': 4, 'sleep_hours': 5,
+                'energy_level': 2, 'appetite': 2, 'journal_text': 'tired', **fields}
+        return self.call(emotion_entries, self.user, 'post', '/api/emotions/entries/', data=body)
+
+    # Eight statements is the floor: the transaction's savepoint and release,
+    # the (user, date) lookup that tells a new entry from a replacement, the
+    # entry, its assessment, the summary (streak and data version in one
+    # UPDATE), the day's rollup and the week's re-sum
+
+    def test_post_new_day(self):
+        self.post(self.day - timedelta(days=1))
+        with self.assertNumQueries(8):
+            response = self.post(self.day)
+        self.assertEqual(response.status_code, 201)
+        self.assertMaintained(self.user)
+
+    def test_post_same_day_replaces_entry(self):
+        created = self.post(self.day).data
+        with self.assertNumQueries(8):
+            response = self.post(self.day, mood='happy', sleep_hours=8)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['id'], created['id'])
+        entry = EmotionEntry.objects.get(pk=created['id'])
+        self.assertEqual((entry.mood, entry.sleep_hours), ('happy', 8))
+        self.assertEqual(RiskAssessment.objects.get(user=self.user, date=self.day).risk_score, entry.risk_score)
+        self.assertMaintained(self.user)
+
+    def test_put_updates_entry_and_assessment(self):
+        entry_id = self.post(self.day).data['id']
+        path = f'/api/emotions/entries/{entry_id}/'
+        with self.assertNumQueries(8):
+            response = self.call(emotion_entry_detail, self.user, 'put', path, entry_id, data={'sleep_hours': 8})
+        self.assertEqual(response.status_code, 200)
+        entry = EmotionEntry.objects.get(pk=entry_id)
+        self.assertEqual(entry.sleep_hours, 8)
+        self.assertEqual(RiskAssessment.objects.get(user=self.user, date=self.day).risk_score, entry.risk_score)
+        self.assertMaintained(self.user)
+
+    def test_put_onto_a_taken_date_is_rejected(self):
+        self.post(self.day - timedelta(days=1))
+        entry_id = self.post(self.day).data['id']
+        path = f'/api/emotions/entries/{entry_id}/'
+        response = self.call(emotion_entry_detail, self.user, 'put', path, entry_id,
+                             data={'date': str(self.day - timedelta(days=1))})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('date', response.data)
+        self.assertEqual(EmotionEntry.objects.get(pk=entry_id).date, self.day)
+        self.assertMaintained(self.user)
+
+    def test_first_entry_of_a_week(self):
+        # The in-place re-sum finds no week row, so it is summed and inserted
+        self.post(self.day - timedelta(days=7))
+        with self.assertNumQueries(10):
+            response = self.post(self.day)
+        self.assertEqual(response.status_code, 201)
+        self.assertMaintained(self.user)
+
+
+@override_settings(ML_SCORING_MODE='async',
+                   ML_SCORING_QUEUE={'RETRY_DELAY': 10, 'MAX_ATTEMPTS': 3, 'LOCK_TIMEOUT': 300})
+class ScoringQueueTests(EntryDataTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.make_user('queued')
+        self.day = date(2025, 1, 8)
+
+    def post(self, **fields):
+        body = {'date': str(self.day), 'mood': 'sad', 'anxiety_level': 4, 'sleep_hours': 4,
+                'energy_level': 2, 'appetite': 2, 'journal_text': 'tired', **fields}
+        return self.call(emotion_entries, self.user, 'post', '/api/emotions/entries/', data=body)
+
+    def scoring(self, side_effect=fixed_predictions):
+        return mock.patch.object(scoring_queue, 'predict_risk_batch', side_effect=side_effect)
+
+    def test_write_queues_the_entry_instead_of_scoring_it(self):
+        response = self.post()
+        self.assertEqual(response.status_code, 201)
+        self.assertIsNone(response.data['risk_category'])
+        self.assertNotIn('recommendations', response.data)
+        job = ScoringJob.objects.get(entry_id=response.data['id'])
+        self.assertEqual((job.status, job.attempts), ('pending', 0))
+        self.assertFalse(RiskAssessment.objects.exists())
+
+        # Rewriting the entry resets its job rather than adding another
+        ScoringJob.objects.filter(pk=job.pk).update(status='failed', attempts=3, last_error='boom')
+        self.post(mood='happy')
+        job = ScoringJob.objects.get()
+        self.assertEqual((job.status, job.attempts, job.last_error), ('pending', 0, ''))
+
+    def test_claimed_jobs_are_scored_into_assessments(self):
+        entry_id = self.post().data['id']
+        with self.scoring() as predict:
+            self.assertEqual(scoring_queue.run_once('worker-1'), 1)
+        predict.assert_called_once()
+        job = ScoringJob.objects.get()
+        self.assertEqual((job.status, job.attempts, job.locked_by, job.locked_at), ('done', 1, '', None))
+        entry = EmotionEntry.objects.get(pk=entry_id)
+        self.assertEqual((entry.risk_category, entry.risk_score), ('high', 0.6))
+        assessment = RiskAssessment.objects.get(user=self.user, date=self.day)
+        self.assertEqual((assessment.risk_category, assessment.risk_score, assessment.model_version),
+                         ('high', 0.6, 'test'))
+        # Nothing left to claim
+        self.assertEqual(scoring_queue.run_once('worker-1'), 0)
+
+    def test_failures_are_retried_with_backoff_then_failed(self):
+        self.post()
+        start = timezone.now()
+        with self.scoring(RuntimeError('model unavailable')):
+            self.assertEqual(scoring_queue.run_once('worker-1'), 1)
+            job = ScoringJob.objects.get()
+            self.assertEqual((job.status, job.attempts), ('pending', 1))
+            self.assertEqual(job.last_error, 'RuntimeError: model unavailable')
+            self.assertGreaterEqual(job.run_after, start + timedelta(seconds=10))
+            # Not due yet
+            self.assertEqual(scoring_queue.claim_jobs('worker-1'), [])
+
+            ScoringJob.objects.update(run_after=start)
+            scoring_queue.run_once('worker-1')
+            job = ScoringJob.objects.get()
+            self.assertEqual((job.status, job.attempts), ('pending', 2))
+            self.assertGreaterEqual(job.run_after, start + timedelta(seconds=20))
+
+            ScoringJob.objects.update(run_after=start)
+            scoring_queue.run_once('worker-1')
+            job = ScoringJob.objects.get()
+            self.assertEqual((job.status, job.attempts, job.locked_by), ('failed', 3, ''))
+            self.assertEqual(scoring_queue.claim_jobs('worker-1'), [])
+        self.assertFalse(RiskAssessment.objects.exists())
+
+    def test_per_entry_errors_only_retry_that_entry(self):
+        self.post()
+        self.day += timedelta(days=1)
+        self.post(sleep_hours=8)
+
+        def predictions(emotion_data_list, journal_texts):
+            results = fixed_predictions(emotion_data_list)
+            results[0] = {'error': 'bad input'}
+            return results
+        with self.scoring(predictions):
+            self.assertEqual(scoring_queue.run_once('worker-1'), 2)
+        self.assertEqual(sorted(ScoringJob.objects.values_list('status', 'last_error')),
+                         [('done', ''), ('pending', 'bad input')])
+        self.assertEqual(RiskAssessment.objects.count(), 1)
+
+    def test_stale_locks_are_reclaimed(self):
+        self.post()
+        [stale] = scoring_queue.claim_jobs('worker-1')
+        # A running job is not handed to another worker
+        self.assertEqual(scoring_queue.claim_jobs('worker-2'), [])
+
+        # until its lock times out
+        ScoringJob.objects.update(locked_at=timezone.now() - timedelta(seconds=301))
+        [job] = scoring_queue.claim_jobs('worker-2')
+        self.assertEqual((job.locked_by, job.attempts), ('worker-2', 2))
+
+        with self.scoring():
+            # The first worker no longer owns the job and cannot record a result
+            self.assertEqual(scoring_queue.process_jobs([stale]), 0)
+            self.assertEqual(ScoringJob.objects.get().status, 'running')
+            self.assertEqual(scoring_queue.process_jobs([job]), 1)
+        self.assertEqual(ScoringJob.objects.get().status, 'done')
+        self.assertEqual(RiskAssessment.objects.count(), 1)
+
+
+class ResponseCacheTests(EntryDataTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.make_user('cache')
+        self.entry = self.add_entry(self.user, self.today)
+        self.endpoints = [
+            (dashboard_summary, '/api/emotions/dashboard/', ()),
+            (emotion_stats, '/api/emotions/stats/', ()),
+            (emotion_entries, '/api/emotions/entries/', ()),
+            (risk_assessments, '/api/emotions/risk-assessments/', ()),
+            (emotion_entry_detail, f'/api/emotions/entries/{self.entry.pk}/', (self.entry.pk,)),
+        ]
+
+    def get(self, view, path, *args, **headers):
+        return self.call(view, self.user, 'get', path, *args, headers=headers)
+
+    def test_unchanged_version_is_served_without_the_view(self):
+        for view, path, args in self.endpoints:
+            with self.subTest(path=path):
+                first = self.get(view, path, *args)
+                # Only the data version is looked up
+                with self.assertNumQueries(1):
+                    cached = self.get(view, path, *args)
+                self.assertEqual(cached.data, first.data)
+                with self.assertNumQueries(1):
+                    not_modified = self.get(view, path, *args, **{'If-None-Match': first['ETag']})
+                self.assertEqual(not_modified.status_code, 304)
+                self.assertIsNone(not_modified.data)
+                by_date = self.get(view, path, *args, **{'If-Modified-Since': first['Last-Modified']})
+                self.assertEqual(by_date.status_code, 304)
+
+    def test_entry_write_changes_version(self):
+        etags = {path: self.get(view, path, *args)['ETag'] for view, path, args in self.endpoints}
+        self.entry.sleep_hours = 3
+        self.entry.save()
+        for view, path, args in self.endpoints:
+            with self.subTest(path=path):
+                response = self.get(view, path, *args, **{'If-None-Match': etags[path]})
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response['ETag'], etags[path])
+        self.assertEqual(self.get(emotion_stats, '/api/emotions/stats/').data['avg_sleep'], 3)
+
+
+class PaginationTests(EntryDataTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.make_user('pages')
+        for offset in range(25):
+            self.add_entry(self.user, self.today - timedelta(days=offset))
+
+    def get(self, **params):
+        return self.call(emotion_entries, self.user, 'get', '/api/emotions/entries/', data=params)
+
+    def test_cursor_walks_every_entry_once_newest_first(self):
+        seen = []
+        params = {'limit': 10}
+        while True:
+            response = self.get(**params)
+            self.assertEqual(response.status_code, 200)
+            seen += [item['id'] for item in response.data]
+            if 'X-Next-Cursor' not in response:
+                break
+            self.assertIn(f"cursor={response['X-Next-Cursor']}", response['Link'])
+            params['cursor'] = response['X-Next-Cursor']
+        self.assertEqual([len(seen[i:i + 10]) for i in range(0, len(seen), 10)], [10, 10, 5])
+        expected = list(EmotionEntry.objects.filter(user=self.user).order_by('-date').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_rows_sharing_a_date_are_ordered_by_id(self):
+        # Entries of several users share dates; (date, id) still orders them totally
+        other = self.make_user('pages-other')
+        for offset in range(25):
+            self.add_entry(other, self.today - timedelta(days=offset))
+        queryset = EmotionEntry.objects.values('date', 'id')
+        seen = []
+        cursor = None
+        while True:
+            params = {'limit': 7, **({'cursor': cursor} if cursor else {})}
+            rows, headers = paginate(Request(self.factory.get('/', params)), queryset)
+            seen += [(row['date'], row['id']) for row in rows]
+            cursor = headers.get('X-Next-Cursor')
+            if cursor is None:
+                break
+        self.assertEqual(seen, sorted(queryset.values_list('date', 'id'), reverse=True))
+
+    def test_cursor_resumes_after_the_row_it_names(self):
+        entries = list(EmotionEntry.objects.filter(user=self.user).order_by('-date'))
+        response = self.get(cursor=encode_cursor(entries[3].date, entries[3].pk), limit=2)
+        self.assertEqual([item['id'] for item in response.data], [entries[4].pk, entries[5].pk])
+
+    def test_invalid_parameters_are_rejected(self):
+        for params in (
+            {'cursor': '!!!'}, {'cursor': 'bm90LWEtY3Vyc29y'},  # "not-a-cursor"
+            {'days': 'abc'}, {'days': '-1'}, {'days': '100000'},
+            {'limit': '0'}, {'limit': '501'}, {'limit': 'ten'},
+            {'fields': 'id,password'},
+        ):
+            with self.subTest(**params):
+                response = self.get(**params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.data)
+
+    def test_fields_selects_a_sparse_fieldset(self):
+        response = self.get(fields='mood, id', limit=3)
+        self.assertEqual(response.status_code, 200)
+        # In serializer order, whatever order they were asked for in
+        self.assertEqual([list(item) for item in response.data], [['id', 'mood']] * 3)
+        RiskAssessment.objects.create(user=self.user, date=self.today, risk_category='low', risk_score=0.1)
+        response = self.call(risk_assessments, self.user, 'get', '/api/emotions/risk-assessments/',
+                             data={'fields': 'risk_score,date'})
+        self.assertEqual(response.data, [{'date': self.today, 'risk_score': 0.1}])
+
+
+class ListSerializationTests(EntryDataTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.make_user('serialization')
+        self.add_entry(self.user, date(2024, 2, 29), journal_text='Long day. "Tired" \u2014 ok')
+        # Unscored, as in asynchronous scoring mode
+        self.add_entry(self.user, date(2024, 3, 1), sleep_hours=6.55, journal_text='')
+        scored = self.add_entry(self.user, date(2024, 3, 2), mood='sad', sleep_hours=4.25)
+        scored.risk_score, scored.risk_category = 0.123456789, 'high'
+        scored.save(update_fields=['risk_score', 'risk_category', 'updated_at'])
+        RiskAssessment.objects.create(
+            user=self.user, date=date(2024, 3, 2), risk_category='high', risk_score=0.123456789,
+            factor_codes=[1, 4], recommendation_codes=[10, 15],
+            feature_contributions={'sleep_hours': 0.0312, 'journal_text': -0.0005}, model_version='v1',
+        )
+        RiskAssessment.objects.create(user=self.user, date=date(2024, 3, 1), risk_category='low', risk_score=0.0)
+
+    def assertRendersLikeModelSerializer(self, list_serializer, serializer_class, queryset):
+        expected = JSONRenderer().render(serializer_class(queryset.order_by('-date'), many=True).data)
+        rows = list_serializer.values(queryset, 'date', 'id').order_by('-date')
+        data = list_serializer.to_representation(rows)
+        self.assertEqual(renderers.FastJSONRenderer().render(data), expected)
+        with mock.patch.object(renderers, 'orjson', None):
+            self.assertEqual(renderers.FastJSONRenderer().render(data), expected)
+
+    def test_entries_render_like_the_model_serializer(self):
+        self.assertRendersLikeModelSerializer(
+            EmotionEntryListSerializer(), EmotionEntrySerializer, EmotionEntry.objects.filter(user=self.user),
+        )
+
+    def test_risk_assessments_render_like_the_model_serializer(self):
+        self.assertRendersLikeModelSerializer(
+            RiskAssessmentListSerializer(), RiskAssessmentSerializer, RiskAssessment.objects.filter(user=self.user),
+        )
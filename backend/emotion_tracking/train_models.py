@@ -4,124 +4,354 @@ Training script for emotion risk prediction models
 Run this script to train and save ML models
 """
 
+import argparse
+import copy
+import json
 import os
+import pickle
+import sys
+import time
+import tracemalloc
 import numpy as np
-import pandas as pd
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.linear_model import LogisticRegression
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.preprocessing import StandardScaler, LabelEncoder
-from sklearn.model_selection import train_test_split
+from sklearn.model_selection import ParameterGrid, StratifiedKFold, train_test_split
 from sklearn.metrics import classification_report, accuracy_score
-import joblib
-from datetime import datetime, timedelta
-import random
-
-
-def generate_synthetic_data(n_samples=1000):
-    """Generate synthetic training data for demonstration"""
-    np.random.seed(42)
-    random.seed(42)
-    
-    data = []
-    
-    # Mood mapping
-    moods = ['happy', 'sad', 'angry', 'anxious', 'neutral']
-    mood_risk = {'happy': 0.1, 'neutral': 0.3, 'sad': 0.6, 'anxious': 0.7, 'angry': 0.8}
-    
-    for i in range(n_samples):
-        # Generate base features
-        mood = random.choice(moods)
-        anxiety_level = random.randint(1, 5)
-        sleep_hours = np.random.normal(7, 2)  # Normal distribution around 7 hours
-        sleep_hours = max(0, min(12, sleep_hours))  # Clamp between 0-12
-        energy_level = random.randint(1, 5)
-        appetite = random.randint(1, 5)
-        
-        # Generate journal text based on mood
-        journal_texts = {
-            'happy': ["feeling good today", "baby is smiling", "great day", "so happy"],
-            'sad': ["feeling down", "miss my old life", "crying a lot", "feeling empty"],
-            'anxious': ["worried about baby", "can't sleep", "overwhelmed", "anxious thoughts"],
-            'angry': ["frustrated", "irritable", "angry at nothing", "losing patience"],
-            'neutral': ["okay today", "normal day", "nothing special", "just another day"]
-        }
-        journal_text = random.choice(journal_texts[mood])
-        
-        # Calculate risk score based on features
-        base_risk = mood_risk[mood]
-        
-        # Adjust risk based on other factors
-        if anxiety_level >= 4:
-            base_risk += 0.2
-        if sleep_hours < 6:
-            base_risk += 0.15
-        if energy_level <= 2:
-            base_risk += 0.1
-        if appetite <= 2:
-            base_risk += 0.1
-        
-        # Add some randomness
-        base_risk += np.random.normal(0, 0.1)
-        base_risk = max(0, min(1, base_risk))
-        
-        # Determine risk category
-        if base_risk < 0.3:
-            risk_category = 'low'
-        elif base_risk < 0.7:
-            risk_category = 'moderate'
-        else:
-            risk_category = 'high'
-        
-        data.append({
-            'mood': mood,
-            'anxiety_level': anxiety_level,
-            'sleep_hours': sleep_hours,
-            'energy_level': energy_level,
-            'appetite': appetite,
-            'journal_text': journal_text,
-            'risk_category': risk_category,
-            'risk_score': base_risk
-        })
+from joblib import Parallel, delayed
+
+if __package__ in (None, ''):
+    # Run as a script: make the emotion_tracking package importable
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from emotion_tracking import model_bundle
+from emotion_tracking.features import NUMERIC_FEATURES, FeaturePipeline, TermSubsetVectorizer, columns_from_frame
+from emotion_tracking.ml_models import CompiledForest
+from emotion_tracking.synthetic_data import generate_synthetic_data
+
+
+def compile_forest(model, X_check):
+    """Flatten the forest into NumPy arrays for the serving evaluator.
+
+    Raises if the export does not reproduce sklearn's probabilities exactly
+    on X_check.
+    """
+    compiled = CompiledForest.from_sklearn(model)
+    expected = model.predict_proba(X_check)
+    actual = compiled.predict_proba(X_check)
+    if not np.array_equal(expected, actual):
+        max_diff = np.abs(expected - actual).max()
+        raise ValueError(f"Compiled forest does not match sklearn (max diff {max_diff:.3g})")
+    if not np.array_equal(model.predict(X_check), compiled.predict(X_check)[1]):
+        raise ValueError("Compiled forest categories do not match sklearn")
     
-    return pd.DataFrame(data)
+    print(f"Compiled forest: {len(compiled.roots)} trees, {compiled.feature.shape[0]} nodes, depth {compiled.max_depth}")
+    return compiled
 
 
-def train_models():
-    """Train and save ML models"""
-    print("Generating synthetic training data...")
-    df = generate_synthetic_data(2000)
+def save_bundle(model_dir, model, pipeline, compiled, metrics, training=None):
+    """Publish the trained artifacts as one versioned bundle.
+
+    The fitted feature pipeline is stored whole, so serving transforms
+    inputs with exactly the code and state used in training. training holds
+    the incremental trainer's resume state, if any.
+    """
+    manifest = {
+        'numeric_features': pipeline.numeric_features,
+        'mood_mapping': pipeline.mood_mapping,
+        'vocab_size': pipeline.n_text_features,
+        'feature_order': pipeline.feature_names(),
+        'classes': [str(c) for c in compiled.classes],
+        'metrics': metrics,
+    }
+    if training is not None:
+        manifest['training'] = training
+    objects = {'feature_pipeline': pipeline}
+    if model is not None:
+        objects['risk_model'] = model
+    return model_bundle.write_bundle(
+        model_dir,
+        objects=objects,
+        arrays={'forest': compiled.to_arrays()},
+        manifest=manifest,
+    )
+
+
+def footprint(objects, compiled):
+    """Approximate on-disk and in-memory bytes of a set of artifacts.
+
+    Disk is the pickled objects plus the raw forest arrays; memory is what
+    unpickling the objects allocates (Python objects included) plus the arrays.
+    """
+    disk = compiled.nbytes
+    memory = compiled.nbytes
+    for obj in objects:
+        blob = pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+        disk += len(blob)
+        tracemalloc.start()
+        loaded = pickle.loads(blob)
+        memory += tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        # sklearn allocates tree node arrays with plain malloc, invisible to tracemalloc
+        for estimator in getattr(loaded, 'estimators_', []):
+            state = estimator.tree_.__getstate__()
+            memory += state['nodes'].nbytes + state['values'].nbytes
+        del loaded
+    return {'disk_bytes': disk, 'memory_bytes': memory}
+
+
+def _accuracy(compiled, X, y):
+    return accuracy_score(y, compiled.predict(X)[1])
+
+
+def compact_model(model, pipeline, compiled, X_val, y_val, X_test, y_test, tolerance=0.005, min_trees=25):
+    """Shrink the serving artifacts while keeping validation accuracy.
+
+    Trees are ranked by their own validation accuracy and the shortest prefix
+    within tolerance of the full forest is kept, but never fewer than
+    min_trees so risk scores stay smooth averages. Text terms are then dropped
+    in order of importance (unused ones first) while accuracy stays within
+    tolerance. The forest is stored as float32 and the vectorizer only outputs
+    the kept terms, still normalized as in training, so the compact pipeline's
+    transform() yields exactly the columns pruning was measured on. The sklearn forest itself is
+    not kept: the compact bundle serves every request from the compiled arrays.
+
+    Every pruning decision is made on the validation split, which must not
+    overlap the model's training rows; the accuracies in the report are
+    measured on the untouched test split.
+
+    Returns (forest, pipeline, report).
+    """
+    tfidf = pipeline.vectorizer
+    y_val = np.asarray(y_val)
+    y_test = np.asarray(y_test)
+    baseline = _accuracy(compiled, X_val, y_val)
+    floor = baseline - tolerance
     
-    # Prepare features
-    # Convert mood to numeric
-    mood_mapping = {'happy': 5, 'neutral': 3, 'sad': 2, 'anxious': 1, 'angry': 1}
-    df['mood_numeric'] = df['mood'].map(mood_mapping)
+    # Trees: best first, then the shortest prefix that stays above the floor
+    tree_probas = np.stack([estimator.predict_proba(X_val) for estimator in model.estimators_])
+    tree_accuracy = (model.classes_[tree_probas.argmax(axis=2)] == y_val).mean(axis=1)
+    order = np.argsort(-tree_accuracy, kind='stable')
+    votes = np.cumsum(tree_probas[order], axis=0)
+    prefix_accuracy = (model.classes_[votes.argmax(axis=2)] == y_val).mean(axis=1)
+    n_trees = max(int(np.argmax(prefix_accuracy >= floor)) + 1, min(min_trees, len(order)))
+    forest = compiled.select_trees(order[:n_trees])
     
-    # Numeric features
-    numeric_features = ['mood_numeric', 'anxiety_level', 'sleep_hours', 'energy_level', 'appetite']
-    X_numeric = df[numeric_features]
+    # Text terms: least important first; numeric inputs are always kept
+    n_numeric = len(NUMERIC_FEATURES)
+    importance = np.mean([model.estimators_[i].feature_importances_ for i in order[:n_trees]], axis=0)
+    candidates = n_numeric + np.argsort(importance[n_numeric:], kind='stable')
+    if not isinstance(tfidf, TfidfVectorizer):
+        # Hashed columns are fixed by the hash function and cannot be removed
+        candidates = candidates[:0]
+    # At least one term is kept so the vectorizer still has a vocabulary
+    max_dropped = max(len(candidates) - 1, 0)
+    n_dropped = min(int((importance[candidates] == 0).sum()), max_dropped)
+    step = max(1, len(candidates) // 20)
+    X_val = X_val.tocsc()
+    while n_dropped < max_dropped:
+        trial = min(n_dropped + step, max_dropped)
+        keep = np.sort(np.setdiff1d(np.arange(forest.n_features), candidates[:trial]))
+        if _accuracy(forest.drop_features(keep), X_val[:, keep], y_val) < floor:
+            break
+        n_dropped = trial
+    keep = np.sort(np.setdiff1d(np.arange(forest.n_features), candidates[:n_dropped]))
+    forest = forest.drop_features(keep).to_float32()
     
-    # Text features
-    tfidf = TfidfVectorizer(max_features=100, stop_words='english')
-    X_text = tfidf.fit_transform(df['journal_text'].fillna(''))
+    vectorizer = copy.deepcopy(tfidf)
+    if isinstance(tfidf, TfidfVectorizer):
+        # Rows are still normalized over the full vocabulary, so the kept
+        # columns are the ones pruning was decided on; stop_words_ is only
+        # kept for introspection and can be dropped
+        if hasattr(vectorizer, 'stop_words_'):
+            del vectorizer.stop_words_
+        vectorizer = TermSubsetVectorizer(vectorizer, keep[keep >= n_numeric] - n_numeric)
+    compact_pipeline = pipeline.with_vectorizer(vectorizer)
     
-    # Combine features
-    X = np.hstack([X_numeric.values, X_text.toarray()])
-    y = df['risk_category']
+    test_accuracy = _accuracy(compiled, X_test, y_test)
+    compact_test_accuracy = _accuracy(forest, X_test.tocsc()[:, keep], y_test)
+    report = {
+        'trees': [len(compiled.roots), len(forest.roots)],
+        'nodes': [len(compiled.feature), len(forest.feature)],
+        'features': [compiled.n_features, forest.n_features],
+        'validation_accuracy': [baseline, _accuracy(forest, X_val[:, keep], y_val)],
+        'accuracy': [test_accuracy, compact_test_accuracy],
+        'accuracy_delta': compact_test_accuracy - test_accuracy,
+        'before': footprint([model, pipeline], compiled),
+        'after': footprint([compact_pipeline], forest),
+    }
+    return forest, compact_pipeline, report
+
+
+def print_compaction_report(report):
+    before, after = report['before'], report['after']
+    for label in ('trees', 'nodes', 'features'):
+        old, new = report[label]
+        print(f"  {label:10s}{old:>10,} -> {new:,}")
+    print(f"  {'disk':10s}{before['disk_bytes'] / 1024:>9,.0f}K -> {after['disk_bytes'] / 1024:,.0f}K")
+    print(f"  {'memory':10s}{before['memory_bytes'] / 1024:>9,.0f}K -> {after['memory_bytes'] / 1024:,.0f}K")
+    print(f"  {'val acc':10s}{report['validation_accuracy'][0]:>10.3f} -> {report['validation_accuracy'][1]:.3f}")
+    print(f"  {'test acc':10s}{report['accuracy'][0]:>10.3f} -> {report['accuracy'][1]:.3f} "
+          f"({report['accuracy_delta']:+.3f})")
+
+
+# Forest settings used when no search is run
+DEFAULT_PARAMS = {'n_estimators': 100, 'max_depth': 10}
+
+DEFAULT_PARAM_GRID = {
+    'n_estimators': [25, 50, 100, 200],
+    'max_depth': [6, 10, 14],
+    'min_samples_leaf': [1, 5],
+}
+
+
+def _fit_fold(params, X, y, train_index, test_index, keep_model):
+    """Fit and score one (candidate, fold) pair in a worker process"""
+    model = RandomForestClassifier(random_state=42, n_jobs=1, **params)
+    start = time.perf_counter()
+    model.fit(X[train_index], y[train_index])
+    fit_seconds = time.perf_counter() - start
+    accuracy = accuracy_score(y[test_index], model.predict(X[test_index]))
+    return accuracy, fit_seconds, model if keep_model else None
+
+
+def measure_row_latency(model, X_rows, repeats=200):
+    """Median seconds to score one row through the serving evaluator"""
+    compiled = CompiledForest.from_sklearn(model)
+    rows = [X_rows[i % X_rows.shape[0]] for i in range(repeats)]
+    timings = []
+    for row in rows:
+        start = time.perf_counter()
+        compiled.predict(row)
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+
+def search_hyperparameters(X, y, param_grid=None, cv=5, n_jobs=-1):
+    """Grid search with k-fold cross-validation, parallel across all cores.
+
+    X is built once and shared by every (candidate, fold) task; joblib
+    memory-maps it into the worker processes instead of copying it per task.
+    Returns one result dict per candidate with accuracy, fit time, per-row
+    inference latency and model size.
+    """
+    candidates = list(ParameterGrid(param_grid or DEFAULT_PARAM_GRID))
+    y = np.asarray(y)
+    folds = list(StratifiedKFold(n_splits=cv, shuffle=True, random_state=42).split(np.zeros(len(y)), y))
     
-    # Scale numeric features
-    scaler = StandardScaler()
-    X_numeric_scaled = scaler.fit_transform(X_numeric)
+    print(f"Searching {len(candidates)} candidates x {cv} folds...")
+    outcomes = Parallel(n_jobs=n_jobs)(
+        delayed(_fit_fold)(params, X, y, train_index, test_index, keep_model=(fold == 0))
+        for params in candidates
+        for fold, (train_index, test_index) in enumerate(folds)
+    )
     
-    # Recombine with scaled numeric features
-    X = np.hstack([X_numeric_scaled, X_text.toarray()])
+    results = []
+    for i, params in enumerate(candidates):
+        candidate_outcomes = outcomes[i * cv:(i + 1) * cv]
+        accuracies = [accuracy for accuracy, _, _ in candidate_outcomes]
+        model = candidate_outcomes[0][2]
+        # Latency is timed here, serially, so parallel fits don't skew it
+        results.append({
+            'params': params,
+            'cv_accuracy': float(np.mean(accuracies)),
+            'cv_accuracy_std': float(np.std(accuracies)),
+            'fit_seconds': float(np.mean([fit_seconds for _, fit_seconds, _ in candidate_outcomes])),
+            'row_latency_us': measure_row_latency(model, X[:50]) * 1e6,
+            'model_bytes': len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL)),
+        })
+    return results
+
+
+def select_candidate(results, latency_budget_us=None, size_budget_bytes=None, latency_weight=0.0):
+    """Pick the best candidate that fits the serving budget.
+
+    Objective: cv_accuracy - latency_weight * row_latency_ms, over candidates
+    within both budgets. If none fits, the fastest candidate is returned.
+    """
+    within_budget = [
+        result for result in results
+        if (latency_budget_us is None or result['row_latency_us'] <= latency_budget_us)
+        and (size_budget_bytes is None or result['model_bytes'] <= size_budget_bytes)
+    ]
+    if not within_budget:
+        print("No candidate fits the budget; using the fastest one")
+        return min(results, key=lambda result: result['row_latency_us'])
+    return max(
+        within_budget,
+        key=lambda result: (
+            result['cv_accuracy'] - latency_weight * result['row_latency_us'] / 1000,
+            -result['row_latency_us'],
+        ),
+    )
+
+
+def print_search_report(results, selected):
+    print(f"\n{'params':52s} {'cv acc':>13s} {'fit s':>7s} {'row us':>8s} {'size KB':>9s}")
+    for result in sorted(results, key=lambda result: -result['cv_accuracy']):
+        marker = '*' if result is selected else ' '
+        print(
+            f"{marker}{json.dumps(result['params'], sort_keys=True):51s} "
+            f"{result['cv_accuracy']:.3f}±{result['cv_accuracy_std']:.3f} "
+            f"{result['fit_seconds']:7.2f} {result['row_latency_us']:8.0f} {result['model_bytes'] / 1024:9.0f}"
+        )
+
+
+def default_model_dir():
+    """settings.ML_MODEL_DIR, the directory the API loads models from"""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+    from django.conf import settings
+    return settings.ML_MODEL_DIR
+
+
+def build_features(df):
+    """Fit the feature pipeline and build the CSR training matrix"""
+    # Scaled numeric columns followed by TF-IDF columns (CSR; never densified)
+    pipeline = FeaturePipeline(TfidfVectorizer(max_features=100, stop_words='english'))
+    X = pipeline.fit_transform(columns_from_frame(df))
+    y = df['risk_category']
+    print(f"Features: {len(pipeline.numeric_features)} numeric + {pipeline.n_text_features} text terms")
+    return X, y, pipeline
+
+
+def train_models(n_samples=2000, search=False, param_grid=None, cv=5, n_jobs=-1,
+                 latency_budget_us=None, size_budget_bytes=None, latency_weight=0.0,
+                 compact=False, compact_tolerance=0.005, model_dir=None):
+    """Train and save ML models.
+
+    With search=True the forest settings are chosen by a cross-validated
+    grid search on the training split instead of DEFAULT_PARAMS. With
+    compact=True a pruned, float32, compiled-only bundle is published; the
+    forest is then fitted on part of the training split and pruned on the
+    rest, so the test split only measures the result. The bundle goes to
+    model_dir, by default settings.ML_MODEL_DIR.
+    """
+    print("Generating synthetic training data...")
+    df = generate_synthetic_data(n_samples)
+    X, y, pipeline = build_features(df)
     
     # Split data
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
     
+    params = DEFAULT_PARAMS
+    metrics = {}
+    if search:
+        results = search_hyperparameters(X_train, y_train, param_grid, cv=cv, n_jobs=n_jobs)
+        selected = select_candidate(results, latency_budget_us, size_budget_bytes, latency_weight)
+        print_search_report(results, selected)
+        params = selected['params']
+        metrics['search'] = {
+            key: selected[key] for key in ('cv_accuracy', 'row_latency_us', 'model_bytes')
+        }
+    
+    if compact:
+        # Held out from fitting for the pruning decisions
+        X_train, X_val, y_train, y_val = train_test_split(
+            X_train, y_train, test_size=0.2, random_state=42, stratify=y_train
+        )
+    
     # Train model
-    print("Training Random Forest model...")
-    model = RandomForestClassifier(n_estimators=100, random_state=42, max_depth=10)
+    print(f"Training Random Forest model with {params}...")
+    model = RandomForestClassifier(random_state=42, **params)
     model.fit(X_train, y_train)
     
     # Evaluate
@@ -131,28 +361,63 @@ def train_models():
     print("\nClassification Report:")
     print(classification_report(y_test, y_pred))
     
-    # Save models
-    model_dir = os.path.join(os.path.dirname(__file__), 'saved_models')
+    compiled = compile_forest(model, X)
+    
+    # Save models as one bundle
+    model_dir = model_dir or default_model_dir()
     os.makedirs(model_dir, exist_ok=True)
     
+    metrics.update({'accuracy': accuracy, 'params': params})
+    if compact:
+        print(f"Compacting model (tolerance {compact_tolerance})...")
+        compiled, pipeline, report = compact_model(
+            model, pipeline, compiled, X_val, y_val, X_test, y_test, compact_tolerance
+        )
+        print_compaction_report(report)
+        metrics['compaction'] = report
+        model = None
+    
     print("Saving models...")
-    joblib.dump(model, os.path.join(model_dir, 'risk_model.pkl'))
-    joblib.dump(tfidf, os.path.join(model_dir, 'text_vectorizer.pkl'))
-    joblib.dump(scaler, os.path.join(model_dir, 'scaler.pkl'))
-    
-    # Save feature info for reference
-    feature_info = {
-        'numeric_features': numeric_features,
-        'mood_mapping': mood_mapping,
-        'model_accuracy': accuracy
-    }
-    joblib.dump(feature_info, os.path.join(model_dir, 'feature_info.pkl'))
+    version = save_bundle(model_dir, model, pipeline, compiled, metrics)
     
-    print(f"Models saved to {model_dir}")
+    print(f"Model bundle {version} saved to {model_dir}")
     print("Training complete!")
     
-    return model, tfidf, scaler
+    return model, pipeline
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train and save the emotion risk model")
+    parser.add_argument('--samples', type=int, default=2000, help='synthetic training rows')
+    parser.add_argument('--search', action='store_true', help='choose forest settings by grid search')
+    parser.add_argument('--grid', type=json.loads, help='parameter grid as JSON, e.g. \'{"max_depth": [6, 10]}\'')
+    parser.add_argument('--cv', type=int, default=5, help='cross-validation folds')
+    parser.add_argument('--n-jobs', type=int, default=-1, help='parallel workers for the search (-1 = all cores)')
+    parser.add_argument('--latency-budget-us', type=float, help='max per-row inference latency')
+    parser.add_argument('--size-budget-mb', type=float, help='max pickled model size')
+    parser.add_argument('--latency-weight', type=float, default=0.0,
+                        help='accuracy points traded per millisecond of row latency')
+    parser.add_argument('--compact', action='store_true',
+                        help='prune trees and text terms, store float32 and publish a compiled-only bundle')
+    parser.add_argument('--compact-tolerance', type=float, default=0.005,
+                        help='max validation accuracy lost to compaction')
+    parser.add_argument('--model-dir', help='where to publish the bundle (default: settings.ML_MODEL_DIR)')
+    args = parser.parse_args()
+    
+    train_models(
+        n_samples=args.samples,
+        search=args.search,
+        param_grid=args.grid,
+        cv=args.cv,
+        n_jobs=args.n_jobs,
+        latency_budget_us=args.latency_budget_us,
+        size_budget_bytes=args.size_budget_mb * 1024 * 1024 if args.size_budget_mb else None,
+        latency_weight=args.latency_weight,
+        compact=args.compact,
+        compact_tolerance=args.compact_tolerance,
+        model_dir=args.model_dir,
+    )
 
 
 if __name__ == "__main__":
-    train_models()
+    main()
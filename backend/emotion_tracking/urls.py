@@ -3,6 +3,7 @@ from . import views
 
 urlpatterns = [
     path('entries/', views.emotion_entries, name='emotion-entries'),
+    path('entries/sync/', views.sync_emotion_entries, name='emotion-entries-sync'),
     path('entries/<int:entry_id>/', views.emotion_entry_detail, name='emotion-entry-detail'),
     path('risk-assessments/', views.risk_assessments, name='risk-assessments'),
     path('stats/', views.emotion_stats, name='emotion-stats'),
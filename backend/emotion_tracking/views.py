@@ -2,130 +2,64 @@ from rest_framework import status, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from django.utils import timezone
-from django.db.models import Avg, Count
-from django.db.models.functions import TruncDate
-from datetime import datetime, timedelta
-import json
+from datetime import timedelta
 
-from .models import EmotionEntry, RiskAssessment
-from .serializers import EmotionEntrySerializer, RiskAssessmentSerializer, EmotionStatsSerializer
-from .ml_models import EmotionRiskPredictor
+from .entry_writes import DuplicateDate, InvalidBatch, sync_entries, write_entry
+from .models import EmotionEntry, EmotionSummary, RiskAssessment
+from .serializers import (
+    EmotionEntrySerializer, RiskAssessmentSerializer,
+    EmotionEntryListSerializer, RiskAssessmentListSerializer,
+)
+from .pagination import InvalidQuery, fields_param, paginate, window_start
+from .response_cache import cached_response
+from .rollups import INTERVALS, window_stats
+
+
+def entry_response(entry, prediction):
+    """An entry with its risk recommendations, as returned by entry writes"""
+    response_data = EmotionEntrySerializer(entry).data
+    if prediction is not None:
+        response_data['recommendations'] = prediction['recommendations']
+        response_data['model_version'] = prediction['model_version']
+    return response_data
 
 
 @api_view(['GET', 'POST'])
 @permission_classes([permissions.IsAuthenticated])
+@cached_response('entries')
 def emotion_entries(request):
     if request.method == 'GET':
-        # Get query parameters for filtering
-        days = request.GET.get('days', 30)
-        start_date = timezone.now().date() - timedelta(days=int(days))
-        
-        entries = EmotionEntry.objects.filter(
-            user=request.user,
-            date__gte=start_date
-        ).order_by('-date')
+        # Newest first, one keyset page at a time (see pagination.py)
+        try:
+            start_date = window_start(request)
+            serializer = EmotionEntryListSerializer(
+                fields_param(request, EmotionEntryListSerializer.all_fields())
+            )
+            entries, headers = paginate(request, serializer.values(EmotionEntry.objects.filter(
+                user=request.user,
+                date__gte=start_date
+            ), 'date', 'id'))
+        except InvalidQuery as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         
-        serializer = EmotionEntrySerializer(entries, many=True)
-        return Response(serializer.data)
+        return Response(serializer.to_representation(entries), headers=headers)
     
     elif request.method == 'POST':
-            # Check if entry already exists for today
-            today = timezone.now().date()
-            existing_entry = EmotionEntry.objects.filter(user=request.user, date=today).first()
-            
-            if existing_entry:
-                # Update existing entry
-                serializer = EmotionEntrySerializer(existing_entry, data=request.data, partial=True)
-                if serializer.is_valid():
-                    updated_entry = serializer.save()
-                    
-                    # Get ML prediction
-                    predictor = EmotionRiskPredictor()
-                    emotion_data = {
-                        'mood': updated_entry.mood,
-                        'anxiety_level': updated_entry.anxiety_level,
-                        'sleep_hours': updated_entry.sleep_hours,
-                        'energy_level': updated_entry.energy_level,
-                        'appetite': updated_entry.appetite,
-                    }
-                    
-                    prediction = predictor.predict_risk(
-                        emotion_data, 
-                        updated_entry.journal_text or ""
-                    )
-                    
-                    # Update entry with new prediction
-                    updated_entry.risk_score = prediction['risk_score']
-                    updated_entry.risk_category = prediction['risk_category']
-                    updated_entry.save()
-                    
-                    # Update risk assessment
-                    RiskAssessment.objects.update_or_create(
-                        user=request.user,
-                        date=updated_entry.date,
-                        defaults={
-                            'risk_category': prediction['risk_category'],
-                            'risk_score': prediction['risk_score'],
-                            'contributing_factors': prediction['contributing_factors'],
-                            'recommendations': prediction['recommendations']
-                        }
-                    )
-                    
-                    response_data = EmotionEntrySerializer(updated_entry).data
-                    response_data['recommendations'] = prediction['recommendations']
-                    
-                    return Response(response_data, status=status.HTTP_200_OK)
-                
-                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-            else:
-                # Create new entry
-                serializer = EmotionEntrySerializer(data=request.data)
-                if serializer.is_valid():
-                    entry = serializer.save(user=request.user)
-                    
-                    # Get ML prediction
-                    predictor = EmotionRiskPredictor()
-                    emotion_data = {
-                        'mood': entry.mood,
-                        'anxiety_level': entry.anxiety_level,
-                        'sleep_hours': entry.sleep_hours,
-                        'energy_level': entry.energy_level,
-                        'appetite': entry.appetite,
-                    }
-                    
-                    prediction = predictor.predict_risk(
-                        emotion_data, 
-                        entry.journal_text or ""
-                    )
-                    
-                    # Update entry with prediction
-                    entry.risk_score = prediction['risk_score']
-                    entry.risk_category = prediction['risk_category']
-                    entry.save()
-                    
-                    # Create or update risk assessment
-                    risk_assessment, created = RiskAssessment.objects.update_or_create(
-                        user=request.user,
-                        date=entry.date,
-                        defaults={
-                            'risk_category': prediction['risk_category'],
-                            'risk_score': prediction['risk_score'],
-                            'contributing_factors': prediction['contributing_factors'],
-                            'recommendations': prediction['recommendations']
-                        }
-                    )
-                    
-                    # Return updated entry with predictions
-                    response_data = EmotionEntrySerializer(entry).data
-                    response_data['recommendations'] = prediction['recommendations']
-                    
-                    return Response(response_data, status=status.HTTP_201_CREATED)
-                
-                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        # A second check-in for the same day replaces the first
+        serializer = EmotionEntrySerializer(data=request.data)
+        if serializer.is_valid():
+            entry, created, prediction = write_entry(request.user, serializer.validated_data)
+            return Response(
+                entry_response(entry, prediction),
+                status=status.HTTP_201_CREATED if created else status.HTTP_200_OK
+            )
+        
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
 @api_view(['GET', 'PUT', 'DELETE'])
 @permission_classes([permissions.IsAuthenticated])
+@cached_response('entry')
 def emotion_entry_detail(request, entry_id):
     try:
         entry = EmotionEntry.objects.get(id=entry_id, user=request.user)
@@ -139,44 +73,11 @@ def emotion_entry_detail(request, entry_id):
     elif request.method == 'PUT':
         serializer = EmotionEntrySerializer(entry, data=request.data, partial=True)
         if serializer.is_valid():
-            updated_entry = serializer.save()
-            
-            # Recalculate ML prediction
-            predictor = EmotionRiskPredictor()
-            emotion_data = {
-                'mood': updated_entry.mood,
-                'anxiety_level': updated_entry.anxiety_level,
-                'sleep_hours': updated_entry.sleep_hours,
-                'energy_level': updated_entry.energy_level,
-                'appetite': updated_entry.appetite,
-            }
-            
-            prediction = predictor.predict_risk(
-                emotion_data, 
-                updated_entry.journal_text or ""
-            )
-            
-            # Update entry with new prediction
-            updated_entry.risk_score = prediction['risk_score']
-            updated_entry.risk_category = prediction['risk_category']
-            updated_entry.save()
-            
-            # Update risk assessment
-            RiskAssessment.objects.update_or_create(
-                user=request.user,
-                date=updated_entry.date,
-                defaults={
-                    'risk_category': prediction['risk_category'],
-                    'risk_score': prediction['risk_score'],
-                    'contributing_factors': prediction['contributing_factors'],
-                    'recommendations': prediction['recommendations']
-                }
-            )
-            
-            response_data = EmotionEntrySerializer(updated_entry).data
-            response_data['recommendations'] = prediction['recommendations']
-            
-            return Response(response_data)
+            try:
+                updated_entry, _, prediction = write_entry(request.user, serializer.validated_data, entry=entry)
+            except DuplicateDate as e:
+                return Response({'date': [str(e)]}, status=status.HTTP_400_BAD_REQUEST)
+            return Response(entry_response(updated_entry, prediction))
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
@@ -185,85 +86,60 @@ def emotion_entry_detail(request, entry_id):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def sync_emotion_entries(request):
+    """Upload a batch of entries (e.g. check-ins made offline) in one request"""
+    try:
+        results = sync_entries(request.user, request.data.get('entries') if isinstance(request.data, dict) else None)
+    except InvalidBatch as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    counts = {outcome: 0 for outcome in ('created', 'updated', 'invalid', 'superseded')}
+    for result in results:
+        counts[result['status']] += 1
+    return Response({'results': results, **counts})
+
+
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
+@cached_response('risk-assessments')
 def risk_assessments(request):
-    days = request.GET.get('days', 30)
-    start_date = timezone.now().date() - timedelta(days=int(days))
-    
-    assessments = RiskAssessment.objects.filter(
-        user=request.user,
-        date__gte=start_date
-    ).order_by('-date')
+    try:
+        start_date = window_start(request)
+        serializer = RiskAssessmentListSerializer(
+            fields_param(request, RiskAssessmentListSerializer.all_fields())
+        )
+        assessments, headers = paginate(request, serializer.values(RiskAssessment.objects.filter(
+            user=request.user,
+            date__gte=start_date
+        ), 'date', 'id'))
+    except InvalidQuery as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
     
-    serializer = RiskAssessmentSerializer(assessments, many=True)
-    return Response(serializer.data)
+    return Response(serializer.to_representation(assessments), headers=headers)
 
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
+@cached_response('stats')
 def emotion_stats(request):
-    days = request.GET.get('days', 30)
-    start_date = timezone.now().date() - timedelta(days=int(days))
-    
-    entries = EmotionEntry.objects.filter(
-        user=request.user,
-        date__gte=start_date
-    )
-    
-    if not entries.exists():
-        return Response({
-            'avg_anxiety': 0,
-            'avg_sleep': 0,
-            'avg_energy': 0,
-            'avg_appetite': 0,
-            'mood_distribution': {},
-            'risk_trend': [],
-            'entries_count': 0
-        })
-    
-    # Calculate averages
-    stats = entries.aggregate(
-        avg_anxiety=Avg('anxiety_level'),
-        avg_sleep=Avg('sleep_hours'),
-        avg_energy=Avg('energy_level'),
-        avg_appetite=Avg('appetite')
-    )
-    
-    # Mood distribution
-    mood_dist = entries.values('mood').annotate(count=Count('mood'))
-    mood_distribution = {item['mood']: item['count'] for item in mood_dist}
-    
-    # Risk trend over time
-    risk_trend = []
-    daily_entries = entries.annotate(date_only=TruncDate('date')).values('date_only').annotate(
-        avg_risk=Avg('risk_score'),
-        count=Count('id')
-    ).order_by('date_only')
-    
-    for item in daily_entries:
-        if item['avg_risk'] is not None:
-            risk_trend.append({
-                'date': item['date_only'].strftime('%Y-%m-%d'),
-                'risk_score': round(item['avg_risk'], 2),
-                'entries': item['count']
-            })
-    
-    response_data = {
-        'avg_anxiety': round(stats['avg_anxiety'] or 0, 2),
-        'avg_sleep': round(stats['avg_sleep'] or 0, 2),
-        'avg_energy': round(stats['avg_energy'] or 0, 2),
-        'avg_appetite': round(stats['avg_appetite'] or 0, 2),
-        'mood_distribution': mood_distribution,
-        'risk_trend': risk_trend,
-        'entries_count': entries.count()
-    }
-    
-    return Response(response_data)
+    try:
+        start_date = window_start(request)
+    except InvalidQuery as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    interval = request.GET.get('interval', 'day')
+    if interval not in INTERVALS:
+        return Response({'error': f"interval must be one of {', '.join(INTERVALS)}"},
+                        status=status.HTTP_400_BAD_REQUEST)
+    
+    # Merged from the per-day/per-week rollups kept up to date on entry writes
+    return Response(window_stats(request.user, start_date, interval))
 
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
+@cached_response('dashboard')
 def dashboard_summary(request):
     """Get dashboard summary data"""
     # Get today's entry if exists
@@ -275,15 +151,8 @@ def dashboard_summary(request):
         user=request.user
     ).order_by('-date').first()
     
-    # Get streak (consecutive days with entries)
-    streak = 0
-    current_date = today
-    while True:
-        if EmotionEntry.objects.filter(user=request.user, date=current_date).exists():
-            streak += 1
-            current_date -= timedelta(days=1)
-        else:
-            break
+    # Streaks are maintained on the summary row as entries change
+    summary = EmotionSummary.for_user(request.user)
     
     # Get week trend
     week_start = today - timedelta(days=7)
@@ -303,7 +172,9 @@ def dashboard_summary(request):
     response_data = {
         'today_entry': EmotionEntrySerializer(today_entry).data if today_entry else None,
         'recent_assessment': RiskAssessmentSerializer(recent_assessment).data if recent_assessment else None,
-        'streak': streak,
+        'streak': summary.streak_on(today),
+        'longest_streak': summary.longest_streak,
+        'last_entry_date': summary.last_entry_date,
         'week_moods': week_moods
     }
     